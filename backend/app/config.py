@@ -28,13 +28,106 @@ OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 
 # Grok (via Groq) Settings
 GROK_API_KEY = os.getenv("GROK_API_KEY", "")
-GROK_BASE_URL = "https://api.groq.com/openai/v1"
-GROK_MODEL = "llama3-70b-8192"
+GROK_BASE_URL = os.getenv("GROK_BASE_URL", "https://api.groq.com/openai/v1")
+GROK_MODEL = os.getenv("GROK_MODEL", "llama3-70b-8192")
 
+# LLM latency control
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))  # Per request
+LLM_SLOW_CALL_MS = float(os.getenv("LLM_SLOW_CALL_MS", "8000"))  # Slower replies count as breaker failures
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))  # Consecutive bad calls before opening
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "60"))
+LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "4000"))  # Answer locally if the LLM is slower; 0 = off
+LLM_FORM_BUDGET_SECONDS = float(os.getenv("LLM_FORM_BUDGET_SECONDS", "60"))  # Total LLM wait per form; 0 = unlimited
+
+# Speculative answer precomputation on profile save (needs an LLM provider)
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "false").lower() == "true"
+PRECOMPUTE_INTENTS = [i.strip() for i in os.getenv("PRECOMPUTE_INTENTS", "about,motivation,expectation,achievement").split(",") if i.strip()]
+PRECOMPUTE_DELAY_SECONDS = float(os.getenv("PRECOMPUTE_DELAY_SECONDS", "30"))  # Debounce after the last profile edit
+PRECOMPUTE_MAX_TOKENS = int(os.getenv("PRECOMPUTE_MAX_TOKENS", "800"))  # Completion cap of the batched call
+PRECOMPUTE_TOKENS_PER_DAY = int(os.getenv("PRECOMPUTE_TOKENS_PER_DAY", "5000"))  # Per user
+
+
+# Question matcher embeddings
+# "sentence_transformers" (PyTorch) or "onnx" (int8 MiniLM on ONNX Runtime, no torch)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence_transformers")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", str(BASE_DIR / "models" / "minilm-int8")))
+ONNX_MODEL_PATH = ONNX_MODEL_DIR / "model_quantized.onnx"
+ONNX_VOCAB_PATH = ONNX_MODEL_DIR / "vocab.txt"
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = ONNX Runtime default
+# Micro-batch concurrent single-question encodes from parallel fills
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "true").lower() == "true"
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+USER_FIELDS_CACHE_SIZE = int(os.getenv("USER_FIELDS_CACHE_SIZE", "256"))  # Users' extra-field embeddings kept
+
+
+# Global canonical-question knowledge base (cross-user question -> profile field)
+KB_MAX_ENTRIES = int(os.getenv("KB_MAX_ENTRIES", "20000"))  # Questions held in memory per process
+KB_MIN_VOTES = int(os.getenv("KB_MIN_VOTES", "2"))  # Users confirming a field before a question is shared
+KB_MIN_CONFIDENCE = int(os.getenv("KB_MIN_CONFIDENCE", "80"))  # Match confidence (0-100) that counts as a vote
+KB_SIMILARITY_THRESHOLD = float(os.getenv("KB_SIMILARITY_THRESHOLD", "0.85"))  # Cosine for a vector hit
+KB_TOP_K = int(os.getenv("KB_TOP_K", "5"))
+KB_REFRESH_SECONDS = float(os.getenv("KB_REFRESH_SECONDS", "300"))
 
 # Playwright settings
 HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
 SLOW_MO = int(os.getenv("SLOW_MO", "100"))
+# Set a page's text/paragraph/date answers with one in-page script (verified; failures use the normal fill)
+FILL_BULK_INJECT = os.getenv("FILL_BULK_INJECT", "false").lower() == "true"
+FILL_RESOLVE_CONCURRENCY = int(os.getenv("FILL_RESOLVE_CONCURRENCY", "4"))  # Answers resolved at once per fill
+FILL_LOG_ANSWER_MAX_CHARS = int(os.getenv("FILL_LOG_ANSWER_MAX_CHARS", "500"))  # Stored fill-log answer length; 0 = full
+
+# Shared on-disk cache of Google Forms static assets (JS, CSS, fonts) across fills
+ASSET_CACHE_ENABLED = os.getenv("ASSET_CACHE_ENABLED", "true").lower() == "true"
+ASSET_CACHE_DIR = Path(os.getenv("ASSET_CACHE_DIR", str(BASE_DIR / "cache" / "assets")))
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+ASSET_CACHE_MIN_MAX_AGE = int(os.getenv("ASSET_CACHE_MIN_MAX_AGE", "86400"))  # Shortest Cache-Control max-age cached
+
+# Fill runtime: "inline" (API event loop) or "process" (isolated Playwright worker processes)
+FILL_WORKER_MODE = os.getenv("FILL_WORKER_MODE", "inline")
+FILL_WORKER_PROCESSES = int(os.getenv("FILL_WORKER_PROCESSES", "2"))  # Max concurrent worker processes
+FILL_WORKER_MAX_JOBS = int(os.getenv("FILL_WORKER_MAX_JOBS", "25"))  # Jobs before a worker is recycled
+
+# Form links the server will open or download (host[:port], checked on every redirect hop too)
+FORM_URL_HOSTS = [h.strip().lower() for h in os.getenv("FORM_URL_HOSTS", "docs.google.com,forms.gle").split(",") if h.strip()]
+FORM_URL_ALLOW_HTTP = os.getenv("FORM_URL_ALLOW_HTTP", "false").lower() == "true"  # Local form stand-ins only
+
+# Admission control for POST /api/forms/fill
+FILL_MAX_CONCURRENT = int(os.getenv("FILL_MAX_CONCURRENT", "4"))  # Browsers running at once
+FILL_MAX_PER_USER = int(os.getenv("FILL_MAX_PER_USER", "2"))  # Queued + running per user
+FILL_MAX_QUEUE = int(os.getenv("FILL_MAX_QUEUE", "50"))  # Waiting jobs before 429
+FILL_ESTIMATED_SECONDS = float(os.getenv("FILL_ESTIMATED_SECONDS", "45"))  # Initial duration estimate
+FILL_DEADLINE_SECONDS = float(os.getenv("FILL_DEADLINE_SECONDS", "300"))  # Wall clock per job once started; 0 = none
+# An active fill older than this is presumed abandoned (e.g. its server restarted) and no longer absorbs duplicates
+FILL_ACTIVE_STALE_SECONDS = float(os.getenv("FILL_ACTIVE_STALE_SECONDS", "3600"))
+FILL_CANCEL_GRACE_SECONDS = float(os.getenv("FILL_CANCEL_GRACE_SECONDS", "10"))  # Before a worker is killed
+
+# Per-user profile/learned-mapping snapshot cache for fill jobs
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "1000"))
+PROFILE_CACHE_MAX_BYTES = int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+
+# Learned-mapping compaction and retention
+MAPPING_COMPACTION_INTERVAL_MINUTES = int(os.getenv("MAPPING_COMPACTION_INTERVAL_MINUTES", "60"))  # 0 = disabled
+MAPPING_COMPACTION_USERS_PER_PASS = int(os.getenv("MAPPING_COMPACTION_USERS_PER_PASS", "50"))
+MAPPING_COMPACTION_BATCH = int(os.getenv("MAPPING_COMPACTION_BATCH", "500"))  # Max ids per delete/update
+MAPPING_AI_TTL_DAYS = int(os.getenv("MAPPING_AI_TTL_DAYS", "30"))
+MAPPING_AI_MIN_CONFIDENCE = int(os.getenv("MAPPING_AI_MIN_CONFIDENCE", "80"))  # AI rows below this expire
+MAPPING_MAX_PER_USER = int(os.getenv("MAPPING_MAX_PER_USER", "500"))
+
+# Observability
+# Prometheus-style histograms exposed on /metrics; per-job timings are always recorded
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+# Per-job CPU profile / Playwright trace capture on request ("profile": true on a fill)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))  # pyinstrument sampling interval
+PROFILE_ARTIFACT_TTL_HOURS = float(os.getenv("PROFILE_ARTIFACT_TTL_HOURS", "72"))
+PROFILE_ARTIFACT_MAX_BYTES = int(os.getenv("PROFILE_ARTIFACT_MAX_BYTES", str(15 * 1024 * 1024)))  # Under the 16 MB BSON limit
+
+# API responses larger than this are gzip-compressed (when the client accepts it)
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))  # Documents read and encoded per chunk of an export
 
 # Frontend
 FRONTEND_DIR = BASE_DIR.parent / "frontend"
@@ -1,8 +1,5 @@
-import motor.motor_asyncio
-from beanie import init_beanie
 from app.config import MONGODB_URL
-from app.models import User, UserProfile, FormHistory, LearnedMapping
-import asyncio
+from app.models import User, UserProfile, FormHistory, LearnedMapping, CanonicalQuestion, QuestionVote, JobArtifact
 
 # Global initialized flag
 _initialized = False
@@ -14,6 +11,10 @@ async def init_db():
         return
         
     try:
+        # Already loaded through beanie (app.models); the client itself is created on first request
+        import motor.motor_asyncio
+        from beanie import init_beanie
+
         # Standard Motor connection - works best on Vercel
         client = motor.motor_asyncio.AsyncIOMotorClient(
             MONGODB_URL,
@@ -28,7 +29,10 @@ async def init_db():
                 User,
                 UserProfile,
                 FormHistory,
-                LearnedMapping
+                LearnedMapping,
+                CanonicalQuestion,
+                QuestionVote,
+                JobArtifact,
             ]
         )
         _initialized = True
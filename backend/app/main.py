@@ -2,14 +2,15 @@ import os
 import sys
 from pathlib import Path
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 # --- Global Diagnostics ---
 STARTUP_ERROR = None
 try:
-    from app.config import CORS_ORIGINS
+    from app.config import CORS_ORIGINS, GZIP_MIN_BYTES
+    from app.utils.responses import FastJSONResponse, GZipMiddleware
     from app.database import init_db
     from app.routes import auth_routes, profile_routes, form_routes
 except Exception as e:
@@ -17,7 +18,10 @@ except Exception as e:
     STARTUP_ERROR = f"Startup Error: {str(e)}\n{traceback.format_exc()}"
 
 # Initialize FastAPI
-app = FastAPI(title="AutoFill-GForm Pro")
+app = FastAPI(
+    title="AutoFill-GForm Pro",
+    default_response_class=FastJSONResponse if not STARTUP_ERROR else JSONResponse,
+)
 
 # Enable CORS
 app.add_middleware(
@@ -27,6 +31,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if not STARTUP_ERROR:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
 
 # Fix for Vercel Static Pathing
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -47,6 +53,19 @@ async def db_session_middleware(request: Request, call_next):
             )
     return await call_next(request)
 
+@app.on_event("startup")
+async def start_background_jobs():
+    from app.config import MAPPING_COMPACTION_INTERVAL_MINUTES
+    if MAPPING_COMPACTION_INTERVAL_MINUTES > 0 and not STARTUP_ERROR:
+        import asyncio
+        from app.services.mapping_compaction import compaction_loop
+        asyncio.create_task(compaction_loop())
+
+@app.on_event("shutdown")
+async def shutdown_fill_workers():
+    from app.services.fill_worker import shutdown_worker_pool
+    shutdown_worker_pool()
+
 # Include API Routes
 if not STARTUP_ERROR:
     app.include_router(auth_routes.router)
@@ -59,6 +78,14 @@ if not STARTUP_ERROR:
 async def ping():
     return {"status": "alive", "db": "connected", "error": STARTUP_ERROR}
 
+@app.get("/metrics")
+async def metrics():
+    from app.config import METRICS_ENABLED
+    from app.utils.metrics import render_metrics
+    if not METRICS_ENABLED:
+        return HTMLResponse("404 Not Found", status_code=404)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     path = FRONTEND_DIR / "index.html"
@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 from beanie import Document, Indexed
 from pydantic import Field, EmailStr
+from pymongo import IndexModel, ASCENDING, DESCENDING
 
 
 class User(Document):
@@ -41,6 +42,10 @@ class UserProfile(Document):
     # Extra fields for flexibility
     extra_fields: Dict[str, Any] = Field(default_factory=dict)
 
+    # LLM answers per question intent, generated after a profile save (answer_precompute)
+    precomputed_answers: Dict[str, str] = Field(default_factory=dict)
+    precomputed_for: Optional[datetime] = None  # updated_at the answers were generated from
+
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -53,30 +58,105 @@ class FormHistory(Document):
     user_id: Indexed(str)
     form_url: str
     form_title: str = ""
-    status: str = "pending"  # pending, filling, completed, failed
+    status: str = "pending"  # pending, queued, filling, completed, failed, cancelled, timed_out
     questions_detected: int = 0
     questions_filled: int = 0
     ai_answers_used: int = 0
+    auto_submit: bool = False  # Requested; auto_submitted records whether it happened
     auto_submitted: bool = False
+    mode: str = "browser"  # "browser" or "prefill" (prefilled link only, nothing submitted)
+    prefilled_url: str = ""
     error_message: str = ""
     fill_log: List[Dict[str, Any]] = Field(default_factory=list)
+    timings: Dict[str, float] = Field(default_factory=dict)  # Seconds spent per pipeline stage
+    asset_cache: Dict[str, float] = Field(default_factory=dict)  # Static asset requests, hits, hit_ratio, bytes_saved
+    # Last per-page checkpoint {"page_index", "answers": {question: [answer, source]}}; cleared on success
+    checkpoint: Optional[Dict[str, Any]] = None
+    attempts: int = 1
+    # Set only while queued/filling: one active job per (user, URL, options), see form_routes.active_key()
+    active_key: Optional[str] = None
+    active_since: Optional[datetime] = None
+    idempotency_key: Optional[str] = None  # Client's Idempotency-Key header, unique per user
+    profiling: Optional[Dict[str, bool]] = None  # {"trace": bool} when the job runs under the profiler
+    artifacts: List[Dict[str, Any]] = Field(default_factory=list)  # JobArtifact refs: id, kind, filename, size, expires_at
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
     class Settings:
         name = "autofill_history"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),  # History pages and exports
+            IndexModel([("active_key", ASCENDING)], unique=True,
+                       partialFilterExpression={"active_key": {"$type": "string"}}),
+            IndexModel([("user_id", ASCENDING), ("idempotency_key", ASCENDING)], unique=True,
+                       partialFilterExpression={"idempotency_key": {"$type": "string"}}),
+        ]
 
 
 class LearnedMapping(Document):
     """Learned question-to-field mappings for smarter future filling."""
     user_id: Indexed(str)
     question_text: str
+    question_key: str = ""  # canonicalize_question(question_text); "" on rows not yet compacted
     matched_field: str  # Profile field name or "ai_generated"
     answer_value: str = ""
     confidence: int = 100  # 0-100
     times_used: int = 1
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: Optional[datetime] = None  # Last fill that used the answer; None on rows written before it existed
 
     class Settings:
         name = "autofill_knowledge"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("question_key", ASCENDING)]),
+        ]
+
+
+class CanonicalQuestion(Document):
+    """Cross-user knowledge: which profile field a canonical question maps to (no answer values)."""
+    question_key: Indexed(str, unique=True)  # canonicalize_question(question_text)
+    question_text: str  # First wording seen, used for the embedding index
+    field_votes: Dict[str, int] = Field(default_factory=dict)  # Profile field -> users confirming it
+    total_votes: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "autofill_canonical_questions"
+        indexes = [
+            IndexModel([("total_votes", ASCENDING)]),
+            IndexModel([("updated_at", ASCENDING)]),
+        ]
+
+
+class QuestionVote(Document):
+    """One user's vote in CanonicalQuestion.field_votes: the field they last confirmed for the question."""
+    question_key: str
+    user_id: str
+    field: str
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "autofill_question_votes"
+        indexes = [
+            IndexModel([("question_key", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        ]
+
+
+class JobArtifact(Document):
+    """Profiling output of one fill job (CPU profile or Playwright trace); MongoDB drops it at expires_at."""
+    user_id: Indexed(str)
+    history_id: str
+    kind: str  # "cpu_profile" or "playwright_trace"
+    filename: str
+    content_type: str
+    data: bytes  # Compressed (gzip, or the trace's own zip)
+    size: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "autofill_job_artifacts"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -2,93 +2,397 @@
 Async Form filling routes for MongoDB/Beanie.
 """
 import asyncio
-from datetime import datetime
-from typing import List
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from app.models import User, UserProfile, FormHistory, LearnedMapping
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header, Query, Response
+from pymongo.errors import DuplicateKeyError
+from app.models import User, FormHistory, LearnedMapping, JobArtifact
 from app.schemas import FormFillRequest, FormFillStatusResponse, FormHistoryResponse, LearnedMappingResponse
 from app.auth import get_current_user
-from app.services.form_filler import FormFillerEngine
-from app.services.ai_agent import get_profile_as_dict
+from app.config import FILL_DEADLINE_SECONDS, FILL_ACTIVE_STALE_SECONDS, PROFILING_ENABLED, EXPORT_BATCH_SIZE
+from app.services.admission import admission, AdmissionRejected, Ticket
+from app.services.fill_worker import run_fill, run_prefill, FillWorkerCrashed
+from app.services.fill_log import LogClock
+from app.services.form_filler import learned_key
+from app.services.prefill import PrefillError, check_form_url
+from app.services.mapping_compaction import compact_user_mappings
+from app.services.profile_cache import get_fill_snapshot, bump_version
+from app.services.question_kb import record_mappings
+from app.utils.metrics import span, bind_job_timings, unbind_job_timings, FILL_DURATION, QUEUE_WAIT
+from app.utils.export import date_range, export_response
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api/forms", tags=["Forms"])
 
 
-async def _run_form_fill(user_id: str, form_url: str, auto_submit: bool, history_id: str):
-    """Async Background task to run form filling."""
-    try:
-        # Get profile
-        profile = await UserProfile.find_one(UserProfile.user_id == user_id)
-        if not profile:
-            history = await FormHistory.get(history_id)
-            if history:
-                await history.set({
-                    "status": "failed",
-                    "error_message": "No profile found. Please set up your profile first.",
-                    "completed_at": datetime.utcnow()
-                })
-            return
+PROGRESS_WRITE_INTERVAL = 2.0  # seconds; matches the dashboard polling interval
+ACTIVE_STATUSES = ("queued", "filling")
+RESUMABLE_STATUSES = ("failed", "cancelled", "timed_out")
+CANCEL_WAIT_SECONDS = 5.0  # How long DELETE waits for the job to wind down before answering
 
-        # Prepare data for engine
-        profile_data = get_profile_as_dict(profile)
+# Fill tasks of this API process by history id, for cancellation
+_active_fills: Dict[str, "asyncio.Task"] = {}
 
-        # Get learned mappings
-        mappings = await LearnedMapping.find(LearnedMapping.user_id == user_id).to_list()
-        learned = {m.question_text: m.answer_value for m in mappings}
 
-        # Run form filler engine
-        engine = FormFillerEngine(profile_data, learned)
-        result = await engine.fill_form(form_url, auto_submit)
+def _model_defaults(model) -> Dict[str, Any]:
+    return {name: field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items() if not field.is_required()}
 
-        # Update history
-        history = await FormHistory.get(history_id)
-        if history:
-            await history.set({
-                "status": result["status"],
-                "form_title": result["form_title"],
-                "questions_detected": result["questions_detected"],
-                "questions_filled": result["questions_filled"],
-                "ai_answers_used": result["ai_answers_used"],
-                "auto_submitted": result["auto_submitted"],
-                "error_message": result.get("error_message", ""),
-                "fill_log": result["fill_log"],
-                "completed_at": datetime.utcnow()
+
+# Raw-document reads for the polled/listing endpoints: projected (no checkpoint answers),
+# not validated, serialised straight to JSON. Defaults fill fields missing on older rows.
+_COMPUTED_STATUS_FIELDS = ("id", "pages_completed", "queue_position", "estimated_start_at")
+_STATUS_PROJECTION = {
+    **{name: 1 for name in FormFillStatusResponse.model_fields if name not in _COMPUTED_STATUS_FIELDS},
+    "checkpoint.page_index": 1,
+}
+_STATUS_DEFAULTS = _model_defaults(FormFillStatusResponse)
+_MAPPING_PROJECTION = {name: 1 for name in LearnedMappingResponse.model_fields if name != "id"}
+_MAPPING_DEFAULTS = _model_defaults(LearnedMappingResponse)
+# Export columns (CSV) / fields (NDJSON also carries each fill's fill_log and timings)
+_HISTORY_EXPORT_COLUMNS = (
+    "id", "created_at", "completed_at", "status", "mode", "form_title", "form_url", "questions_detected",
+    "questions_filled", "ai_answers_used", "auto_submitted", "prefilled_url", "error_message", "attempts",
+)
+_MAPPING_EXPORT_COLUMNS = (
+    "id", "question_text", "question_key", "matched_field", "answer_value", "confidence", "times_used",
+    "created_at", "updated_at", "last_used_at",
+)
+
+
+def _progress_writer(history_id: str):
+    """
+    Build a progress callback that mirrors live counts and log entries into
+    FormHistory (throttled). Each write appends only the entries logged since
+    the previous one; the final result replaces the live log.
+    """
+    # The engine's monotonic timestamps are system-wide, so a clock anchored here maps them the same way
+    state = {"last_write": 0.0, "pending": [], "clock": LogClock()}
+
+    async def on_progress(progress: dict):
+        state["pending"].append(progress["entry"])
+        now = time.perf_counter()
+        if now - state["last_write"] < PROGRESS_WRITE_INTERVAL:
+            return
+        state["last_write"] = now
+        entries, state["pending"] = state["pending"], []
+        # Conditional on status so a late progress write never overwrites the final result
+        await FormHistory.find_one(
+            FormHistory.id == PydanticObjectId(history_id),
+            FormHistory.status == "filling",
+        ).update({
+            "$set": {
+                "questions_detected": progress["questions_detected"],
+                "questions_filled": progress["questions_filled"],
+            },
+            "$push": {"fill_log": {"$each": [entry.to_dict(state["clock"]) for entry in entries]}},
+        })
+
+    return on_progress
+
+
+async def _save_mappings(user_id: str, mappings: List[Dict[str, Any]]):
+    """Upsert learned mappings by canonical question and invalidate the user's snapshot."""
+    for m_data in mappings:
+        question_key = learned_key(m_data["question"])
+        existing = await LearnedMapping.find_one({
+            "user_id": user_id,
+            "$or": [{"question_key": question_key}, {"question_text": m_data["question"]}],
+        })
+        if existing:
+            now = datetime.utcnow()
+            await existing.set({
+                "question_key": question_key,
+                "answer_value": m_data["value"],
+                "matched_field": m_data["field"],
+                "confidence": m_data["confidence"],
+                "times_used": existing.times_used + 1,
+                "updated_at": now,
+                "last_used_at": now,
             })
+        else:
+            new_map = LearnedMapping(
+                user_id=user_id,
+                question_text=m_data["question"],
+                question_key=question_key,
+                matched_field=m_data["field"],
+                answer_value=m_data["value"],
+                confidence=m_data["confidence"],
+                last_used_at=datetime.utcnow(),
+            )
+            await new_map.insert()
+    if mappings:
+        bump_version(user_id)
+        await record_mappings(user_id, mappings)
+
+
+async def _record_learned_use(user_id: str, questions: List[str]):
+    """Count a use of each learned answer a fill reused (usage ranks and retains mappings, see mapping_compaction)."""
+    if not questions:
+        return
+    keys = list({learned_key(q) for q in questions})
+    await LearnedMapping.get_motor_collection().update_many(
+        # question_text for rows whose question_key compaction has not backfilled yet
+        {"user_id": user_id, "$or": [{"question_key": {"$in": keys}}, {"question_text": {"$in": questions}}]},
+        {"$inc": {"times_used": 1}, "$set": {"last_used_at": datetime.utcnow()}},
+    )
 
-        # Save new learned mappings
-        for m_data in result.get("new_mappings", []):
-            existing = await LearnedMapping.find_one(
-                LearnedMapping.user_id == user_id,
-                LearnedMapping.question_text == m_data["question"]
+
+def _checkpoint_writer(user_id: str, history_id: str, latest: Dict[str, Any]):
+    """Build a checkpoint callback: flush the page's new mappings, then store the checkpoint."""
+
+    async def on_checkpoint(checkpoint: dict):
+        await _save_mappings(user_id, checkpoint["new_mappings"])
+        latest["page_index"] = checkpoint["page_index"]
+        latest["answers"] = checkpoint["answers"]
+        await FormHistory.find_one(
+            FormHistory.id == PydanticObjectId(history_id),
+            FormHistory.status == "filling",
+        ).update({"$set": {"checkpoint": dict(latest)}})
+
+    return on_checkpoint
+
+
+async def _run_form_fill(user_id: str, form_url: str, auto_submit: bool, history_id: str, ticket: Optional[Ticket],
+                         resume: Optional[Dict[str, Any]] = None, mode: str = "browser",
+                         profiling: Optional[Dict[str, bool]] = None):
+    """Async Background task: run the fill as a cancellable task registered under its history id."""
+    task = asyncio.ensure_future(
+        _admit_and_fill(user_id, form_url, auto_submit, history_id, ticket, resume, mode, profiling)
+    )
+    _active_fills[history_id] = task
+    try:
+        await asyncio.wait({task})
+    finally:
+        _active_fills.pop(history_id, None)
+
+
+async def _admit_and_fill(user_id: str, form_url: str, auto_submit: bool, history_id: str, ticket: Optional[Ticket],
+                          resume: Optional[Dict[str, Any]] = None, mode: str = "browser",
+                          profiling: Optional[Dict[str, bool]] = None):
+    """Wait for a browser slot (prefill jobs need none), then fill within FILL_DEADLINE_SECONDS."""
+    try:
+        queue_wait = 0.0
+        if ticket is not None:
+            was_queued = not ticket.granted
+            await admission.wait(ticket)
+            queue_wait = time.perf_counter() - ticket.enqueued_at
+            QUEUE_WAIT.observe(queue_wait)
+            if was_queued:
+                await FormHistory.find_one(
+                    FormHistory.id == PydanticObjectId(history_id),
+                    FormHistory.status == "queued",
+                ).update({"$set": {"status": "filling"}})
+        await asyncio.wait_for(
+            _fill_and_record(user_id, form_url, auto_submit, history_id, queue_wait, resume, mode, profiling),
+            FILL_DEADLINE_SECONDS if FILL_DEADLINE_SECONDS > 0 else None,
+        )
+    except asyncio.TimeoutError:
+        await _finish_history(history_id, "timed_out", f"Form filling exceeded the {FILL_DEADLINE_SECONDS:.0f}s limit.")
+    except asyncio.CancelledError:
+        await _finish_history(history_id, "cancelled", "Cancelled by user.")
+        raise
+    finally:
+        if ticket is not None:
+            admission.release(ticket)
+
+
+async def _finish_history(history_id: str, status: str, error_message: str, **fields):
+    """Record a terminal status (and any extra `fields`) for a job that is still queued or filling."""
+    await FormHistory.find_one(
+        FormHistory.id == PydanticObjectId(history_id),
+        {"status": {"$in": list(ACTIVE_STATUSES)}},
+    ).update({"$set": {
+        "status": status,
+        "error_message": error_message,
+        "active_key": None,
+        "completed_at": datetime.utcnow(),
+        **fields,
+    }})
+
+
+async def _fill_and_record(user_id: str, form_url: str, auto_submit: bool, history_id: str, queue_wait: float,
+                           resume: Optional[Dict[str, Any]] = None, mode: str = "browser",
+                           profiling: Optional[Dict[str, bool]] = None):
+    """
+    Run the fill (or build the prefilled link) and persist the result, learned mappings,
+    timings and, for profiled jobs, the profiling artefacts.
+    Mappings are flushed page by page with the checkpoints; if the worker process
+    dies, the job is resumed once from the last checkpoint.
+    """
+    started_at = time.perf_counter()
+    timings = {"queue_wait": round(queue_wait, 4)}
+    timings_token = bind_job_timings(timings)
+    try:
+        # Profile dict + learned-mapping index (cached per user, invalidated on writes)
+        with span("db_load"):
+            snapshot = await get_fill_snapshot(user_id)
+        if not snapshot:
+            await _finish_history(history_id, "failed", "No profile found. Please set up your profile first.")
+            return
+
+        profile_data = snapshot.profile
+        learned = snapshot.learned
+
+        # Run form filler engine (inline or in a worker process)
+        checkpoint = dict(resume or {})
+        if mode == "prefill":
+            result = await run_prefill(
+                profile_data, learned, form_url, _progress_writer(history_id),
+                user_fields=snapshot.user_fields(user_id),
+                precomputed=snapshot.precomputed,
+                profiling=profiling,
             )
-            if existing:
-                await existing.set({
-                    "answer_value": m_data["value"],
-                    "matched_field": m_data["field"],
-                    "confidence": m_data["confidence"],
-                    "times_used": existing.times_used + 1,
-                    "updated_at": datetime.utcnow()
-                })
-            else:
-                new_map = LearnedMapping(
-                    user_id=user_id,
-                    question_text=m_data["question"],
-                    matched_field=m_data["field"],
-                    answer_value=m_data["value"],
-                    confidence=m_data["confidence"]
-                )
-                await new_map.insert()
+        else:
+            for attempt in range(2):
+                try:
+                    result = await run_fill(
+                        profile_data, learned, form_url, auto_submit,
+                        _progress_writer(history_id),
+                        _checkpoint_writer(user_id, history_id, checkpoint),
+                        resume=checkpoint or None,
+                        user_fields=snapshot.user_fields(user_id),
+                        precomputed=snapshot.precomputed,
+                        profiling=profiling,
+                    )
+                    break
+                except FillWorkerCrashed as e:
+                    if attempt:
+                        raise
+                    print(f"♻️ {e}; resuming after page {checkpoint.get('page_index', 0)}")
+        for stage, secs in result.get("timings", {}).items():
+            timings[stage] = round(timings.get(stage, 0.0) + secs, 4)
+
+        # Save learned mappings not yet flushed by a checkpoint
+        with span("db_save"):
+            await _save_mappings(user_id, result.get("new_mappings", []))
+            await _record_learned_use(user_id, result.get("learned_used", []))
+        history_set = {}
+        if result.get("profile_artifacts"):
+            from app.services.job_profiler import store_artifacts
+            history_set["artifacts"] = await store_artifacts(user_id, history_id, result.pop("profile_artifacts"))
+
+        # Update history
+        timings["total"] = round(time.perf_counter() - started_at, 4)
+        FILL_DURATION.observe(timings["total"])
+        # Conditional so a fill cancelled from another API process keeps its cancelled status
+        await FormHistory.find_one(
+            FormHistory.id == PydanticObjectId(history_id),
+            FormHistory.status == "filling",
+        ).update({"$set": {
+            "status": result["status"],
+            "form_title": result["form_title"],
+            "questions_detected": result["questions_detected"],
+            "questions_filled": result["questions_filled"],
+            "ai_answers_used": result["ai_answers_used"],
+            "auto_submitted": result["auto_submitted"],
+            "prefilled_url": result.get("prefilled_url", ""),
+            "error_message": result.get("error_message", ""),
+            "fill_log": result["fill_log"],
+            "timings": timings,
+            "asset_cache": result.get("asset_cache", {}),
+            "checkpoint": None if result["status"] == "completed" else (checkpoint or None),
+            "active_key": None,
+            "completed_at": datetime.utcnow(),
+            **history_set,
+        }})
 
     except Exception as e:
         print(f"❌ Background Fill Error: {e}")
-        history = await FormHistory.get(history_id)
-        if history:
-            await history.set({
-                "status": "failed",
-                "error_message": str(e),
-                "completed_at": datetime.utcnow()
-            })
+        # Conditional like every terminal write: a cancel or timeout that won the race keeps its status
+        await _finish_history(history_id, "failed", str(e), timings=timings)
+    finally:
+        unbind_job_timings(timings_token)
+
+
+def active_key(user_id: str, form_url: str, auto_submit: bool, mode: str,
+               profiling: Optional[Dict[str, bool]] = None) -> str:
+    """Identity of a fill request; at most one queued/filling FormHistory holds it (unique partial index)."""
+    raw = f"{user_id}|{mode}|{int(auto_submit)}|{form_url.strip()}"
+    if profiling:
+        raw += "|profile+trace" if profiling.get("trace") else "|profile"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def _active_job(key: str) -> Optional[FormHistory]:
+    """
+    The queued/filling job holding `key`. One active for longer than FILL_ACTIVE_STALE_SECONDS
+    (its API process died before recording an outcome) is closed as failed and not returned.
+    """
+    history = await FormHistory.find_one(FormHistory.active_key == key)
+    if history is None:
+        return None
+    stale_before = datetime.utcnow() - timedelta(seconds=FILL_ACTIVE_STALE_SECONDS)
+    if (history.active_since or history.created_at) > stale_before:
+        return history
+    await FormHistory.find_one(
+        FormHistory.id == history.id,
+        FormHistory.active_key == key,
+    ).update({"$set": {
+        "status": "failed",
+        "error_message": "Abandoned: no result was recorded for this fill.",
+        "active_key": None,
+        "completed_at": datetime.utcnow(),
+    }})
+    print(f"🧹 Closed abandoned fill {history.id}")
+    return None
+
+
+async def _existing_job(user_id: str, key: str, idempotency_key: Optional[str]) -> Optional[FormHistory]:
+    """The job a fill request coalesces into: same Idempotency-Key first, then the same active request."""
+    if idempotency_key:
+        history = await FormHistory.find_one(
+            FormHistory.user_id == user_id,
+            FormHistory.idempotency_key == idempotency_key,
+        )
+        if history is not None:
+            return history
+    return await _active_job(key)
+
+
+def _check_same_request(history: FormHistory, data: FormFillRequest, auto_submit: bool,
+                        profiling: Optional[Dict[str, bool]]):
+    """An Idempotency-Key may only be replayed with the request it was first used for."""
+    if (history.form_url, history.auto_submit, history.mode, history.profiling) != \
+            (data.form_url, auto_submit, data.mode, profiling):
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+
+
+def _admit(user_id: str) -> Ticket:
+    """Reserve a browser slot or queue place for the user, or answer 429."""
+    try:
+        return admission.admit(user_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+def _status_response(history: FormHistory) -> FormFillStatusResponse:
+    """Status payload with live queue position / estimated start for queued jobs."""
+    data = history.model_dump(exclude={"id"})
+    history_id = str(history.id)
+    return FormFillStatusResponse(
+        _id=history_id,
+        **data,
+        pages_completed=(history.checkpoint or {}).get("page_index", 0),
+        queue_position=admission.queue_position(history_id),
+        estimated_start_at=admission.estimated_start(history_id),
+    )
+
+
+def _status_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """FormFillStatusResponse-shaped dict from a raw FormHistory document (see _STATUS_PROJECTION)."""
+    history_id = str(doc.pop("_id"))
+    checkpoint = doc.pop("checkpoint", None) or {}
+    row = {**_STATUS_DEFAULTS, **doc}
+    row["_id"] = history_id
+    row["pages_completed"] = checkpoint.get("page_index", 0)
+    row["queue_position"] = admission.queue_position(history_id)
+    row["estimated_start_at"] = admission.estimated_start(history_id)
+    return row
 
 
 @router.post("/fill", response_model=FormFillStatusResponse)
@@ -96,51 +400,206 @@ async def start_form_fill(
     data: FormFillRequest,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
 ):
-    """Start filling a Google Form using MongoDB."""
-    # Validate form URL
-    if "docs.google.com/forms" not in data.form_url:
-        raise HTTPException(status_code=400, detail="Invalid Google Form URL.")
+    """
+    Start filling a Google Form using MongoDB.
+    A request identical to one still queued or filling (same user, URL, auto_submit, mode and profiling),
+    or replaying an earlier Idempotency-Key, returns that job instead of starting another.
+    """
+    # Validate form URL: the server downloads it (prefill) or opens it in Chromium
+    try:
+        check_form_url(data.form_url)
+    except PrefillError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if data.profile and not PROFILING_ENABLED:
+        raise HTTPException(status_code=400, detail="Job profiling is disabled on this server.")
+
+    user_id = str(current_user.id)
+    prefill = data.mode == "prefill"
+    auto_submit = data.auto_submit and not prefill
+    profiling = {"trace": data.trace and not prefill} if data.profile else None
+    key = active_key(user_id, data.form_url, auto_submit, data.mode, profiling)
+
+    # Coalesce double-clicks and client retries
+    existing = await _existing_job(user_id, key, idempotency_key)
+    if existing is not None:
+        if idempotency_key and existing.idempotency_key == idempotency_key:
+            _check_same_request(existing, data, auto_submit, profiling)
+        return _status_response(existing)
 
     # Check profile exists
-    profile = await UserProfile.find_one(UserProfile.user_id == str(current_user.id))
-    if not profile or not profile.full_name:
+    snapshot = await get_fill_snapshot(user_id)
+    if not snapshot or not snapshot.profile["full_name"]:
         raise HTTPException(status_code=400, detail="Please set up your profile before filling forms.")
 
-    # Create history entry
+    # Reserve a browser slot or a queue place (prefilled links need no browser)
+    ticket = None if prefill else _admit(user_id)
+
+    # Create history entry; the unique indexes settle races with other requests/API processes
     history = FormHistory(
-        user_id=str(current_user.id),
+        user_id=user_id,
         form_url=data.form_url,
-        status="filling",
-        auto_submitted=data.auto_submit,
+        status="queued" if ticket and not ticket.granted else "filling",
+        auto_submit=auto_submit,
+        auto_submitted=auto_submit,
+        mode=data.mode,
+        active_key=key,
+        active_since=datetime.utcnow(),
+        idempotency_key=idempotency_key or None,
+        profiling=profiling,
     )
-    await history.insert()
+    try:
+        await history.insert()
+    except Exception as e:
+        if ticket is not None:
+            admission.release(ticket)
+        if not isinstance(e, DuplicateKeyError):
+            raise
+        existing = await _existing_job(user_id, key, idempotency_key)
+        if existing is None:
+            raise HTTPException(status_code=409, detail="An identical fill was just started; please try again.")
+        if idempotency_key and existing.idempotency_key == idempotency_key:
+            _check_same_request(existing, data, auto_submit, profiling)
+        return _status_response(existing)
+    if ticket is not None:
+        ticket.history_id = str(history.id)
 
     # Run in background
     background_tasks.add_task(
         _run_form_fill,
         str(current_user.id),
         data.form_url,
-        data.auto_submit,
+        history.auto_submit,
         str(history.id),
+        ticket,
+        mode=data.mode,
+        profiling=profiling,
     )
 
-    return history
+    return _status_response(history)
 
 
-@router.get("/status/{history_id}", response_model=FormFillStatusResponse)
-async def get_fill_status(
+@router.post("/fill/{history_id}/retry", response_model=FormFillStatusResponse)
+async def retry_form_fill(
     history_id: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
 ):
-    """Check fill status in MongoDB."""
+    """Resume a failed fill: pages covered by its last checkpoint reuse their answers."""
+    history = await FormHistory.find_one(
+        FormHistory.id == history_id,
+        FormHistory.user_id == str(current_user.id)
+    )
+    if not history:
+        raise HTTPException(status_code=404, detail="Fill record not found")
+    if history.status not in RESUMABLE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"A {history.status} fill cannot be resumed.")
+
+    ticket = None if history.mode == "prefill" else _admit(str(current_user.id))
+    if ticket is not None:
+        ticket.history_id = str(history.id)
+
+    try:
+        await history.set({
+            "status": "queued" if ticket and not ticket.granted else "filling",
+            "error_message": "",
+            "fill_log": [],  # The new attempt's progress writes append to it
+            "attempts": history.attempts + 1,
+            "active_key": active_key(history.user_id, history.form_url, history.auto_submit, history.mode,
+                                     history.profiling),
+            "active_since": datetime.utcnow(),
+            "completed_at": None,
+        })
+    except Exception as e:
+        if ticket is not None:
+            admission.release(ticket)
+        if isinstance(e, DuplicateKeyError):
+            raise HTTPException(status_code=409, detail="An identical fill is already queued or running.")
+        raise
+
+    background_tasks.add_task(
+        _run_form_fill,
+        str(current_user.id),
+        history.form_url,
+        history.auto_submit,
+        str(history.id),
+        ticket,
+        history.checkpoint,
+        history.mode,
+        history.profiling,
+    )
+
+    return _status_response(history)
+
+
+@router.delete("/fill/{history_id}", response_model=FormFillStatusResponse)
+async def cancel_form_fill(
+    history_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Cancel a queued or running fill; its browser context is closed and its slot freed."""
     history = await FormHistory.find_one(
         FormHistory.id == history_id,
         FormHistory.user_id == str(current_user.id)
     )
     if not history:
         raise HTTPException(status_code=404, detail="Fill record not found")
-    return history
+    if history.status not in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"A {history.status} fill cannot be cancelled.")
+
+    task = _active_fills.get(history_id)
+    if task is not None:
+        task.cancel()
+        await asyncio.wait({task}, timeout=CANCEL_WAIT_SECONDS)
+    else:
+        # No task in this process (e.g. lost in a restart): just close the record
+        await _finish_history(history_id, "cancelled", "Cancelled by user.")
+
+    history = await FormHistory.get(history_id)
+    return _status_response(history)
+
+
+@router.get("/fill/{history_id}/artifacts/{artifact_id}")
+async def download_artifact(
+    history_id: str,
+    artifact_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Download a profiled job's CPU profile or Playwright trace until it expires."""
+    artifact = None
+    if PydanticObjectId.is_valid(artifact_id):
+        artifact = await JobArtifact.find_one(
+            JobArtifact.id == PydanticObjectId(artifact_id),
+            JobArtifact.history_id == history_id,
+            JobArtifact.user_id == str(current_user.id),
+        )
+    # The TTL monitor runs about once a minute; don't serve what is already past its expiry
+    if not artifact or artifact.expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+    return Response(
+        content=artifact.data,
+        media_type=artifact.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{artifact.filename}"'},
+    )
+
+
+@router.get("/status/{history_id}", response_model=FormFillStatusResponse)
+async def get_fill_status(
+    history_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Check fill status in MongoDB."""
+    doc = None
+    if PydanticObjectId.is_valid(history_id):
+        doc = await FormHistory.get_motor_collection().find_one(
+            {"_id": PydanticObjectId(history_id), "user_id": str(current_user.id)},
+            _STATUS_PROJECTION,
+        )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Fill record not found")
+    return FastJSONResponse(_status_row(doc))
 
 
 @router.get("/history", response_model=FormHistoryResponse)
@@ -150,10 +609,54 @@ async def get_form_history(
     limit: int = 20,
 ):
     """Get history from MongoDB."""
-    query = FormHistory.find(FormHistory.user_id == str(current_user.id))
-    total = await query.count()
-    items = await query.sort("-created_at").skip(skip).limit(limit).to_list()
-    return FormHistoryResponse(items=items, total=total)
+    collection = FormHistory.get_motor_collection()
+    query = {"user_id": str(current_user.id)}
+    total = await collection.count_documents(query)
+    cursor = collection.find(query, _STATUS_PROJECTION).sort("created_at", -1).skip(skip).limit(limit)
+    items = [_status_row(doc) for doc in await cursor.to_list(length=None)]
+    return FastJSONResponse({"items": items, "total": total})
+
+
+def _export_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+@router.get("/history/export")
+async def export_history(
+    current_user: User = Depends(get_current_user),
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+):
+    """Stream the user's fill history (created in [since, until)) as NDJSON or CSV, oldest first."""
+    query = {"user_id": str(current_user.id), **date_range("created_at", since, until)}
+    fields = _HISTORY_EXPORT_COLUMNS[1:] + (("fill_log", "timings") if fmt == "ndjson" else ())
+    cursor = FormHistory.get_motor_collection().find(
+        query, {name: 1 for name in fields}, batch_size=EXPORT_BATCH_SIZE,
+    ).sort("created_at", 1)
+    return export_response(cursor, fmt, "autofill-history", _export_row, _HISTORY_EXPORT_COLUMNS, gzip)
+
+
+@router.get("/mappings/export")
+async def export_mappings(
+    current_user: User = Depends(get_current_user),
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+):
+    """Stream the user's learned mappings (last used in [since, until)) as NDJSON or CSV."""
+    query = {"user_id": str(current_user.id)}
+    last_used = date_range("last_used_at", since, until)
+    if last_used:
+        # Rows written before last_used_at existed were last used when last updated
+        query["$or"] = [last_used, {"last_used_at": None, **date_range("updated_at", since, until)}]
+    cursor = LearnedMapping.get_motor_collection().find(
+        query, {name: 1 for name in _MAPPING_EXPORT_COLUMNS[1:]}, batch_size=EXPORT_BATCH_SIZE,
+    ).sort("_id", 1)
+    return export_response(cursor, fmt, "autofill-mappings", _export_row, _MAPPING_EXPORT_COLUMNS, gzip)
 
 
 @router.get("/mappings", response_model=List[LearnedMappingResponse])
@@ -161,10 +664,20 @@ async def get_learned_mappings(
     current_user: User = Depends(get_current_user),
 ):
     """Get all mappings from MongoDB."""
-    mappings = await LearnedMapping.find(
-        LearnedMapping.user_id == str(current_user.id)
-    ).sort("-times_used").to_list()
-    return mappings
+    cursor = LearnedMapping.get_motor_collection().find(
+        {"user_id": str(current_user.id)}, _MAPPING_PROJECTION,
+    ).sort("times_used", -1)
+    rows = [{**_MAPPING_DEFAULTS, **doc, "_id": str(doc["_id"])} for doc in await cursor.to_list(length=None)]
+    return FastJSONResponse(rows)
+
+
+@router.post("/mappings/compact")
+async def compact_mappings(
+    current_user: User = Depends(get_current_user),
+):
+    """Merge duplicate, expire stale and cap the current user's learned mappings."""
+    stats = await compact_user_mappings(str(current_user.id))
+    return {"message": f"Removed {stats['removed']} mappings", **stats}
 
 
 @router.delete("/mappings/{mapping_id}")
@@ -180,4 +693,5 @@ async def delete_mapping(
     if not mapping:
         raise HTTPException(status_code=404, detail="Mapping not found")
     await mapping.delete()
+    bump_version(str(current_user.id))
     return {"message": "Mapping deleted"}
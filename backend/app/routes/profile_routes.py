@@ -6,10 +6,17 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.models import User, UserProfile
 from app.schemas import ProfileCreate, ProfileUpdate, ProfileResponse
 from app.auth import get_current_user
+from app.services.profile_cache import bump_version
+from app.services.answer_precompute import schedule_precompute
 
 router = APIRouter(prefix="/api/profile", tags=["Profile"])
 
 
+def _profile_response(profile: UserProfile) -> ProfileResponse:
+    """Response model with the ObjectId as a string (the document's own dump keeps the ObjectId)."""
+    return ProfileResponse(_id=str(profile.id), **profile.model_dump(exclude={"id"}))
+
+
 @router.get("/", response_model=ProfileResponse)
 async def get_profile(
     current_user: User = Depends(get_current_user),
@@ -21,9 +28,7 @@ async def get_profile(
         profile = UserProfile(user_id=str(current_user.id), email=current_user.email)
         await profile.insert()
     
-    # Map _id manually for the response model if necessary (handled by alias)
-    # We return the object directly; Beanie/Pydantic v2 handles alias automatically
-    return profile
+    return _profile_response(profile)
 
 
 @router.post("/", response_model=ProfileResponse)
@@ -43,8 +48,10 @@ async def create_or_update_profile(
         # Create new
         profile = UserProfile(user_id=str(current_user.id), **data.model_dump())
         await profile.insert()
+    bump_version(str(current_user.id))
+    schedule_precompute(str(current_user.id))
         
-    return profile
+    return _profile_response(profile)
 
 
 @router.put("/", response_model=ProfileResponse)
@@ -60,5 +67,7 @@ async def update_profile(
     update_data = data.model_dump(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     await profile.set(update_data)
+    bump_version(str(current_user.id))
+    schedule_precompute(str(current_user.id))
     
-    return profile
+    return _profile_response(profile)
@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation (MongoDB compatible).
 """
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from datetime import datetime
 
 
@@ -85,6 +85,11 @@ class ProfileResponse(BaseModel):
 class FormFillRequest(BaseModel):
     form_url: str = Field(..., min_length=10)
     auto_submit: bool = False
+    # "prefill": return a prefilled link for the user to review and submit, without a browser
+    mode: Literal["browser", "prefill"] = "browser"
+    # Run the job under a CPU profiler; `trace` also records a Playwright trace (browser mode)
+    profile: bool = False
+    trace: bool = False
 
 
 class FormFillStatusResponse(BaseModel):
@@ -96,8 +101,17 @@ class FormFillStatusResponse(BaseModel):
     questions_filled: int
     ai_answers_used: int
     auto_submitted: bool
+    mode: str = "browser"
+    prefilled_url: str = ""
     error_message: str
     fill_log: List[Any]
+    timings: dict = {}
+    asset_cache: dict = {}
+    artifacts: List[dict] = []  # Profiling artefacts: id, kind, filename, size, expires_at
+    pages_completed: int = 0  # From the last checkpoint; a failed fill resumes after these
+    attempts: int = 1
+    queue_position: Optional[int] = None  # 1-based, only while status == "queued"
+    estimated_start_at: Optional[datetime] = None
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
@@ -118,6 +132,7 @@ class LearnedMappingResponse(BaseModel):
     answer_value: str
     confidence: int
     times_used: int
+    last_used_at: Optional[datetime] = None
 
     class Config:
         populate_by_name = True
@@ -0,0 +1,126 @@
+"""
+Admission control for fill jobs.
+
+Every fill holds one slot of a global concurrency budget (FILL_MAX_CONCURRENT)
+while its browser runs. Further jobs wait in a bounded FIFO queue
+(FILL_MAX_QUEUE); each user may have at most FILL_MAX_PER_USER jobs queued or
+running. Requests beyond that are rejected with a Retry-After estimate derived
+from a moving average of recent fill durations. State is per API process.
+"""
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.config import FILL_MAX_CONCURRENT, FILL_MAX_PER_USER, FILL_MAX_QUEUE, FILL_ESTIMATED_SECONDS
+from app.utils.metrics import Gauge
+
+QUEUE_DEPTH = Gauge("autofill_fill_queue_depth", "Fill jobs waiting for a browser slot.")
+RUNNING_FILLS = Gauge("autofill_fills_running", "Fill jobs currently holding a browser slot.")
+
+
+class AdmissionRejected(Exception):
+    """The fill cannot be accepted now; retry after `retry_after` seconds."""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Ticket:
+    __slots__ = ("user_id", "history_id", "enqueued_at", "started_at", "granted", "_event")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.history_id: Optional[str] = None
+        self.enqueued_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self.granted = False
+        self._event = asyncio.Event()
+
+
+class AdmissionController:
+    def __init__(self, max_running: int = FILL_MAX_CONCURRENT, max_per_user: int = FILL_MAX_PER_USER,
+                 max_queue: int = FILL_MAX_QUEUE, estimated_seconds: float = FILL_ESTIMATED_SECONDS):
+        self.max_running = max(1, max_running)
+        self.max_per_user = max(1, max_per_user)
+        self.max_queue = max(0, max_queue)
+        self.avg_duration = estimated_seconds
+        self._running: List[Ticket] = []
+        self._queue: List[Ticket] = []
+
+    def _estimated_wait(self, position: int) -> float:
+        """Seconds until the job at 1-based queue `position` gets a slot."""
+        return self.avg_duration * math.ceil(position / self.max_running)
+
+    def admit(self, user_id: str) -> Ticket:
+        """Reserve a slot or a queue place for a new fill, or raise AdmissionRejected."""
+        user_active = sum(1 for t in self._running + self._queue if t.user_id == user_id)
+        if user_active >= self.max_per_user:
+            raise AdmissionRejected(
+                f"You already have {user_active} form fill(s) in progress. Please wait for them to finish.",
+                retry_after=int(self.avg_duration),
+            )
+        if len(self._running) >= self.max_running and len(self._queue) >= self.max_queue:
+            raise AdmissionRejected(
+                "The server is busy filling other forms. Please try again shortly.",
+                retry_after=int(self._estimated_wait(len(self._queue) + 1)),
+            )
+
+        ticket = Ticket(user_id)
+        if len(self._running) < self.max_running and not self._queue:
+            self._grant(ticket)
+        else:
+            self._queue.append(ticket)
+        self._export()
+        return ticket
+
+    async def wait(self, ticket: Ticket):
+        """Wait until the ticket holds a browser slot."""
+        if not ticket.granted:
+            await ticket._event.wait()
+
+    def release(self, ticket: Ticket):
+        """Free the ticket's slot (or queue place) and start the next queued job."""
+        if ticket in self._running:
+            self._running.remove(ticket)
+            if ticket.started_at is not None:
+                duration = time.perf_counter() - ticket.started_at
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+        elif ticket in self._queue:
+            self._queue.remove(ticket)
+        while self._queue and len(self._running) < self.max_running:
+            self._grant(self._queue.pop(0))
+        self._export()
+
+    @property
+    def waiting(self) -> int:
+        """Number of fills queued for a slot."""
+        return len(self._queue)
+
+    def queue_position(self, history_id: str) -> Optional[int]:
+        for i, ticket in enumerate(self._queue):
+            if ticket.history_id == history_id:
+                return i + 1
+        return None
+
+    def estimated_start(self, history_id: str) -> Optional[datetime]:
+        position = self.queue_position(history_id)
+        if position is None:
+            return None
+        return datetime.utcnow() + timedelta(seconds=self._estimated_wait(position))
+
+    def _grant(self, ticket: Ticket):
+        ticket.granted = True
+        ticket.started_at = time.perf_counter()
+        self._running.append(ticket)
+        ticket._event.set()
+
+    def _export(self):
+        QUEUE_DEPTH.set(len(self._queue))
+        RUNNING_FILLS.set(len(self._running))
+
+
+admission = AdmissionController()
@@ -2,22 +2,77 @@
 AI Agent — Generates realistic answers for form questions that don't
 match any stored profile field, using the user's profile and bio.
 """
+import asyncio
 import json
 import re
 import os
-from typing import Optional, Dict
+import time
+from typing import Any, Optional, Dict, List, Tuple
 
-from app.config import AI_MODE, OPENAI_API_KEY, OPENAI_BASE_URL, GROK_API_KEY, GROK_BASE_URL, GROK_MODEL
+from app.config import (
+    AI_MODE, OPENAI_API_KEY, OPENAI_BASE_URL, GROK_API_KEY, GROK_BASE_URL, GROK_MODEL,
+    LLM_TIMEOUT_SECONDS, LLM_SLOW_CALL_MS, LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_SECONDS, LLM_HEDGE_AFTER_MS,
+)
+from app.services.keyword_matcher import KeywordMatcher
+from app.utils.metrics import span, Gauge, LLM_LATENCY
 
+LLM_BREAKER_OPEN = Gauge("autofill_llm_breaker_open", "1 while the provider's circuit breaker is open.", ("provider",))
 
-def _build_prompt(question: str, profile: Dict[str, str]) -> str:
-    """Build a prompt for the AI to generate a realistic answer."""
-    profile_summary = "\n".join(
+
+# Question intents recognised by the local template generator (dict order = priority)
+TEMPLATE_INTENTS = {
+    "motivation": ["why do you want", "motivation", "why are you", "why join", "reason for"],
+    "about": ["about yourself", "introduce yourself", "tell us about", "describe yourself", "brief about"],
+    "achievement": ["achievement", "accomplishment", "proud of", "notable"],
+    "expectation": ["expect", "expectation", "hope to", "looking forward", "what do you want to learn"],
+    "skills": ["skill", "technical skill", "tools", "technologies", "programming"],
+    "experience": ["experience", "work experience", "internship", "project"],
+}
+
+_intent_matcher = KeywordMatcher(TEMPLATE_INTENTS, stems=True)
+
+# Shared HTTP clients, created on the first remote AI call (keeps httpx out of cold start)
+_http_client = None
+_async_http_client = None
+_async_http_client_loop = None
+
+
+def _get_http_client():
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(timeout=LLM_TIMEOUT_SECONDS)
+    return _http_client
+
+
+def _get_async_http_client():
+    """AsyncClient bound to the running loop (recreated if a worker starts a new loop)."""
+    global _async_http_client, _async_http_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_http_client is None or _async_http_client_loop is not loop:
+        import httpx
+        _async_http_client = httpx.AsyncClient(timeout=LLM_TIMEOUT_SECONDS)
+        _async_http_client_loop = loop
+    return _async_http_client
+
+
+def detect_intent(question: str) -> Optional[str]:
+    """Return the template intent for a question, or None for the generic fallback."""
+    return _intent_matcher.best(question)[0]
+
+
+def _profile_summary(profile: Dict[str, str]) -> str:
+    return "\n".join(
         f"- {key.replace('_', ' ').title()}: {value}"
         for key, value in profile.items()
         if value and value.strip()
     )
 
+
+def _build_prompt(question: str, profile: Dict[str, str]) -> str:
+    """Build a prompt for the AI to generate a realistic answer."""
+    profile_summary = _profile_summary(profile)
+
     return f"""You are an AI assistant helping a student fill out a form.
 Based on the student's profile below, generate a realistic, appropriate, and concise answer
 for the given question. The answer must sound natural and be truthful based on the profile information.
@@ -38,6 +93,30 @@ RULES:
 ANSWER:"""
 
 
+def _build_batch_prompt(questions: Dict[str, str], profile: Dict[str, str]) -> str:
+    """Build a prompt answering several questions at once as a JSON object keyed by question id."""
+    numbered = "\n".join(f'- {qid}: "{question}"' for qid, question in questions.items())
+
+    return f"""You are an AI assistant helping a student fill out forms.
+Based on the student's profile below, write a realistic, appropriate, and concise answer
+for each question. The answers must sound natural and be truthful based on the profile information.
+
+STUDENT PROFILE:
+{_profile_summary(profile)}
+
+FORM QUESTIONS (id: question):
+{numbered}
+
+RULES:
+1. Each answer must be relevant to its question and 1-3 sentences long
+2. Use information from the profile when possible
+3. Do NOT invent specific dates, numbers, or certifications that aren't in the profile
+4. Plain text answers, no markdown
+5. Reply with ONLY a JSON object mapping each id to its answer
+
+JSON:"""
+
+
 def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
     """Generate answer using local sentence-transformers and template-based approach."""
     # Extract profile info
@@ -49,11 +128,11 @@ def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
     college = profile.get("college_name", "")
     year = profile.get("year", "")
 
-    q_lower = question.lower().strip()
+    intent = detect_intent(question)
 
     # Template-based generation for common patterns
     # Motivation / why questions
-    if any(kw in q_lower for kw in ["why do you want", "motivation", "why are you", "why join", "reason for"]):
+    if intent == "motivation":
         parts = []
         if interests:
             parts.append(f"I am deeply interested in {interests}")
@@ -67,7 +146,7 @@ def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
         return answer.strip()
 
     # About yourself / introduction
-    if any(kw in q_lower for kw in ["about yourself", "introduce yourself", "tell us about", "describe yourself", "brief about"]):
+    if intent == "about":
         parts = []
         if name:
             parts.append(f"I am {name}")
@@ -86,7 +165,7 @@ def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
         return ". ".join(parts).strip() if parts else f"I am an enthusiastic student eager to learn and contribute."
 
     # Achievements / accomplishments
-    if any(kw in q_lower for kw in ["achievement", "accomplishment", "proud of", "notable"]):
+    if intent == "achievement":
         parts = []
         if skills:
             parts.append(f"I have developed proficiency in {skills}")
@@ -97,7 +176,7 @@ def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
         return ". ".join(parts).strip() if parts else "I have consistently worked on improving my skills and contributing to team projects."
 
     # Expectations / what do you expect
-    if any(kw in q_lower for kw in ["expect", "expectation", "hope to", "looking forward", "what do you want to learn"]):
+    if intent == "expectation":
         parts = []
         if interests:
             parts.append(f"I look forward to exploring {interests}")
@@ -106,11 +185,11 @@ def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
         return "I look forward to " + ", ".join(parts[1:]) + "." if len(parts) > 1 else parts[0]
 
     # Skills question
-    if any(kw in q_lower for kw in ["skill", "technical skill", "tools", "technologies", "programming"]):
+    if intent == "skills":
         return skills if skills else "Problem solving, teamwork, and communication skills."
 
     # Experience
-    if any(kw in q_lower for kw in ["experience", "work experience", "internship", "project"]):
+    if intent == "experience":
         parts = []
         if skills:
             parts.append(f"I have hands-on experience with {skills}")
@@ -137,62 +216,112 @@ def _generate_with_local_model(question: str, profile: Dict[str, str]) -> str:
     return "I am an enthusiastic student eager to learn and grow."
 
 
-def _generate_with_openai(question: str, profile: Dict[str, str]) -> str:
-    """Generate answer using OpenAI-compatible API."""
-    try:
-        import httpx
+# ─── Remote providers ───────────────────────────────────────
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
 
-        prompt = _build_prompt(question, profile)
-
-        response = httpx.post(
-            f"{OPENAI_BASE_URL}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "gpt-3.5-turbo",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 300,
-                "temperature": 0.7,
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except Exception as e:
-        print(f"[AI Agent] OpenAI API error: {e}")
-        # Fallback to local generation
-        return _generate_with_local_model(question, profile)
+    Opens after LLM_BREAKER_FAILURES consecutive bad calls (errors, timeouts or
+    replies slower than LLM_SLOW_CALL_MS). While open, callers skip the provider
+    for LLM_BREAKER_COOLDOWN_SECONDS; then a single trial call is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
 
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURES,
+                 slow_call_seconds: float = LLM_SLOW_CALL_MS / 1000,
+                 cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now (claims the trial slot when half-open)."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record(self, ok: bool, elapsed: float):
+        """Report a finished call; slow successes count as failures."""
+        self._trial_running = False
+        if ok and elapsed <= self.slow_call_seconds:
+            if self.opened_at is not None:
+                print(f"[AI Agent] {self.name} recovered, circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            LLM_BREAKER_OPEN.set(0, provider=self.name)
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"[AI Agent] {self.name} failing ({self.failures} bad calls), circuit open for {self.cooldown:.0f}s")
+            self.opened_at = time.monotonic()
+            LLM_BREAKER_OPEN.set(1, provider=self.name)
+
+
+_breakers = {"grok": CircuitBreaker("grok"), "openai": CircuitBreaker("openai")}
+
+
+def _remote_provider() -> Optional[str]:
+    """The configured LLM provider, or None when answers are generated locally."""
+    if AI_MODE == "grok" and GROK_API_KEY:
+        return "grok"
+    if AI_MODE == "openai" and OPENAI_API_KEY:
+        return "openai"
+    return None
+
+
+def _chat_request(provider: str, prompt: str, max_tokens: int = 300) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """URL, headers and JSON body of a chat completion request to `provider`."""
+    if provider == "grok":
+        base_url, api_key, model = GROK_BASE_URL, GROK_API_KEY, GROK_MODEL
+    else:
+        base_url, api_key, model = OPENAI_BASE_URL, OPENAI_API_KEY, "gpt-3.5-turbo"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": 0.7,
+    }
+    return f"{base_url}/chat/completions", headers, payload
 
-def _generate_with_grok(question: str, profile: Dict[str, str]) -> str:
-    """Generate answer using Groq (Grok) API."""
-    try:
-        import httpx
 
-        prompt = _build_prompt(question, profile)
-
-        response = httpx.post(
-            f"{GROK_BASE_URL}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROK_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": GROK_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 300,
-                "temperature": 0.7,
-            },
-            timeout=30.0,
-        )
+def _generate_with_provider(provider: str, question: str, profile: Dict[str, str]) -> str:
+    """Generate answer using an OpenAI-compatible API (OpenAI or Groq), falling back to local generation."""
+    breaker = _breakers[provider]
+    if not breaker.allow():
+        return _generate_with_local_model(question, profile)
+
+    url, headers, payload = _chat_request(provider, _build_prompt(question, profile))
+    start = time.perf_counter()
+    try:
+        response = _get_http_client().post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT_SECONDS)
         response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"].strip()
+        answer = response.json()["choices"][0]["message"]["content"].strip()
+        breaker.record(True, time.perf_counter() - start)
+        return answer
     except Exception as e:
-        print(f"[AI Agent] Grok API error: {e}")
+        breaker.record(False, time.perf_counter() - start)
+        print(f"[AI Agent] {provider} API error: {e}")
         # Fallback to local generation
         return _generate_with_local_model(question, profile)
 
@@ -204,28 +333,160 @@ def generate_answer(question: str, profile_data: Dict[str, str]) -> str:
     Uses OpenAI API or Grok API if configured, otherwise falls back to local
     template-based generation with NLP understanding.
     """
-    if AI_MODE == "grok" and GROK_API_KEY:
-        return _generate_with_grok(question, profile_data)
+    provider = _remote_provider()
+    if provider:
+        with span("llm", LLM_LATENCY, provider=provider):
+            return _generate_with_provider(provider, question, profile_data)
 
-    if AI_MODE == "openai" and OPENAI_API_KEY:
-        return _generate_with_openai(question, profile_data)
-    
-    return _generate_with_local_model(question, profile_data)
+    with span("llm", LLM_LATENCY, provider="local"):
+        return _generate_with_local_model(question, profile_data)
 
 
-def get_profile_as_dict(profile) -> Dict[str, str]:
-    """Convert a UserProfile model instance to a flat dictionary."""
-    return {
-        "full_name": profile.full_name or "",
-        "register_number": profile.register_number or "",
-        "department": profile.department or "",
-        "year": profile.year or "",
-        "email": profile.email or "",
-        "phone": profile.phone or "",
-        "gender": profile.gender or "",
-        "college_name": profile.college_name or "",
-        "address": profile.address or "",
-        "skills": profile.skills or "",
-        "interests": profile.interests or "",
-        "bio": profile.bio or "",
+async def _agenerate_with_provider(provider: str, question: str, profile: Dict[str, str], timeout: float) -> str:
+    """One async call to the provider; always reports its outcome to the provider's breaker."""
+    url, headers, payload = _chat_request(provider, _build_prompt(question, profile))
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = await _get_async_http_client().post(url, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        answer = response.json()["choices"][0]["message"]["content"].strip()
+        ok = True
+        return answer
+    finally:
+        # Also runs on cancellation, so a half-open trial never stays claimed
+        _breakers[provider].record(ok, time.perf_counter() - start)
+
+
+async def agenerate_batch(questions: Dict[str, str], profile_data: Dict[str, str],
+                          max_tokens: int) -> Tuple[Dict[str, str], int]:
+    """
+    Answer several questions ({id: question}) in one provider call.
+    Returns ({id: answer}, tokens used); ({}, tokens) when no provider is configured,
+    the breaker is open or the reply is unusable. Never falls back to local generation.
+    """
+    provider = _remote_provider()
+    if provider is None or not questions or not _breakers[provider].allow():
+        return {}, 0
+
+    prompt = _build_batch_prompt(questions, profile_data)
+    url, headers, payload = _chat_request(provider, prompt, max_tokens)
+    ok = False
+    try:
+        response = await _get_async_http_client().post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        ok = True
+    except Exception as e:
+        print(f"[AI Agent] {provider} batch API error: {e}")
+        return {}, 0
+    finally:
+        # A batch reply is slower than a single answer by design: only its success counts
+        _breakers[provider].record(ok, 0.0)
+
+    data = response.json()
+    content = data["choices"][0]["message"]["content"]
+    tokens = data.get("usage", {}).get("total_tokens") or (len(prompt) + len(content)) // 4
+    try:
+        parsed = json.loads(content[content.index("{"):content.rindex("}") + 1])
+    except ValueError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        print(f"[AI Agent] {provider} batch reply is not a JSON object")
+        return {}, tokens
+    answers = {
+        qid: str(parsed[qid]).strip()
+        for qid in questions
+        if isinstance(parsed.get(qid), (str, int, float)) and str(parsed[qid]).strip()
     }
+    return answers, tokens
+
+
+def _drain(task: "asyncio.Future"):
+    """Done-callback for abandoned provider calls: consume the outcome quietly."""
+    if not task.cancelled():
+        task.exception()
+
+
+async def agenerate_answer(question: str, profile_data: Dict[str, str],
+                           budget: Optional[float] = None) -> Tuple[str, str]:
+    """
+    Async generate_answer for fill jobs, bounded in time.
+
+    Returns (answer, path); path is the provider that answered ("grok",
+    "openai"), "local" when no provider is configured, or "local, <reason>"
+    when local generation stood in: the breaker is open, the form's AI
+    `budget` (seconds still available for provider calls) is spent, the call
+    failed, or the provider had not answered after LLM_HEDGE_AFTER_MS (the
+    local answer is returned at once and the provider call is left to finish
+    in the background, where its outcome still feeds the breaker).
+    Cancelling the caller cancels a provider call that is still running.
+    """
+    provider = _remote_provider()
+    if provider is None:
+        with span("llm", LLM_LATENCY, provider="local"):
+            return _generate_with_local_model(question, profile_data), "local"
+    if budget is not None and budget <= 0:
+        return _generate_with_local_model(question, profile_data), "local, budget spent"
+    if not _breakers[provider].allow():
+        return _generate_with_local_model(question, profile_data), "local, breaker open"
+
+    timeout = LLM_TIMEOUT_SECONDS if budget is None else min(LLM_TIMEOUT_SECONDS, budget)
+    hedge_after = LLM_HEDGE_AFTER_MS / 1000
+    with span("llm", LLM_LATENCY, provider=provider):
+        call = asyncio.ensure_future(_agenerate_with_provider(provider, question, profile_data, timeout))
+        detached = False
+        try:
+            if 0 < hedge_after < timeout:
+                done, _ = await asyncio.wait({call}, timeout=hedge_after)
+                if not done:
+                    local_answer = _generate_with_local_model(question, profile_data)
+                    if not call.done():
+                        # Let the call finish in the background so its latency still feeds the breaker
+                        call.add_done_callback(_drain)
+                        detached = True
+                        return local_answer, "local, hedged"
+            try:
+                return await call, provider
+            except Exception as e:
+                print(f"[AI Agent] {provider} API error: {e}")
+        finally:
+            if not detached and not call.done():
+                # The caller was cancelled while waiting: stop the provider call with it
+                call.cancel()
+                call.add_done_callback(_drain)
+    return _generate_with_local_model(question, profile_data), "local, provider error"
+
+
+PROFILE_FIELDS = (
+    "full_name", "register_number", "department", "year", "email", "phone",
+    "gender", "college_name", "address", "skills", "interests", "bio",
+)
+
+
+def get_profile_as_dict(profile) -> Dict[str, str]:
+    """
+    Convert a UserProfile model instance to a flat dictionary.
+    Extra fields are included under their own key (built-in names win); an extra
+    field is either a plain value or {"value": ..., "aliases": [...]}.
+    """
+    data = {field: getattr(profile, field) or "" for field in PROFILE_FIELDS}
+    for key, value in (profile.extra_fields or {}).items():
+        if not key or key in data:
+            continue
+        if isinstance(value, dict):
+            value = value.get("value", "")
+        data[key] = "" if value is None else str(value)
+    return data
+
+
+def get_extra_field_phrases(profile) -> Dict[str, List[str]]:
+    """Matcher phrases for each extra field: its key plus any aliases."""
+    phrases: Dict[str, List[str]] = {}
+    for key, value in (profile.extra_fields or {}).items():
+        if not key or key in PROFILE_FIELDS:
+            continue
+        aliases = value.get("aliases", []) if isinstance(value, dict) else []
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        phrases[key] = [key.replace("_", " ")] + [str(a) for a in aliases if str(a).strip()]
+    return phrases
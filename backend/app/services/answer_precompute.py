@@ -0,0 +1,119 @@
+"""
+Speculative answer precomputation.
+
+When a profile is created or updated and an LLM provider is configured, a
+low-priority background job generates answers for the common open-ended
+question intents (PRECOMPUTE_INTENTS, see ai_agent.TEMPLATE_INTENTS) in one
+batched LLM call. It stores them on the profile, tagged with the profile's
+updated_at. Fills answer questions of those intents from this cache while
+the profile is unchanged.
+
+Jobs are debounced per user, run one at a time, and wait while fills are
+queued for a browser slot. Each user gets a rolling 24 h token budget
+(PRECOMPUTE_TOKENS_PER_DAY, per API process).
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.config import (
+    PRECOMPUTE_ENABLED, PRECOMPUTE_INTENTS, PRECOMPUTE_DELAY_SECONDS, PRECOMPUTE_MAX_TOKENS,
+    PRECOMPUTE_TOKENS_PER_DAY,
+)
+
+# Representative wording of each intent sent to the LLM
+INTENT_QUESTIONS: Dict[str, str] = {
+    "about": "Tell us about yourself.",
+    "motivation": "Why do you want to join?",
+    "expectation": "What do you expect to gain from this?",
+    "achievement": "What is your most notable achievement?",
+    "skills": "What skills do you have?",
+    "experience": "Describe your relevant experience.",
+}
+
+_DAY = 24 * 60 * 60
+
+_pending: Dict[str, "asyncio.Task"] = {}
+_spend: Dict[str, Deque[Tuple[float, int]]] = {}
+_slot: Optional[asyncio.Semaphore] = None
+
+
+def tokens_spent(user_id: str) -> int:
+    """Tokens spent on precomputation for the user in the last 24 h."""
+    spend = _spend.get(user_id)
+    if not spend:
+        return 0
+    cutoff = time.monotonic() - _DAY
+    while spend and spend[0][0] < cutoff:
+        spend.popleft()
+    return sum(tokens for _, tokens in spend)
+
+
+def _record_spend(user_id: str, tokens: int):
+    if tokens:
+        _spend.setdefault(user_id, deque()).append((time.monotonic(), tokens))
+
+
+def schedule_precompute(user_id: str):
+    """Queue a (debounced) precomputation for the user after a profile change."""
+    from app.services.ai_agent import _remote_provider
+
+    if not PRECOMPUTE_ENABLED or _remote_provider() is None:
+        return
+    previous = _pending.pop(user_id, None)
+    if previous is not None:
+        previous.cancel()
+    task = asyncio.ensure_future(_precompute_later(user_id))
+    _pending[user_id] = task
+
+    def _forget(done: "asyncio.Task"):
+        if _pending.get(user_id) is done:
+            del _pending[user_id]
+
+    task.add_done_callback(_forget)
+
+
+async def _precompute_later(user_id: str):
+    global _slot
+    from app.services.admission import admission
+
+    await asyncio.sleep(PRECOMPUTE_DELAY_SECONDS)
+    if _slot is None:
+        _slot = asyncio.Semaphore(1)
+    async with _slot:
+        # Low priority: never compete with fills waiting for a slot
+        while admission.waiting:
+            await asyncio.sleep(PRECOMPUTE_DELAY_SECONDS)
+        try:
+            await precompute_answers(user_id)
+        except Exception as e:
+            print(f"⚠ Answer precompute failed for {user_id}: {e}")
+
+
+async def precompute_answers(user_id: str) -> int:
+    """Generate and store the user's precomputed answers; returns the tokens spent."""
+    from app.models import UserProfile
+    from app.services.ai_agent import agenerate_batch, get_profile_as_dict
+    from app.services.profile_cache import bump_version
+
+    profile = await UserProfile.find_one(UserProfile.user_id == user_id)
+    if not profile or profile.precomputed_for == profile.updated_at:
+        return 0
+    if PRECOMPUTE_TOKENS_PER_DAY - tokens_spent(user_id) < PRECOMPUTE_MAX_TOKENS:
+        print(f"⏸ Answer precompute skipped for {user_id}: daily token budget used")
+        return 0
+
+    questions = {intent: INTENT_QUESTIONS[intent] for intent in PRECOMPUTE_INTENTS if intent in INTENT_QUESTIONS}
+    answers, tokens = await agenerate_batch(questions, get_profile_as_dict(profile), PRECOMPUTE_MAX_TOKENS)
+    _record_spend(user_id, tokens)
+    if not answers:
+        return tokens
+
+    # Only if the profile was not edited meanwhile (the newer edit schedules its own job)
+    await UserProfile.find_one(
+        UserProfile.user_id == user_id,
+        UserProfile.updated_at == profile.updated_at,
+    ).update({"$set": {"precomputed_answers": answers, "precomputed_for": profile.updated_at}})
+    bump_version(user_id)
+    return tokens
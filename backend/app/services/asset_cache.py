@@ -0,0 +1,234 @@
+"""
+On-disk cache of Google Forms static assets shared by all fills.
+
+Every browser context starts with an empty HTTP cache, so each fill would
+download the same JS bundles, CSS and fonts again. `attach()` installs a
+Playwright route handler on a context for the static asset hosts:
+
+* GET requests for scripts, stylesheets, fonts and images are answered from
+  the cache when the URL is known,
+* on a miss the request goes to the network; the response is stored when its
+  Cache-Control marks it long-lived and shareable (public, `immutable` or a
+  max-age of at least ASSET_CACHE_MIN_MAX_AGE seconds, never private/no-store),
+* everything else is passed through untouched.
+
+Bodies are stored once per SHA-256 digest (`blobs/`), so the same bundle
+under several URLs takes the space of one; each URL has a small JSON record
+(`urls/`). Total blob size is capped at ASSET_CACHE_MAX_BYTES with least
+recently used URLs evicted first. Each process keeps its own LRU order; a
+record or blob removed by another process is treated as a miss.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES, ASSET_CACHE_MIN_MAX_AGE
+from app.utils.metrics import Counter, record_cache
+
+ASSET_BYTES_SAVED = Counter("autofill_asset_cache_bytes_saved_total", "Static asset bytes served from the local cache.")
+
+# Hosts serving Google Forms' versioned static assets
+ASSET_URL_PATTERN = re.compile(r"^https://(?:www|ssl|fonts)\.gstatic\.com/|^https://fonts\.googleapis\.com/")
+STATIC_RESOURCE_TYPES = ("script", "stylesheet", "font", "image")
+# Response headers replayed on a hit
+_KEPT_HEADERS = ("content-type", "cache-control", "access-control-allow-origin", "timing-allow-origin")
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def is_cacheable(headers: Dict[str, str]) -> bool:
+    """Whether a 200 response with these (lower-cased) headers is a shareable, long-lived asset."""
+    cache_control = headers.get("cache-control", "").lower()
+    if not cache_control or "set-cookie" in headers:
+        return False
+    if any(d in cache_control for d in ("no-store", "no-cache", "private")):
+        return False
+    if "immutable" in cache_control:
+        return True
+    max_age = _MAX_AGE.search(cache_control)
+    return max_age is not None and int(max_age.group(1)) >= ASSET_CACHE_MIN_MAX_AGE
+
+
+class AssetCache:
+    """Content-addressed, size-capped LRU store of static responses."""
+
+    def __init__(self, root: Path = ASSET_CACHE_DIR, max_bytes: int = ASSET_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        # url key -> {"url", "digest", "size", "headers"}; order = LRU order (oldest first)
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._blob_refs: Dict[str, int] = {}
+        self._blob_sizes: Dict[str, int] = {}
+        self.total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()  # Records are touched from executor threads
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _record_path(self, key: str) -> Path:
+        return self.root / "urls" / f"{key}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def _load(self):
+        """Rebuild the index from disk, least recently used first (by record mtime)."""
+        self._loaded = True
+        records_dir = self.root / "urls"
+        if not records_dir.is_dir():
+            return
+        paths = sorted(records_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in paths:
+            try:
+                record = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            self._add_record(path.stem, record)
+
+    def _add_record(self, key: str, record: Dict[str, Any]):
+        digest = record["digest"]
+        if digest not in self._blob_refs:
+            self._blob_refs[digest] = 0
+            self._blob_sizes[digest] = record["size"]
+            self.total_bytes += record["size"]
+        self._blob_refs[digest] += 1
+        self._records[key] = record
+
+    def _drop_record(self, key: str):
+        record = self._records.pop(key, None)
+        if record is None:
+            return
+        try:
+            self._record_path(key).unlink()
+        except OSError:
+            pass
+        self._release_blob(record["digest"])
+
+    def _release_blob(self, digest: str):
+        """Drop one reference to a blob; the file goes with the last one."""
+        self._blob_refs[digest] -= 1
+        if self._blob_refs[digest] <= 0:
+            del self._blob_refs[digest]
+            self.total_bytes -= self._blob_sizes.pop(digest)
+            try:
+                self._blob_path(digest).unlink()
+            except OSError:
+                pass
+
+    def get(self, url: str) -> Optional[tuple]:
+        """(headers, body) for a cached URL, or None. Marks the URL as recently used."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            key = self._url_key(url)
+            record = self._records.get(key)
+            if record is None:
+                return None
+            try:
+                body = self._blob_path(record["digest"]).read_bytes()
+                os.utime(self._record_path(key))
+            except OSError:
+                self._drop_record(key)
+                return None
+            self._records.move_to_end(key)
+            return record["headers"], body
+
+    def put(self, url: str, headers: Dict[str, str], body: bytes):
+        """Store a response body (once per digest) and evict LRU URLs beyond max_bytes."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            digest = hashlib.sha256(body).hexdigest()
+            key = self._url_key(url)
+            previous = self._records.pop(key, None)  # Re-stored URL: its old blob is released below
+            record = {
+                "url": url,
+                "digest": digest,
+                "size": len(body),
+                "headers": {h: headers[h] for h in _KEPT_HEADERS if h in headers},
+            }
+            try:
+                blob = self._blob_path(digest)
+                if not blob.exists():
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = blob.with_suffix(".tmp")
+                    tmp.write_bytes(body)
+                    tmp.replace(blob)
+                record_path = self._record_path(key)
+                record_path.parent.mkdir(parents=True, exist_ok=True)
+                record_path.write_text(json.dumps(record))
+            except OSError as e:
+                print(f"⚠ Asset cache write failed: {e}")
+                record = None
+            if record is not None:
+                self._add_record(key, record)
+            if previous is not None:
+                self._release_blob(previous["digest"])
+            while self.total_bytes > self.max_bytes and len(self._records) > 1:
+                self._drop_record(next(iter(self._records)))
+
+
+asset_cache = AssetCache()
+
+
+async def attach(context, stats: Dict[str, float]):
+    """
+    Serve the context's static asset requests through the cache.
+    `stats` is updated with requests, hits and bytes_saved for the fill.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def handle(route, request):
+        if request.method != "GET" or request.resource_type not in STATIC_RESOURCE_TYPES:
+            await route.continue_()
+            return
+        stats["requests"] = stats.get("requests", 0) + 1
+        cached = await loop.run_in_executor(None, asset_cache.get, request.url)
+        record_cache("static_assets", cached is not None)
+        if cached is not None:
+            headers, body = cached
+            stats["hits"] = stats.get("hits", 0) + 1
+            stats["bytes_saved"] = stats.get("bytes_saved", 0) + len(body)
+            ASSET_BYTES_SAVED.inc(len(body))
+            await route.fulfill(status=200, headers=headers, body=body)
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body() if response.status == 200 and is_cacheable(response.headers) else None
+        except Exception as e:
+            # Let the browser load the asset itself; the cache only ever saves a download
+            print(f"⚠ Asset cache fetch failed for {request.url}: {e}")
+            await route.continue_()
+            return
+        if body is None:
+            await route.fulfill(response=response)
+            return
+        try:
+            await loop.run_in_executor(None, asset_cache.put, request.url, response.headers, body)
+        except Exception as e:
+            print(f"⚠ Asset cache write failed: {e}")
+        await route.fulfill(response=response, body=body)
+
+    await context.route(ASSET_URL_PATTERN, handle)
+
+
+def summarize(stats: Dict[str, float]) -> Dict[str, float]:
+    """Per-fill report: requests, hits, hit_ratio and bytes_saved."""
+    requests = stats.get("requests", 0)
+    hits = stats.get("hits", 0)
+    return {
+        "requests": requests,
+        "hits": hits,
+        "hit_ratio": round(hits / requests, 3) if requests else 0.0,
+        "bytes_saved": stats.get("bytes_saved", 0),
+    }
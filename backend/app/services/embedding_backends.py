@@ -0,0 +1,185 @@
+"""
+Embedding backends for the question matcher.
+
+Every backend turns a list of strings into L2-normalised float32 vectors, so
+callers can compare them with a plain dot product. The backend is chosen by
+EMBEDDING_BACKEND:
+
+- "sentence_transformers": the original MiniLM model via PyTorch.
+- "onnx": the same MiniLM exported to ONNX and int8-quantised, run with
+  ONNX Runtime and a built-in WordPiece tokenizer (no torch/transformers import).
+
+Producing the ONNX model (build time, needs torch + optimum once):
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 minilm/
+    python -c "from app.services.embedding_backends import quantize_model; \
+               quantize_model('minilm/model.onnx', 'minilm/model_quantized.onnx')"
+and copy `vocab.txt` from the model repo next to it.
+"""
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from app.config import (
+    EMBEDDING_BACKEND, EMBEDDING_MODEL, ONNX_MODEL_PATH, ONNX_VOCAB_PATH, EMBEDDING_THREADS,
+)
+
+
+# Longest input MiniLM encodes (its sentence-transformers max_seq_length); longer text is truncated
+MAX_SEQ_LENGTH = 256
+
+
+class EmbeddingBackend(ABC):
+    """Interface: encode texts into L2-normalised vectors (numpy array, shape [n, dim])."""
+    name = "base"
+
+    @abstractmethod
+    def encode(self, texts: List[str]):
+        ...
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Reference backend using sentence-transformers (pulls in PyTorch)."""
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]):
+        return self._model.encode(texts, normalize_embeddings=True)
+
+
+# ─── WordPiece tokenizer (BERT uncased) ─────────────────────
+def _is_punctuation(ch: str) -> bool:
+    cp = ord(ch)
+    if 33 <= cp <= 47 or 58 <= cp <= 64 or 91 <= cp <= 96 or 123 <= cp <= 126:
+        return True
+    return unicodedata.category(ch).startswith("P")
+
+
+class WordPieceTokenizer:
+    """Minimal re-implementation of the BERT uncased tokenizer used by MiniLM."""
+
+    def __init__(self, vocab_path: str, max_length: int = MAX_SEQ_LENGTH):
+        self.vocab: Dict[str, int] = {}
+        with open(vocab_path, encoding="utf-8") as f:
+            for idx, token in enumerate(f):
+                self.vocab[token.rstrip("\n")] = idx
+        self.max_length = max_length
+        self.cls_id = self.vocab["[CLS]"]
+        self.sep_id = self.vocab["[SEP]"]
+        self.unk_id = self.vocab["[UNK]"]
+        self.pad_id = self.vocab.get("[PAD]", 0)
+
+    def _basic_tokens(self, text: str) -> List[str]:
+        text = unicodedata.normalize("NFD", text.lower())
+        tokens: List[str] = []
+        word: List[str] = []
+        for ch in text:
+            cat = unicodedata.category(ch)
+            if cat == "Mn" or ch == "\ufffd" or (cat.startswith("C") and ch not in "\t\n\r"):
+                continue  # accents and control characters are dropped
+            if ch.isspace():
+                if word:
+                    tokens.append("".join(word))
+                    word = []
+            elif _is_punctuation(ch):
+                if word:
+                    tokens.append("".join(word))
+                    word = []
+                tokens.append(ch)
+            else:
+                word.append(ch)
+        if word:
+            tokens.append("".join(word))
+        return tokens
+
+    def _wordpiece_ids(self, word: str) -> List[int]:
+        if len(word) > 100:
+            return [self.unk_id]
+        ids: List[int] = []
+        start = 0
+        while start < len(word):
+            end = len(word)
+            piece_id = None
+            while start < end:
+                piece = word[start:end] if start == 0 else "##" + word[start:end]
+                piece_id = self.vocab.get(piece)
+                if piece_id is not None:
+                    break
+                end -= 1
+            if piece_id is None:
+                return [self.unk_id]
+            ids.append(piece_id)
+            start = end
+        return ids
+
+    def encode_batch(self, texts: List[str]) -> Tuple[list, list]:
+        """Return padded (input_ids, attention_mask) as lists of equal-length rows."""
+        rows: List[List[int]] = []
+        for text in texts:
+            ids = [self.cls_id]
+            for word in self._basic_tokens(text):
+                ids.extend(self._wordpiece_ids(word))
+            ids = ids[:self.max_length - 1] + [self.sep_id]
+            rows.append(ids)
+        width = max((len(r) for r in rows), default=0)
+        input_ids = [r + [self.pad_id] * (width - len(r)) for r in rows]
+        attention_mask = [[1] * len(r) + [0] * (width - len(r)) for r in rows]
+        return input_ids, attention_mask
+
+
+class OnnxBackend(EmbeddingBackend):
+    """Int8-quantised MiniLM on ONNX Runtime (CPU) with mean pooling, matching sentence-transformers."""
+    name = "onnx"
+
+    def __init__(self, model_path: str = ONNX_MODEL_PATH, vocab_path: str = ONNX_VOCAB_PATH):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if EMBEDDING_THREADS > 0:
+            options.intra_op_num_threads = EMBEDDING_THREADS
+        self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = WordPieceTokenizer(str(vocab_path))
+
+    def encode(self, texts: List[str]):
+        import numpy as np
+
+        input_ids, attention_mask = self._tokenizer.encode_batch(texts)
+        ids = np.asarray(input_ids, dtype=np.int64)
+        mask = np.asarray(attention_mask, dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self._session.run(None, feeds)[0]  # [batch, seq, dim]
+
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def quantize_model(fp32_path: str, int8_path: str):
+    """Dynamic int8 quantisation of an exported MiniLM ONNX graph (build-time helper)."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+
+_BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name: str = EMBEDDING_BACKEND) -> Optional[EmbeddingBackend]:
+    """Instantiate the configured backend, or None if its dependencies/model files are missing."""
+    backend_cls = _BACKENDS.get(name)
+    if backend_cls is None:
+        print(f"[Matcher] Unknown embedding backend '{name}', using keyword matching")
+        return None
+    try:
+        return backend_cls()
+    except Exception as e:
+        print(f"[Matcher] Embedding backend '{name}' unavailable: {e}")
+        return None
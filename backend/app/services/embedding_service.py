@@ -0,0 +1,77 @@
+"""
+In-process micro-batching embedding service.
+
+Concurrent fills each ask for one question embedding at a time. The batcher
+collects those requests for up to EMBED_BATCH_MAX_WAIT_MS (or until
+EMBED_BATCH_MAX_SIZE texts are waiting), encodes them as one batch on a worker
+thread so the event loop stays free, and resolves each caller's future with
+its own vector. All fills in the process share one model copy.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from app.config import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
+
+
+class EmbeddingBatcher:
+    """Collects encode requests on the current event loop and runs them through `backend.encode` in batches."""
+
+    def __init__(self, backend, max_batch: int = EMBED_BATCH_MAX_SIZE, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.backend = backend
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def encode(self, text: str):
+        """Return the normalised embedding for `text`, batched with other concurrent callers."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Identical questions from parallel fills of the same form are encoded once
+            unique: Dict[str, int] = {}
+            for text, _ in batch:
+                unique.setdefault(text, len(unique))
+            try:
+                vectors = await loop.run_in_executor(None, self.backend.encode, list(unique))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(vectors[unique[text]])
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+async def encode_batched(backend, text: str):
+    """Encode one text through the shared batcher (rebuilt if the event loop or backend changed)."""
+    global _batcher
+    if _batcher is None or _batcher.loop is not asyncio.get_running_loop() or _batcher.backend is not backend:
+        _batcher = EmbeddingBatcher(backend)
+    return await _batcher.encode(text)
@@ -0,0 +1,97 @@
+"""
+Compact per-question fill log.
+
+Entries are slotted records with enum-coded field types, answer sources and
+statuses and a monotonic timestamp. They become the plain dicts stored on
+FormHistory / shown by the dashboard only when serialised (`to_dict`), where
+long answers are cut to FILL_LOG_ANSWER_MAX_CHARS. The answer string itself
+is the same object the learned mappings hold, not a copy.
+"""
+import datetime
+import time
+from enum import Enum
+from typing import Any, Dict, Tuple
+
+from app.config import FILL_LOG_ANSWER_MAX_CHARS
+
+
+class FieldType(str, Enum):
+    TEXT = "text"
+    PARAGRAPH = "paragraph"
+    RADIO = "radio"
+    CHECKBOX = "checkbox"
+    DROPDOWN = "dropdown"
+    DATE = "date"
+    UNKNOWN = "unknown"
+
+
+class SourceKind(str, Enum):
+    """Where an answer came from; details such as the matched field are kept separately."""
+    PROFILE = "profile"
+    LEARNED = "learned"
+    AI = "ai_generated"
+    FALLBACK = "fallback_first"
+    NONE = "none"
+
+
+class FillStatus(str, Enum):
+    FILLED = "filled"
+    PREFILLED = "prefilled"
+    SKIPPED = "skipped"
+    ERROR = "error"
+
+
+def split_source(source: str) -> Tuple[SourceKind, str]:
+    """'profile (full_name, 92%)' -> (SourceKind.PROFILE, 'full_name, 92%')."""
+    kind, _, detail = source.partition(" (")
+    try:
+        return SourceKind(kind), detail[:-1] if detail.endswith(")") else detail
+    except ValueError:
+        return SourceKind.NONE, source
+
+
+class LogClock:
+    """Maps monotonic timestamps to wall-clock time, anchored when the fill starts."""
+    __slots__ = ("wall", "mono")
+
+    def __init__(self):
+        self.wall = datetime.datetime.utcnow()
+        self.mono = time.monotonic()
+
+    def isoformat(self, mono: float) -> str:
+        return (self.wall + datetime.timedelta(seconds=mono - self.mono)).isoformat()
+
+
+class FillLogEntry:
+    """One question's outcome."""
+    __slots__ = ("question", "field_type", "answer", "source", "source_detail", "status", "error", "at")
+
+    def __init__(self, question: str, field_type: FieldType, answer: str, source: str,
+                 status: FillStatus, error: str = ""):
+        self.question = question
+        self.field_type = field_type
+        self.answer = answer
+        self.source, self.source_detail = split_source(source)
+        self.status = status
+        self.error = error
+        self.at = time.monotonic()
+
+    def to_dict(self, clock: LogClock) -> Dict[str, Any]:
+        """The stored/API form: {question, field_type, answer, source, status, timestamp}."""
+        answer = self.answer
+        if FILL_LOG_ANSWER_MAX_CHARS > 0 and len(answer) > FILL_LOG_ANSWER_MAX_CHARS:
+            answer = answer[:FILL_LOG_ANSWER_MAX_CHARS] + "…"
+        source = self.source.value
+        if self.source_detail:
+            source = f"{source} ({self.source_detail})" if self.source is not SourceKind.NONE else self.source_detail
+        status = self.status.value
+        if self.error:
+            status = f"{status}: {self.error}"
+        return {
+            "question": self.question,
+            "field_type": self.field_type.value,
+            "answer": answer,
+            "source": source,
+            "status": status,
+            "timestamp": clock.isoformat(self.at),
+        }
@@ -0,0 +1,354 @@
+"""
+Fill runtime — runs FormFillerEngine jobs either inline on the API event loop
+or in separate worker processes (FILL_WORKER_MODE=process).
+
+Each worker process owns its own Playwright instance and Chromium and reuses
+them across jobs. The API process sends a job (profile dict, learned mappings,
+URL, options, optional resume checkpoint) over a pipe and receives progress
+and per-page checkpoint messages and the final result dict back. Each
+checkpoint is acknowledged once the API process has stored it (or failed to),
+so the engine only counts its mappings as flushed after a confirmed write.
+Workers exit after FILL_WORKER_MAX_JOBS jobs and are replaced on demand; a
+crashed worker only fails the job it was running.
+
+Cancelling the awaiting task sends "cancel" to the worker, which cancels the
+job (closing its browser context) and stays warm; a worker that does not
+acknowledge within FILL_CANCEL_GRACE_SECONDS is killed.
+"""
+import asyncio
+import multiprocessing
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import FILL_WORKER_MODE, FILL_WORKER_PROCESSES, FILL_WORKER_MAX_JOBS, FILL_CANCEL_GRACE_SECONDS
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+CheckpointCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class FillWorkerCrashed(Exception):
+    """The worker process running a job died before returning a result."""
+
+
+# ─── Worker process side ────────────────────────────────────
+def _worker_main(conn, max_jobs: int):
+    """Entry point of a spawned worker process."""
+    try:
+        asyncio.run(_worker_loop(conn, max_jobs))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+def _start_reader(conn, loop, inbox: "asyncio.Queue", acks: "asyncio.Queue"):
+    """
+    Read the pipe on a thread so "cancel" arrives while a job is running; None = pipe closed.
+    Checkpoint acknowledgements go to `acks`, everything else to `inbox`.
+    """
+
+    def read():
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            queue = acks if isinstance(message, tuple) and message[0] == "checkpoint_ack" else inbox
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:  # Event loop already closed at shutdown
+                return
+            if message is None:
+                return
+
+    threading.Thread(target=read, daemon=True).start()
+
+
+async def _worker_loop(conn, max_jobs: int):
+    from app.services.form_filler import FormFillerEngine, launch_browser, _load_playwright
+    from app.services.question_matcher import refresh_knowledge_base
+
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue = asyncio.Queue()
+    acks: asyncio.Queue = asyncio.Queue()
+    _start_reader(conn, loop, inbox, acks)
+
+    async def on_checkpoint(checkpoint: Dict[str, Any]):
+        conn.send(("checkpoint", checkpoint))
+        _, ok, error = await acks.get()
+        if not ok:
+            raise RuntimeError(error)  # FormFillerEngine logs it and keeps the mappings for the next checkpoint
+
+    async_playwright = _load_playwright()
+    playwright = await async_playwright().start() if async_playwright else None
+    browser = None
+    jobs_done = 0
+    try:
+        while jobs_done < max_jobs:
+            job = await inbox.get()
+            if job is None:
+                break
+            if job == "cancel":
+                continue  # The job it was meant for already finished
+            jobs_done += 1
+            while not acks.empty():  # A cancelled job's late acknowledgement
+                acks.get_nowait()
+            try:
+                await refresh_knowledge_base()
+                if playwright is not None and (browser is None or not browser.is_connected()):
+                    browser = await launch_browser(playwright)
+                engine = FormFillerEngine(
+                    job["profile"], job["learned"],
+                    on_progress=lambda progress: conn.send(("progress", progress)),
+                    on_checkpoint=on_checkpoint,
+                    resume=job.get("resume"),
+                    user_fields=job.get("user_fields"),
+                    precomputed=job.get("precomputed"),
+                )
+                # Lite mode (no Playwright): fill_form reports the usual failure itself
+                fill = asyncio.ensure_future(_engine_fill(engine, job, browser))
+                next_message = asyncio.ensure_future(inbox.get())
+                await asyncio.wait({fill, next_message}, return_when=asyncio.FIRST_COMPLETED)
+                if fill.done():
+                    next_message.cancel()
+                    conn.send(("result", fill.result()))
+                    continue
+                # "cancel" (or the API side went away): abort the job, keep the browser
+                fill.cancel()
+                await asyncio.gather(fill, return_exceptions=True)
+                if next_message.result() is None:
+                    break
+                conn.send(("cancelled", None))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        if browser is not None:
+            await browser.close()
+        if playwright is not None:
+            await playwright.stop()
+
+
+def _engine_fill(engine, job: Dict[str, Any], browser=None) -> Awaitable[Dict[str, Any]]:
+    """engine.fill_form() for `job`, under the job profiler when the job asked for it."""
+    profiling = job.get("profiling")
+    if not profiling:
+        return engine.fill_form(job["form_url"], job["auto_submit"], browser=browser)
+    from app.services.job_profiler import run_profiled
+
+    return run_profiled(
+        lambda trace_path: engine.fill_form(job["form_url"], job["auto_submit"], browser=browser, trace_path=trace_path),
+        trace=profiling.get("trace", False),
+    )
+
+
+# ─── API process side ───────────────────────────────────────
+class _WorkerHandle:
+    def __init__(self, ctx, max_jobs: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, max_jobs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs_left = max_jobs
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class FillWorkerPool:
+    """Caps concurrent fill processes and hands jobs to idle (warm) workers."""
+
+    def __init__(self, processes: int = FILL_WORKER_PROCESSES, max_jobs: int = FILL_WORKER_MAX_JOBS):
+        self.processes = max(1, processes)
+        self.max_jobs = max(1, max_jobs)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: List[_WorkerHandle] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def run(self, job: Dict[str, Any], on_progress: Optional[ProgressCallback] = None,
+                  on_checkpoint: Optional[CheckpointCallback] = None) -> Dict[str, Any]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.processes)
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            worker = None
+            while self._idle and worker is None:
+                candidate = self._idle.pop()
+                if candidate.process.is_alive():
+                    worker = candidate
+            if worker is None:
+                worker = await loop.run_in_executor(None, _WorkerHandle, self._ctx, self.max_jobs)
+
+            pending = None
+            try:
+                worker.conn.send(job)
+                while True:
+                    # Shielded: on cancellation the in-flight recv is handed to _abort
+                    pending = loop.run_in_executor(None, worker.conn.recv)
+                    kind, payload = await asyncio.shield(pending)
+                    pending = None
+                    if kind == "progress":
+                        if on_progress:
+                            await on_progress(payload)
+                        continue
+                    if kind == "checkpoint":
+                        ok, error = True, None
+                        if on_checkpoint:
+                            try:
+                                await on_checkpoint(payload)
+                            except Exception as e:  # As inline: the job goes on, the worker stays warm
+                                ok, error = False, str(e)
+                                print(f"⚠ Checkpoint after page {payload['page_index']} failed: {e}")
+                        worker.conn.send(("checkpoint_ack", ok, error))
+                        continue
+                    break
+            except (EOFError, OSError) as e:
+                worker.kill()
+                raise FillWorkerCrashed(f"Fill worker process exited unexpectedly ({e or 'no result'})")
+            except asyncio.CancelledError:
+                if await self._abort(worker, pending):
+                    self._recycle(worker)
+                else:
+                    worker.kill()
+                raise
+            except BaseException:
+                worker.kill()
+                raise
+
+            self._recycle(worker)
+
+        if kind == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    async def _abort(self, worker: _WorkerHandle, pending) -> bool:
+        """Ask the worker to cancel its job; True once it acknowledged and is reusable."""
+        loop = asyncio.get_running_loop()
+
+        async def until_done(pending):
+            while True:
+                if pending is None:
+                    pending = loop.run_in_executor(None, worker.conn.recv)
+                kind, _ = await pending
+                pending = None
+                if kind in ("cancelled", "result", "error"):
+                    return
+
+        try:
+            worker.conn.send("cancel")
+            await asyncio.wait_for(until_done(pending), FILL_CANCEL_GRACE_SECONDS)
+            return True
+        except (asyncio.TimeoutError, EOFError, OSError):
+            return False
+
+    def _recycle(self, worker: _WorkerHandle):
+        worker.jobs_left -= 1
+        if worker.jobs_left > 0:
+            self._idle.append(worker)
+        else:
+            worker.conn.close()  # The worker exits by itself after its last job
+
+    def shutdown(self):
+        while self._idle:
+            self._idle.pop().stop()
+
+
+_pool: Optional[FillWorkerPool] = None
+
+
+def get_worker_pool() -> FillWorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = FillWorkerPool()
+    return _pool
+
+
+def shutdown_worker_pool():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+async def run_fill(
+    profile_data: Dict[str, str],
+    learned: Dict[str, str],
+    form_url: str,
+    auto_submit: bool,
+    on_progress: Optional[ProgressCallback] = None,
+    on_checkpoint: Optional[CheckpointCallback] = None,
+    resume: Optional[Dict[str, Any]] = None,
+    user_fields: Optional[Dict[str, Any]] = None,
+    precomputed: Optional[Dict[str, str]] = None,
+    profiling: Optional[Dict[str, bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Run one fill job with the configured runtime and return the engine's result dict.
+    `resume` is a checkpoint of an earlier attempt; checkpoints are awaited in order.
+    `user_fields` is the user's extra-field spec (ProfileSnapshot.user_fields),
+    `precomputed` the answers generated on profile save (intent -> answer).
+    With `profiling` ({"trace": bool}) the result carries "profile_artifacts" (see job_profiler).
+    """
+    job = {
+        "profile": profile_data,
+        "learned": learned,
+        "form_url": form_url,
+        "auto_submit": auto_submit,
+        "resume": resume,
+        "user_fields": user_fields,
+        "precomputed": precomputed,
+        "profiling": profiling,
+    }
+    if FILL_WORKER_MODE == "process":
+        return await get_worker_pool().run(job, on_progress, on_checkpoint)
+
+    from app.services.form_filler import FormFillerEngine
+    from app.services.question_matcher import refresh_knowledge_base
+
+    await refresh_knowledge_base()
+
+    def _forward(progress: Dict[str, Any]):
+        if on_progress:
+            asyncio.ensure_future(on_progress(progress))
+
+    engine = FormFillerEngine(profile_data, learned, on_progress=_forward,
+                              on_checkpoint=on_checkpoint, resume=resume, user_fields=user_fields,
+                              precomputed=precomputed)
+    return await _engine_fill(engine, job)
+
+
+async def run_prefill(
+    profile_data: Dict[str, str],
+    learned: Dict[str, str],
+    form_url: str,
+    on_progress: Optional[ProgressCallback] = None,
+    user_fields: Optional[Dict[str, Any]] = None,
+    precomputed: Optional[Dict[str, str]] = None,
+    profiling: Optional[Dict[str, bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Resolve a form's answers into a prefilled link (result["prefilled_url"]).
+    Needs no browser, so it always runs on the API event loop. `profiling` as for run_fill (no trace).
+    """
+    from app.services.form_filler import FormFillerEngine
+    from app.services.question_matcher import refresh_knowledge_base
+
+    await refresh_knowledge_base()
+
+    def _forward(progress: Dict[str, Any]):
+        if on_progress:
+            asyncio.ensure_future(on_progress(progress))
+
+    engine = FormFillerEngine(profile_data, learned, on_progress=_forward, user_fields=user_fields,
+                              precomputed=precomputed)
+    if not profiling:
+        return await engine.prefill_form(form_url)
+    from app.services.job_profiler import run_profiled
+
+    return await run_profiled(lambda trace_path: engine.prefill_form(form_url))
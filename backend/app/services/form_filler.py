@@ -4,83 +4,253 @@ Detects all field types dynamically and fills them using profile data + AI.
 """
 import asyncio
 import datetime
+import inspect
 import re
-from typing import Dict, List, Optional, Any
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Any, Tuple, Union
 
-try:
-    from playwright.async_api import async_playwright, Page, Locator
-    HAS_PLAYWRIGHT = True
-except ImportError:
-    HAS_PLAYWRIGHT = False
+from app.config import (
+    HEADLESS, SLOW_MO, LLM_FORM_BUDGET_SECONDS, LLM_TIMEOUT_SECONDS, FILL_BULK_INJECT, FILL_RESOLVE_CONCURRENCY, ASSET_CACHE_ENABLED,
+)
+from app.services.question_matcher import FIELD_DESCRIPTIONS, amatch_with_knowledge_base, get_user_fields
+from app.services.ai_agent import agenerate_answer, detect_intent
+from app.services.asset_cache import attach as attach_asset_cache, summarize as summarize_asset_cache
+from app.services.fill_log import FieldType, FillLogEntry, FillStatus, LogClock
+from app.services.keyword_matcher import canonicalize_question
+from app.services.prefill import (
+    OTHER_OPTION, FormQuestion, build_prefilled_url, encode_date, fetch_form_html, parse_date, parse_form,
+)
+from app.utils.metrics import span, bind_job_timings, unbind_job_timings, record_cache, ACTIVE_BROWSERS
 
-from app.config import HEADLESS, SLOW_MO
-from app.services.question_matcher import match_question_to_field
-from app.services.ai_agent import generate_answer
+
+def learned_key(question: str) -> str:
+    """Lookup key for a learned mapping question (same as LearnedMapping.question_key)."""
+    return canonicalize_question(question)
+
+
+def build_learned_index(pairs: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """Build the engine's learned-mapping index from (question_text, answer_value) pairs."""
+    return {learned_key(question): answer for question, answer in pairs}
+
+
+def _load_playwright():
+    """Import Playwright on first fill; returns `async_playwright` or None in Lite mode."""
+    try:
+        from playwright.async_api import async_playwright
+        return async_playwright
+    except ImportError:
+        return None
+
+
+def best_option_index(texts: List[str], answer: str, values: Optional[List[str]] = None) -> Optional[int]:
+    """
+    Index of the choice that best fits `answer`: an exact (case-insensitive)
+    option text or data-value first, else the closest substring match, else None.
+    """
+    answer_lower = str(answer).lower().strip()
+    best_match = None
+    best_score = 0
+    for i, text in enumerate(texts):
+        text = text.strip().lower()
+        data_val = (values[i] if values else "") or ""
+        if text == answer_lower or data_val.lower() == answer_lower:
+            return i
+        if answer_lower in text or text in answer_lower:
+            score = len(answer_lower) / max(len(text), 1)
+            if score > best_score:
+                best_match = i
+                best_score = score
+    return best_match
+
+
+def matching_option_indexes(texts: List[str], answer: str) -> List[int]:
+    """Indexes of the checkbox options named by a comma-separated answer."""
+    answer_parts = [a.strip().lower() for a in str(answer).split(",")]
+    matches = []
+    for i, text in enumerate(texts):
+        text = text.strip().lower()
+        if any(part in text or text in part for part in answer_parts):
+            matches.append(i)
+    return matches
+
+
+QUESTION_CONTAINER_SELECTOR = '[role="listitem"], .geS5n, .Qr7Oae'
+TEXT_INPUT_SELECTOR = 'input[type="text"], input[type="email"], input[type="url"], input[type="tel"], input:not([type])'
+
+# Fill handler name -> (element set in-page, field type) for bulk injection
+INJECTABLE_FIELDS = {
+    "_fill_text_input": (TEXT_INPUT_SELECTOR, FieldType.TEXT),
+    "_fill_textarea": ("textarea", FieldType.PARAGRAPH),
+    "_fill_date": ('input[type="date"]', FieldType.DATE),
+}
+
+# Sets each value with the native setter (bypassing framework wrappers) and fires the
+# events Google Forms listens for. Arguments: [container selector, [{index, target, value}]].
+_INJECT_SCRIPT = """([selector, items]) => {
+    const containers = document.querySelectorAll(selector);
+    const setters = {
+        INPUT: Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set,
+        TEXTAREA: Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set,
+    };
+    for (const item of items) {
+        const container = containers[item.index];
+        const el = container && container.querySelector(item.target);
+        if (!el || !setters[el.tagName]) continue;
+        el.focus();
+        setters[el.tagName].call(el, item.value);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        el.blur();
+    }
+}"""
+
+_READ_BACK_SCRIPT = """([selector, items]) => {
+    const containers = document.querySelectorAll(selector);
+    return items.map(item => {
+        const container = containers[item.index];
+        const el = container && container.querySelector(item.target);
+        return el ? el.value : null;
+    });
+}"""
+
+
+CheckpointCallback = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
 
 
 class FormFillerEngine:
-    """Automated Google Form filler using Playwright."""
+    """
+    Automated Google Form filler using Playwright.
 
-    def __init__(self, profile_data: Dict[str, str], learned_mappings: Dict[str, str] = None):
+    After each page the engine reports a checkpoint to `on_checkpoint`:
+    {"page_index": pages completed, "answers": {question: [answer, source]},
+    "new_mappings": mappings learned since the previous checkpoint}. Passing a
+    previous checkpoint as `resume` reuses its answers, so the pages it
+    covers are refilled without matching or LLM calls.
+    """
+
+    def __init__(self, profile_data: Dict[str, str], learned_mappings: Dict[str, str] = None,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_checkpoint: Optional[CheckpointCallback] = None,
+                 resume: Optional[Dict[str, Any]] = None,
+                 user_fields: Optional[Dict[str, Any]] = None,
+                 precomputed: Optional[Dict[str, str]] = None):
         self.profile = profile_data
-        self.learned = learned_mappings or {}
-        self.log: List[Dict[str, Any]] = []
+        self.precomputed = precomputed or {}  # Intent -> LLM answer generated on profile save
+        self.user_fields_spec = user_fields  # ProfileSnapshot.user_fields(); resolved when the fill starts
+        self.user_fields = None
+        self.learned = learned_mappings or {}  # Index from build_learned_index()
+        self.on_progress = on_progress
+        self.on_checkpoint = on_checkpoint
+        resume = resume or {}
+        self.answers: Dict[str, List[str]] = dict(resume.get("answers", {}))
+        self._resumed_answers = {learned_key(q): tuple(a) for q, a in self.answers.items()}
+        self.resume_pages: int = resume.get("page_index", 0)
+        self.pages_completed = 0
+        self._mappings_flushed = 0
+        self.log: List[FillLogEntry] = []
+        self._log_clock = LogClock()
         self.questions_detected = 0
         self.questions_filled = 0
         self.ai_answers_used = 0
+        # Seconds this form may still spend waiting on the LLM provider (None = unlimited)
+        self.ai_budget_left: Optional[float] = LLM_FORM_BUDGET_SECONDS if LLM_FORM_BUDGET_SECONDS > 0 else None
         self.form_title = ""
         self.new_mappings: List[Dict[str, str]] = []
+        self.learned_used: Dict[str, str] = {}  # learned_key -> question, for learned answers this fill used
+        # learned_key -> mapping / AI count of a resolved answer, applied by _use_answer() once it is filled
+        self._answer_effects: Dict[str, Dict[str, Any]] = {}
+        self._form_pages: Dict[int, List[str]] = {}  # Page index -> question titles, from the form's structure
+        # learned_key(question) -> task resolving (answer, source); see _resolve()
+        self._resolving: Dict[str, "asyncio.Task"] = {}
+        self._resolve_slots: Optional[asyncio.Semaphore] = None
+        self.asset_stats: Dict[str, float] = {}  # Static asset cache requests/hits/bytes_saved
+        self.timings: Dict[str, float] = {}
+
+    def _add_log(self, question: str, field_type: FieldType, answer: str, source: str, status: FillStatus,
+                 error: str = ""):
+        entry = FillLogEntry(question, field_type, answer, source, status, error)
+        self.log.append(entry)
+        if self.on_progress:
+            self.on_progress({
+                "questions_detected": self.questions_detected,
+                "questions_filled": self.questions_filled,
+                "entry": entry,  # Serialised by the receiver only if it stores it
+            })
 
-    def _add_log(self, question: str, field_type: str, answer: str, source: str, status: str):
-        self.log.append({
-            "question": question,
-            "field_type": field_type,
-            "answer": answer,
-            "source": source,
-            "status": status,
-            "timestamp": datetime.datetime.utcnow().isoformat(),
-        })
-
-    def _get_answer(self, question: str) -> tuple:
+    async def _get_answer(self, question: str) -> tuple:
         """
         Get answer for question.
         Returns: (answer, source) where source is 'profile', 'learned', or 'ai'
+        Answers may be resolved ahead of their page, so the mapping to learn and
+        the AI answer count are only recorded by _use_answer() when it is filled.
         """
+        # 0. Reuse the answer from a previous attempt of this fill
+        resumed = self._resumed_answers.get(learned_key(question))
+        if resumed is not None:
+            return resumed
+
         # 1. Check learned mappings first
-        q_lower = question.strip().lower()
-        for learned_q, learned_val in self.learned.items():
-            if learned_q.lower() == q_lower:
-                return learned_val, "learned"
+        learned_val = self.learned.get(learned_key(question))
+        record_cache("learned_mappings", learned_val is not None)
+        if learned_val is not None:
+            return learned_val, "learned"
 
-        # 2. Try matching to profile field
-        field_name, confidence = match_question_to_field(question)
+        # 2. Try matching to profile field (global question KB first, then the matcher)
+        field_name, confidence, shared = await amatch_with_knowledge_base(question, user_fields=self.user_fields)
         if field_name and field_name in self.profile:
             value = self.profile[field_name]
             if value and value.strip():
-                # Save as learned mapping for future
-                self.new_mappings.append({
+                # Save as learned mapping for future; KB hits are not voted into the KB again
+                self._answer_effects[learned_key(question)] = {"mapping": {
                     "question": question,
                     "field": field_name,
                     "value": value,
                     "confidence": int(confidence * 100),
-                })
+                    "shared": shared,
+                    # Extra fields are personal: never voted into the shared KB
+                    "custom": field_name not in FIELD_DESCRIPTIONS,
+                }}
+                if shared:
+                    return value, f"profile ({field_name}, {confidence:.0%}, shared)"
                 return value, f"profile ({field_name}, {confidence:.0%})"
 
-        # 3. Use AI agent to generate answer
-        ai_answer = generate_answer(question, self.profile)
-        self.ai_answers_used += 1
-        self.new_mappings.append({
-            "question": question,
-            "field": "ai_generated",
-            "value": ai_answer,
-            "confidence": 70,
-        })
-        return ai_answer, "ai_generated"
-
-    async def _fill_text_input(self, container: 'Locator', question: str):
+        # 3. Answer generated in advance for this question intent (not learned: it follows the profile)
+        if self.precomputed:
+            intent = detect_intent(question)
+            if intent in self.precomputed:
+                record_cache("precomputed_answers", True)
+                self._answer_effects[learned_key(question)] = {"ai": True}
+                return self.precomputed[intent], "ai_generated (precomputed)"
+            record_cache("precomputed_answers", False)
+
+        # 4. Use AI agent to generate answer. The call's longest wait is reserved from the
+        # form's budget before it starts (so concurrent calls cannot overspend it) and the
+        # unused part is returned when it ends.
+        grant = None
+        if self.ai_budget_left is not None:
+            grant = max(0.0, min(self.ai_budget_left, LLM_TIMEOUT_SECONDS))
+            self.ai_budget_left -= grant
+        start = time.perf_counter()
+        try:
+            ai_answer, path = await agenerate_answer(question, self.profile, budget=grant)
+        finally:
+            if grant is not None:
+                self.ai_budget_left += max(0.0, grant - (time.perf_counter() - start))
+        effects = {"ai": True}
+        # Stand-in local answers ("local, hedged" etc.) are not learned, so the next fill asks the LLM again
+        if not path.startswith("local, "):
+            effects["mapping"] = {
+                "question": question,
+                "field": "ai_generated",
+                "value": ai_answer,
+                "confidence": 70,
+            }
+        self._answer_effects[learned_key(question)] = effects
+        return ai_answer, f"ai_generated ({path})"
+
+    async def _fill_text_input(self, container: 'Locator', question: str, answer: str, source: str):
         """Fill a short text input field."""
-        answer, source = self._get_answer(question)
-        input_el = container.locator('input[type="text"], input[type="email"], input[type="url"], input[type="tel"], input:not([type])')
+        input_el = container.locator(TEXT_INPUT_SELECTOR)
         
         try:
             first_input = input_el.first
@@ -89,15 +259,14 @@ class FormFillerEngine:
                 await first_input.fill("")
                 await first_input.fill(str(answer))
                 self.questions_filled += 1
-                self._add_log(question, "text", str(answer), source, "filled")
+                self._add_log(question, FieldType.TEXT, str(answer), source, FillStatus.FILLED)
                 return True
         except Exception as e:
-            self._add_log(question, "text", str(answer), source, f"error: {e}")
+            self._add_log(question, FieldType.TEXT, str(answer), source, FillStatus.ERROR, str(e))
         return False
 
-    async def _fill_textarea(self, container: 'Locator', question: str):
+    async def _fill_textarea(self, container: 'Locator', question: str, answer: str, source: str):
         """Fill a paragraph/textarea field."""
-        answer, source = self._get_answer(question)
         textarea = container.locator("textarea")
         
         try:
@@ -106,15 +275,14 @@ class FormFillerEngine:
                 await textarea.first.fill("")
                 await textarea.first.fill(str(answer))
                 self.questions_filled += 1
-                self._add_log(question, "paragraph", str(answer), source, "filled")
+                self._add_log(question, FieldType.PARAGRAPH, str(answer), source, FillStatus.FILLED)
                 return True
         except Exception as e:
-            self._add_log(question, "paragraph", str(answer), source, f"error: {e}")
+            self._add_log(question, FieldType.PARAGRAPH, str(answer), source, FillStatus.ERROR, str(e))
         return False
 
-    async def _fill_radio(self, container: 'Locator', question: str):
+    async def _fill_radio(self, container: 'Locator', question: str, answer: str, source: str):
         """Select a radio button option."""
-        answer, source = self._get_answer(question)
         options = container.locator('[role="radio"], [data-value]')
         
         try:
@@ -124,72 +292,51 @@ class FormFillerEngine:
                 count = await options.count()
 
             if count > 0:
-                answer_lower = str(answer).lower().strip()
-                best_match = None
-                best_score = 0
-
+                texts, values = [], []
                 for i in range(count):
                     opt = options.nth(i)
-                    text = (await opt.inner_text()).strip().lower()
-                    data_val = await opt.get_attribute("data-value") or ""
-
-                    if text == answer_lower or data_val.lower() == answer_lower:
-                        best_match = i
-                        best_score = 1.0
-                        break
-
-                    if answer_lower in text or text in answer_lower:
-                        score = len(answer_lower) / max(len(text), 1)
-                        if score > best_score:
-                            best_match = i
-                            best_score = score
+                    texts.append(await opt.inner_text())
+                    values.append(await opt.get_attribute("data-value") or "")
+                best_match = best_option_index(texts, answer, values)
 
                 if best_match is not None:
                     await options.nth(best_match).click()
                     self.questions_filled += 1
                     selected_text = (await options.nth(best_match).inner_text()).strip()
-                    self._add_log(question, "radio", selected_text, source, "filled")
+                    self._add_log(question, FieldType.RADIO, selected_text, source, FillStatus.FILLED)
                     return True
                 else:
                     await options.first.click()
                     self.questions_filled += 1
                     selected_text = (await options.first.inner_text()).strip()
-                    self._add_log(question, "radio", selected_text, "fallback_first", "filled")
+                    self._add_log(question, FieldType.RADIO, selected_text, "fallback_first", FillStatus.FILLED)
                     return True
         except Exception as e:
-            self._add_log(question, "radio", str(answer), source, f"error: {e}")
+            self._add_log(question, FieldType.RADIO, str(answer), source, FillStatus.ERROR, str(e))
         return False
 
-    async def _fill_checkbox(self, container: 'Locator', question: str):
+    async def _fill_checkbox(self, container: 'Locator', question: str, answer: str, source: str):
         """Select checkbox options."""
-        answer, source = self._get_answer(question)
         options = container.locator('[role="checkbox"], label.docssharedWizToggleLabeledContent')
         
         try:
             count = await options.count()
             if count > 0:
-                answer_parts = [a.strip().lower() for a in str(answer).split(",")]
-                checked = False
-                for i in range(count):
-                    opt = options.nth(i)
-                    text = (await opt.inner_text()).strip().lower()
-                    for part in answer_parts:
-                        if part in text or text in part:
-                            await opt.click()
-                            checked = True
-                            break
-                if not checked:
+                texts = [await options.nth(i).inner_text() for i in range(count)]
+                matches = matching_option_indexes(texts, answer)
+                for i in matches:
+                    await options.nth(i).click()
+                if not matches:
                     await options.first.click()
                 self.questions_filled += 1
-                self._add_log(question, "checkbox", str(answer), source, "filled")
+                self._add_log(question, FieldType.CHECKBOX, str(answer), source, FillStatus.FILLED)
                 return True
         except Exception as e:
-            self._add_log(question, "checkbox", str(answer), source, f"error: {e}")
+            self._add_log(question, FieldType.CHECKBOX, str(answer), source, FillStatus.ERROR, str(e))
         return False
 
-    async def _fill_dropdown(self, container: 'Locator', question: str):
+    async def _fill_dropdown(self, container: 'Locator', question: str, answer: str, source: str):
         """Select from a dropdown menu."""
-        answer, source = self._get_answer(question)
         try:
             dropdown = container.locator('[role="listbox"], .quantumWizMenuPaperselectEl')
             if await dropdown.count() > 0:
@@ -210,21 +357,20 @@ class FormFillerEngine:
                     idx = 1 if count > 1 else 0
                     await options.nth(idx).click()
                 self.questions_filled += 1
-                self._add_log(question, "dropdown", str(answer), source, "filled")
+                self._add_log(question, FieldType.DROPDOWN, str(answer), source, FillStatus.FILLED)
                 return True
         except Exception as e:
-            self._add_log(question, "dropdown", str(answer), source, f"error: {e}")
+            self._add_log(question, FieldType.DROPDOWN, str(answer), source, FillStatus.ERROR, str(e))
         return False
 
-    async def _fill_date(self, container: 'Locator', question: str):
+    async def _fill_date(self, container: 'Locator', question: str, answer: str, source: str):
         """Fill a date input field."""
-        answer, source = self._get_answer(question)
         try:
             date_input = container.locator('input[type="date"]')
             if await date_input.count() > 0:
                 await date_input.first.fill(str(answer))
                 self.questions_filled += 1
-                self._add_log(question, "date", str(answer), source, "filled")
+                self._add_log(question, FieldType.DATE, str(answer), source, FillStatus.FILLED)
                 return True
             inputs = container.locator("input")
             count = await inputs.count()
@@ -234,14 +380,14 @@ class FormFillerEngine:
                 for i in range(min(count, 3)):
                     await inputs.nth(i).fill(date_parts[i] if i < len(date_parts) else "")
                 self.questions_filled += 1
-                self._add_log(question, "date", f"{today}", source, "filled")
+                self._add_log(question, FieldType.DATE, f"{today}", source, FillStatus.FILLED)
                 return True
         except Exception as e:
-            self._add_log(question, "date", str(answer), source, f"error: {e}")
+            self._add_log(question, FieldType.DATE, str(answer), source, FillStatus.ERROR, str(e))
         return False
 
-    async def _detect_and_fill_question(self, container: 'Locator'):
-        """Detect field type and fill."""
+    async def _question_text(self, container: 'Locator') -> str:
+        """The container's question title, or "" when it has none."""
         question_label = container.locator('[role="heading"], .freebirdFormviewerComponentsQuestionBaseTitle, .M7eMe')
         question_text = ""
         try:
@@ -253,85 +399,365 @@ class FormFillerEngine:
                 all_text = await container.inner_text()
                 lines = [l.strip() for l in all_text.split("\n") if l.strip()]
                 question_text = lines[0] if lines else ""
-            except: return
-        if not question_text or len(question_text) < 2: return
-        self.questions_detected += 1
-        
+            except: return ""
+        return question_text if len(question_text) >= 2 else ""
+
+    def _resolve(self, question: str) -> "asyncio.Task":
+        """
+        Task resolving (answer, source) for the question, started on first request
+        and shared by repeats of the same canonical question. At most
+        FILL_RESOLVE_CONCURRENCY answers are resolved at once.
+        """
+        key = learned_key(question)
+        task = self._resolving.get(key)
+        if task is None:
+            if self._resolve_slots is None:
+                self._resolve_slots = asyncio.Semaphore(max(1, FILL_RESOLVE_CONCURRENCY))
+
+            async def resolve():
+                async with self._resolve_slots:
+                    return await self._get_answer(question)
+
+            task = self._resolving[key] = asyncio.ensure_future(resolve())
+        return task
+
+    def _cancel_resolving(self):
+        """Drop answers still being resolved (e.g. for pages the fill never reached)."""
+        for task in self._resolving.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Retrieved, so an unused failure is not reported as unhandled
+
+    async def _read_form_pages(self, page: 'Page'):
+        """Read the questions of each form page from the form's embedded structure. Best effort."""
+        try:
+            _, questions = parse_form(await page.content())
+        except Exception:
+            return
+        for question in questions:
+            if question.field_type != "unknown" and question.title:
+                self._form_pages.setdefault(question.page, []).append(question.title)
+
+    def _prefetch_page(self, index: int):
+        """
+        Start resolving the questions of form page `index`, so its answers are
+        ready when it loads. Only the next page is prefetched: on forms that
+        branch, pages further on may never be reached.
+        """
+        for question in self._form_pages.get(index, []):
+            self._resolve(question)
+
+    async def _fill_page(self, page: 'Page'):
+        """
+        Fill every question on the current page. Each answer starts resolving as
+        soon as its question is read; fields are then filled one at a time (page
+        interaction stays serial), each as soon as its answer is ready. With
+        FILL_BULK_INJECT, text/paragraph/date answers are set by _inject_answers.
+        """
+        question_containers = page.locator(QUESTION_CONTAINER_SELECTOR)
+        count = await question_containers.count()
+        waiting: Dict["asyncio.Task", List[tuple]] = {}
+        for i in range(count):
+            container = question_containers.nth(i)
+            question_text = await self._question_text(container)
+            if not question_text:
+                continue
+            self.questions_detected += 1
+            with span("detect"):
+                fill_method = await self._detect_fill_method(container)
+            if fill_method is None:
+                self._add_log(question_text, FieldType.UNKNOWN, "", "none", FillStatus.SKIPPED)
+                continue
+            waiting.setdefault(self._resolve(question_text), []).append((i, container, question_text, fill_method))
+
+        injections: List[tuple] = []
+        while waiting:
+            done, _ = await asyncio.wait(list(waiting), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                answer, source = task.result()
+                for index, container, question_text, fill_method in waiting.pop(task):
+                    self._use_answer(question_text, answer, source)
+                    if FILL_BULK_INJECT and fill_method.__name__ in INJECTABLE_FIELDS:
+                        injections.append((index, container, question_text, answer, source, fill_method))
+                        continue
+                    with span("fill"):
+                        await fill_method(container, question_text, answer, source)
+        if injections:
+            await self._inject_answers(page, injections)
+
+    async def _inject_answers(self, page: 'Page', injections: List[tuple]):
+        """
+        Set the queued answers with one page.evaluate, read them back once, and
+        fill the fields that did not take the value through their normal handler.
+        """
+        items = [
+            {"index": index, "target": INJECTABLE_FIELDS[fill_method.__name__][0], "value": str(answer)}
+            for index, _, _, answer, _, fill_method in injections
+        ]
+        with span("fill"):
+            try:
+                await page.evaluate(_INJECT_SCRIPT, [QUESTION_CONTAINER_SELECTOR, items])
+                values = await page.evaluate(_READ_BACK_SCRIPT, [QUESTION_CONTAINER_SELECTOR, items])
+            except Exception as e:
+                print(f"⚠ Bulk answer injection failed, filling fields one by one: {e}")
+                values = [None] * len(items)
+            for (_, container, question, answer, source, fill_method), item, value in zip(injections, items, values):
+                if value is not None and value.replace("\r\n", "\n") == item["value"].replace("\r\n", "\n"):
+                    self.questions_filled += 1
+                    self._add_log(question, INJECTABLE_FIELDS[fill_method.__name__][1], str(answer), source, FillStatus.FILLED)
+                else:
+                    await fill_method(container, question, answer, source)
+
+    def _use_answer(self, question: str, answer: str, source: str):
+        """
+        Record the answer given to a question on the form (checkpointed), with
+        the usage of learned answers and the mapping / AI count of its resolution.
+        """
+        self.answers[question] = [answer, source]
+        key = learned_key(question)
+        if source == "learned" and key not in self._resumed_answers:
+            self.learned_used[key] = question
+        effects = self._answer_effects.pop(key, None)
+        if effects:
+            if effects.get("mapping"):
+                self.new_mappings.append(effects["mapping"])
+            if effects.get("ai"):
+                self.ai_answers_used += 1
+
+    async def _checkpoint(self):
+        """Record a completed page and report the answers and not yet flushed mappings."""
+        self.pages_completed += 1
+        if self.on_checkpoint is None or self.pages_completed <= self.resume_pages:
+            return
+        pending = self.new_mappings[self._mappings_flushed:]
+        checkpoint = {
+            "page_index": self.pages_completed,
+            "answers": dict(self.answers),
+            "new_mappings": pending,
+        }
+        try:
+            with span("checkpoint"):
+                maybe_awaitable = self.on_checkpoint(checkpoint)
+                if inspect.isawaitable(maybe_awaitable):
+                    await maybe_awaitable
+            self._mappings_flushed += len(pending)
+        except Exception as e:
+            # Unflushed mappings are retried with the next checkpoint or the final result
+            print(f"⚠ Checkpoint after page {self.pages_completed} failed: {e}")
+
+    async def _detect_fill_method(self, container: 'Locator'):
+        """Return the fill handler for the container's field type, or None if unsupported."""
         if await container.locator("textarea").count() > 0:
-            await self._fill_textarea(container, question_text)
-        elif await container.locator('[role="radio"]').count() > 0:
-            await self._fill_radio(container, question_text)
-        elif await container.locator('[role="checkbox"]').count() > 0:
-            await self._fill_checkbox(container, question_text)
-        elif await container.locator('[role="listbox"]').count() > 0:
-            await self._fill_dropdown(container, question_text)
-        elif await container.locator('input[type="date"]').count() > 0:
-            await self._fill_date(container, question_text)
-        else:
-            text_inputs = container.locator('input[type="text"], input[type="email"], input[type="url"], input[type="tel"], input[type="number"], input:not([type])')
-            if await text_inputs.count() > 0:
-                await self._fill_text_input(container, question_text)
+            return self._fill_textarea
+        if await container.locator('[role="radio"]').count() > 0:
+            return self._fill_radio
+        if await container.locator('[role="checkbox"]').count() > 0:
+            return self._fill_checkbox
+        if await container.locator('[role="listbox"]').count() > 0:
+            return self._fill_dropdown
+        if await container.locator('input[type="date"]').count() > 0:
+            return self._fill_date
+        text_inputs = container.locator('input[type="text"], input[type="email"], input[type="url"], input[type="tel"], input[type="number"], input:not([type])')
+        if await text_inputs.count() > 0:
+            return self._fill_text_input
+        return None
+
+    async def fill_form(self, form_url: str, auto_submit: bool = False, browser=None,
+                        trace_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Main entry: fill form (Lite protected).
+        Pass `browser` to reuse an already launched Chromium (fill workers); only
+        this job's context is closed afterwards. With `trace_path` the context's
+        Playwright trace is saved there.
+        """
+        result = self._new_result()
+
+        async_playwright = _load_playwright() if browser is None else None
+        if browser is None and async_playwright is None:
+            result["status"] = "failed"
+            result["error_message"] = "Browser automation is disabled in this environment (Lite mode)."
+            return result
+
+        timings_token = bind_job_timings(self.timings)
+        try:
+            with span("user_fields"):
+                self.user_fields = await get_user_fields(self.user_fields_spec)
+            if browser is not None:
+                await self._fill_in_browser(browser, form_url, auto_submit, result, trace_path)
             else:
-                self._add_log(question_text, "unknown", "", "none", "skipped")
+                async with async_playwright() as p:
+                    own_browser = None
+                    try:
+                        own_browser = await launch_browser(p)
+                        await self._fill_in_browser(own_browser, form_url, auto_submit, result, trace_path)
+                    except Exception as e:
+                        result["status"] = "failed"
+                        result["error_message"] = str(e)
+                    finally:
+                        if own_browser:
+                            await own_browser.close()
+                            ACTIVE_BROWSERS.dec()
+        finally:
+            unbind_job_timings(timings_token)
+        return self._finish_result(result)
+
+    async def prefill_form(self, form_url: str, html: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve answers for every question of the form (all pages at once) and
+        return them as a prefilled viewform link in result["prefilled_url"].
+        No browser is started and nothing is submitted. `html` is the served form
+        page; it is downloaded when not given.
+        """
+        result = self._new_result()
+        result["prefilled_url"] = ""
+        timings_token = bind_job_timings(self.timings)
+        try:
+            with span("user_fields"):
+                self.user_fields = await get_user_fields(self.user_fields_spec)
+            with span("goto"):
+                if html is None:
+                    html, form_url = await fetch_form_html(form_url)
+                self.form_title, questions = parse_form(html)
+            result["form_title"] = self.form_title
+
+            for question in questions:
+                if question.field_type != "unknown" and question.title:
+                    self._resolve(question.title)
+            params: List[Tuple[str, str]] = []
+            for question in questions:
+                params.extend(await self._prefill_question(question))
+            result["prefilled_url"] = build_prefilled_url(form_url, params)
+            result["status"] = "completed"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error_message"] = str(e)
+        finally:
+            self._cancel_resolving()
+            unbind_job_timings(timings_token)
+        return self._finish_result(result)
 
-    async def fill_form(self, form_url: str, auto_submit: bool = False) -> Dict[str, Any]:
-        """Main entry: fill form (Lite protected)."""
-        result = {
+    async def _prefill_question(self, question: FormQuestion) -> List[Tuple[str, str]]:
+        """Answer one parsed question; returns its (entry key, value) query parameters."""
+        self.questions_detected += 1
+        if question.field_type == "unknown" or not question.title:
+            self._add_log(question.title, FieldType.UNKNOWN, "", "none", FillStatus.SKIPPED)
+            return []
+
+        answer, source = await self._resolve(question.title)
+        self._use_answer(question.title, answer, source)
+        key = question.key
+        if question.field_type in ("radio", "dropdown"):
+            best_match = best_option_index(question.options, answer)
+            if best_match is not None:
+                values = [question.options[best_match]]
+            elif question.has_other:
+                values = [OTHER_OPTION]
+            else:
+                values, source = question.options[:1], "fallback_first"
+        elif question.field_type == "checkbox":
+            values = [question.options[i] for i in matching_option_indexes(question.options, answer)]
+            if not values:
+                values = [OTHER_OPTION] if question.has_other else question.options[:1]
+        elif question.field_type == "date":
+            # Same fallback as the browser fill: today's date when the answer is not a date
+            values = [encode_date(question, parse_date(answer) or datetime.date.today())]
+        else:
+            values = [str(answer)] if str(answer).strip() else []
+
+        if not values:
+            self._add_log(question.title, FieldType(question.field_type), str(answer), source, FillStatus.SKIPPED)
+            return []
+        params = [(key, value) for value in values]
+        if OTHER_OPTION in values:
+            params.append((f"{key}.other_option_response", str(answer)))
+            values = [str(answer) if value == OTHER_OPTION else value for value in values]
+        self.questions_filled += 1
+        self._add_log(question.title, FieldType(question.field_type), ", ".join(values), source, FillStatus.PREFILLED)
+        return params
+
+    def _new_result(self) -> Dict[str, Any]:
+        return {
             "status": "pending", "form_title": "", "questions_detected": 0,
             "questions_filled": 0, "ai_answers_used": 0, "auto_submitted": False,
             "error_message": "", "fill_log": [], "new_mappings": [],
         }
 
-        if not HAS_PLAYWRIGHT:
-            result["status"] = "failed"
-            result["error_message"] = "Browser automation is disabled in this environment (Lite mode)."
-            return result
+    def _finish_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy the engine's counters, log, unflushed mappings and timings into `result`."""
+        result["questions_detected"] = self.questions_detected
+        result["questions_filled"] = self.questions_filled
+        result["ai_answers_used"] = self.ai_answers_used
+        result["fill_log"] = [entry.to_dict(self._log_clock) for entry in self.log]
+        result["new_mappings"] = self.new_mappings[self._mappings_flushed:]
+        result["learned_used"] = list(self.learned_used.values())
+        result["pages_completed"] = self.pages_completed
+        result["timings"] = {stage: round(secs, 4) for stage, secs in self.timings.items()}
+        if self.asset_stats:
+            result["asset_cache"] = summarize_asset_cache(self.asset_stats)
+        return result
 
-        async with async_playwright() as p:
-            browser = None
-            try:
-                browser = await p.chromium.launch(headless=HEADLESS, slow_mo=SLOW_MO)
-                context = await browser.new_context(viewport={"width": 1280, "height": 900})
-                page = await context.new_page()
+    async def _fill_in_browser(self, browser, form_url: str, auto_submit: bool, result: Dict[str, Any],
+                               trace_path: Optional[str] = None):
+        """Run one fill in a fresh context of `browser`; failures are recorded in `result`."""
+        context = None
+        try:
+            context = await browser.new_context(viewport={"width": 1280, "height": 900})
+            if trace_path:
+                await context.tracing.start(screenshots=True, snapshots=True)
+            if ASSET_CACHE_ENABLED:
+                await attach_asset_cache(context, self.asset_stats)
+            page = await context.new_page()
+            with span("goto"):
                 await page.goto(form_url, wait_until="networkidle", timeout=30000)
                 await asyncio.sleep(2)
 
-                try:
-                    title_el = page.locator('[role="heading"][aria-level="1"], .freebirdFormviewerViewHeaderTitle, .F9yp7e')
-                    if await title_el.count() > 0:
-                        self.form_title = (await title_el.first.inner_text()).strip()
-                except: self.form_title = "Untitled Form"
-                result["form_title"] = self.form_title
-
-                for page_attempt in range(5): # Multi-page support
-                    question_containers = page.locator('[role="listitem"], .geS5n, .Qr7Oae')
-                    count = await question_containers.count()
-                    for i in range(count):
-                        await self._detect_and_fill_question(question_containers.nth(i))
-                    
-                    next_btn = page.locator('div[role="button"]:has-text("Next"), span:has-text("Next")')
-                    if await next_btn.count() > 0:
+            try:
+                title_el = page.locator('[role="heading"][aria-level="1"], .freebirdFormviewerViewHeaderTitle, .F9yp7e')
+                if await title_el.count() > 0:
+                    self.form_title = (await title_el.first.inner_text()).strip()
+            except: self.form_title = "Untitled Form"
+            result["form_title"] = self.form_title
+            await self._read_form_pages(page)
+
+            for page_attempt in range(5): # Multi-page support
+                self._prefetch_page(self.pages_completed + 1)  # Resolved while this page is filled and the next loads
+                await self._fill_page(page)
+                await self._checkpoint()
+
+                next_btn = page.locator('div[role="button"]:has-text("Next"), span:has-text("Next")')
+                if await next_btn.count() > 0:
+                    with span("navigate"):
                         await next_btn.first.click()
                         await asyncio.sleep(1.5)
-                    else: break
+                else: break
 
-                if auto_submit:
-                    submit_btn = page.locator('div[role="button"]:has-text("Submit"), .freebirdFormviewerNavigationSubmitButton')
-                    if await submit_btn.count() > 0:
+            if auto_submit:
+                submit_btn = page.locator('div[role="button"]:has-text("Submit"), .freebirdFormviewerNavigationSubmitButton')
+                if await submit_btn.count() > 0:
+                    with span("submit"):
                         await submit_btn.first.click()
                         await asyncio.sleep(2)
-                        result["auto_submitted"] = True
+                    result["auto_submitted"] = True
 
-                result["status"] = "completed"
-            except Exception as e:
-                result["status"] = "failed"
-                result["error_message"] = str(e)
-            finally:
-                if browser: await browser.close()
+            result["status"] = "completed"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error_message"] = str(e)
+        finally:
+            self._cancel_resolving()
+            if context:
+                if trace_path:
+                    try:
+                        await context.tracing.stop(path=trace_path)
+                    except Exception as e:
+                        print(f"⚠ Could not save the Playwright trace: {e}")
+                await context.close()
 
-        result["questions_detected"] = self.questions_detected
-        result["questions_filled"] = self.questions_filled
-        result["ai_answers_used"] = self.ai_answers_used
-        result["fill_log"] = self.log
-        result["new_mappings"] = self.new_mappings
-        return result
+
+async def launch_browser(playwright):
+    """Launch Chromium with the configured headless/slow-mo settings."""
+    with span("browser_launch"):
+        browser = await playwright.chromium.launch(headless=HEADLESS, slow_mo=SLOW_MO)
+    ACTIVE_BROWSERS.inc()
+    return browser
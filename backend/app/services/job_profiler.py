@@ -0,0 +1,124 @@
+"""
+Opt-in profiling of single fill jobs (`"profile": true` on POST /api/forms/fill).
+
+`run_profiled()` wraps one engine call, in whichever process runs the engine
+(API event loop or fill worker), and adds result["profile_artifacts"]:
+
+* a CPU profile: pyinstrument's HTML report when pyinstrument is installed
+  (sampling every PROFILE_SAMPLE_INTERVAL_MS, async-aware, so other fills on
+  the same event loop are not attributed to this one), otherwise a cProfile
+  dump (stdlib, deterministic; it sees everything the thread runs while the
+  job is active). Either is stored gzip-compressed; open the dump with
+  `python -m pstats` or snakeviz after gunzip.
+* with `trace`, a Playwright trace of the job's browser context (screenshots
+  and DOM snapshots; `playwright show-trace trace.zip`), stored as recorded.
+
+`store_artifacts()` saves them as JobArtifact documents, removed by MongoDB's
+TTL monitor after PROFILE_ARTIFACT_TTL_HOURS. Jobs without the flag never
+import or call this module.
+"""
+import gzip
+import marshal
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import PROFILE_ARTIFACT_MAX_BYTES, PROFILE_ARTIFACT_TTL_HOURS, PROFILE_SAMPLE_INTERVAL_MS
+
+
+def _start_profiler():
+    """A running pyinstrument Profiler or cProfile.Profile; None if another profiler holds the thread."""
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # One cProfile per thread: another inline job is being profiled
+            print(f"⚠ Job profiling skipped: {e}")
+            return None
+        return profiler
+    profiler = Profiler(interval=PROFILE_SAMPLE_INTERVAL_MS / 1000, async_mode="enabled")
+    profiler.start()
+    return profiler
+
+
+def _stop_profiler(profiler) -> Dict[str, Any]:
+    """Stop `profiler` and return its report as a gzip-compressed artefact."""
+    import cProfile
+
+    if isinstance(profiler, cProfile.Profile):
+        import pstats
+        profiler.disable()
+        data, filename = marshal.dumps(pstats.Stats(profiler).stats), "profile.pstats.gz"  # = dump_stats()
+    else:
+        profiler.stop()
+        data, filename = profiler.output_html().encode("utf-8"), "profile.html.gz"
+    return {
+        "kind": "cpu_profile",
+        "filename": filename,
+        "content_type": "application/gzip",
+        "data": gzip.compress(data),
+    }
+
+
+async def run_profiled(run: Callable[[Optional[str]], Awaitable[Dict[str, Any]]], trace: bool = False) -> Dict[str, Any]:
+    """
+    Await `run(trace_path)` under a CPU profiler and return its result with "profile_artifacts".
+    `trace_path` is where the engine should save a Playwright trace, or None when not tracing.
+    """
+    trace_dir = tempfile.mkdtemp(prefix="fill-trace-") if trace else None
+    trace_path = os.path.join(trace_dir, "trace.zip") if trace_dir else None
+    try:
+        profiler = _start_profiler()
+        try:
+            result = await run(trace_path)
+        finally:
+            artifacts = [_stop_profiler(profiler)] if profiler is not None else []
+        if trace_path and os.path.exists(trace_path):
+            with open(trace_path, "rb") as f:
+                artifacts.append({
+                    "kind": "playwright_trace",
+                    "filename": "trace.zip",
+                    "content_type": "application/zip",
+                    "data": f.read(),
+                })
+    finally:
+        if trace_dir:
+            shutil.rmtree(trace_dir, ignore_errors=True)
+    result["profile_artifacts"] = artifacts
+    return result
+
+
+async def store_artifacts(user_id: str, history_id: str, artifacts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Save a job's artefacts; returns the references kept on FormHistory.artifacts
+    ({id, kind, filename, size, expires_at}). Artefacts over PROFILE_ARTIFACT_MAX_BYTES are dropped.
+    """
+    from app.models import JobArtifact
+
+    expires_at = datetime.utcnow() + timedelta(hours=PROFILE_ARTIFACT_TTL_HOURS)
+    refs = []
+    for artifact in artifacts:
+        size = len(artifact["data"])
+        if size > PROFILE_ARTIFACT_MAX_BYTES:
+            print(f"⚠ {artifact['filename']} of fill {history_id} is {size} bytes "
+                  f"(limit {PROFILE_ARTIFACT_MAX_BYTES}); not stored")
+            continue
+        doc = JobArtifact(
+            user_id=user_id,
+            history_id=history_id,
+            kind=artifact["kind"],
+            filename=f"fill-{history_id}-{artifact['filename']}",
+            content_type=artifact["content_type"],
+            data=artifact["data"],
+            size=size,
+            expires_at=expires_at,
+        )
+        await doc.insert()
+        refs.append({"id": str(doc.id), "kind": doc.kind, "filename": doc.filename, "size": size,
+                     "expires_at": expires_at})
+    return refs
@@ -0,0 +1,134 @@
+"""
+Compiled multi-pattern keyword matcher.
+All phrases of a phrase table are folded into one trie-shaped regex, so a
+question is scanned once and every hit is scored together. Used by the Lite
+(no-ML) question matcher and by the local answer templates.
+
+Scoring prefers the phrase naming the question's head noun ("Institution
+email" asks for an email, "Name of your college" for a college name), then
+the longest phrase.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_WORD = re.compile(r"[^\w]+")
+_FILLER_PREFIX = re.compile(r"^(?:please |kindly )+")
+# Where a question's leading noun phrase ends: punctuation or a preposition
+_HEAD_END = re.compile(r"[(/,;:?!]")
+_HEAD_END_WORDS = frozenset(["of", "for", "in", "at", "from", "with", "on", "to", "as", "by", "about", "during"])
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """Build a regex equivalent to `a|ab|abc...` that shares common prefixes and prefers the longest phrase."""
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A phrase ends here too: make the longer continuation optional (greedy, so longest wins)
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace/required-markers the same way for phrases and questions."""
+    return " ".join(text.replace("*", " ").lower().split())
+
+
+def head_word(normalized: str) -> str:
+    """Last word of the question's leading noun phrase ("" if there is none)."""
+    end = _HEAD_END.search(normalized)
+    head = ""
+    for word in (normalized[:end.start()] if end else normalized).split():
+        if head and word in _HEAD_END_WORDS:
+            break
+        head = word
+    return head.strip(".-'")
+
+
+def canonicalize_question(text: str) -> str:
+    """
+    Canonical form of a form question used to key learned mappings.
+    Case, punctuation and required markers are ignored ("Reg. No.*" == "reg no")
+    and a leading "please"/"kindly" is dropped.
+    """
+    canonical = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+    return _FILLER_PREFIX.sub("", canonical)
+
+
+class KeywordMatcher:
+    """
+    Scores every phrase hit in a single regex pass.
+
+    `phrases` maps a label (profile field or intent) to its phrases; dict order
+    is the tie-break priority. With `stems=True` a phrase may be followed by
+    more word characters ("achievement" matches "achievements"), otherwise
+    matches are whole words with an optional plural "s".
+    """
+
+    def __init__(self, phrases: Dict[str, Iterable[str]], stems: bool = False):
+        self._priority: Dict[str, int] = {}
+        self._label_for: Dict[str, str] = {}
+        for label, keywords in phrases.items():
+            self._priority.setdefault(label, len(self._priority))
+            for kw in keywords:
+                key = normalize_text(kw)
+                if key and key not in self._label_for:
+                    self._label_for[key] = label
+
+        self._stems = stems
+        tail = r"\w*" if stems else r"s?(?!\w)"
+        # Hits do not overlap: at each word start the longest phrase is taken and the scan resumes after it
+        self._pattern = re.compile(rf"(?<!\w)({_trie_pattern(self._label_for)}){tail}")
+
+    def scores(self, text: str) -> Dict[str, Tuple[int, int]]:
+        """Return {label: (longest matched phrase length, hit count)} for `text`."""
+        return self._scores(normalize_text(text))
+
+    def _scores(self, normalized: str) -> Dict[str, Tuple[int, int]]:
+        return self._tally(self._pattern.findall(normalized))
+
+    def _tally(self, phrases: List[str]) -> Dict[str, Tuple[int, int]]:
+        found: Dict[str, Tuple[int, int]] = {}
+        for phrase in phrases:
+            label = self._label_for[phrase]
+            longest, hits = found.get(label, (0, 0))
+            found[label] = (max(longest, len(phrase)), hits + 1)
+        return found
+
+    def _names(self, phrase: str, head: str) -> bool:
+        """Whether one of the phrase's words is the question word `head` (or its plural / stem continuation)."""
+        if self._stems:
+            return any(head.startswith(word) for word in phrase.split())
+        return any(head == word or head == word + "s" for word in phrase.split())
+
+    def best(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Return (label, confidence) for the most specific hit, or (None, 0.0):
+        a phrase naming the question's head noun first, then the longest one.
+        Confidence grows with the share of the question covered by the phrase.
+        """
+        normalized = normalize_text(text)
+        phrases = self._pattern.findall(normalized)
+        if not phrases:
+            return None, 0.0
+        found = self._tally(phrases)
+        if len(found) == 1:
+            label = next(iter(found))
+        else:
+            # Only needed to choose between fields, which most questions never have to
+            head = head_word(normalized)
+            named = {self._label_for[phrase] for phrase in phrases if head and self._names(phrase, head)}
+            label = max(found, key=lambda item: (item in named, found[item], -self._priority[item]))
+        longest = found[label][0]
+        covered = longest / max(len(normalized.strip(" ?:.")), 1)
+        return label, round(0.5 + 0.5 * min(covered, 1.0), 3)
@@ -0,0 +1,178 @@
+"""
+Learned-mapping compaction and retention.
+
+For each user it:
+1. merges near-duplicate questions (same canonical question key), keeping the
+   row with the highest times_used / confidence; it takes over the group's
+   summed times_used and newest last_used_at,
+2. expires low-confidence "ai_generated" rows no fill has used for MAPPING_AI_TTL_DAYS,
+3. enforces MAPPING_MAX_PER_USER, dropping the least used rows,
+and backfills `question_key` on rows written before it existed.
+
+A pass handles at most MAPPING_COMPACTION_USERS_PER_PASS users, resuming after
+the last user id of the previous pass, and deletes/updates in batches of
+MAPPING_COMPACTION_BATCH ids.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel, Field
+
+from app.config import (
+    MAPPING_COMPACTION_INTERVAL_MINUTES, MAPPING_COMPACTION_USERS_PER_PASS, MAPPING_COMPACTION_BATCH,
+    MAPPING_AI_TTL_DAYS, MAPPING_AI_MIN_CONFIDENCE, MAPPING_MAX_PER_USER,
+)
+from app.models import LearnedMapping
+from app.services.keyword_matcher import canonicalize_question
+from app.services.profile_cache import bump_version
+
+
+class _MappingRow(BaseModel):
+    """Projection: everything compaction needs except the (possibly long) answer text."""
+    id: PydanticObjectId = Field(alias="_id")
+    question_text: str
+    question_key: str = ""
+    matched_field: str
+    confidence: int = 100
+    times_used: int = 1
+    updated_at: datetime
+    last_used_at: Optional[datetime] = None
+
+    @property
+    def last_used(self) -> datetime:
+        return self.last_used_at or self.updated_at
+
+
+def _rank(row: _MappingRow):
+    return (row.times_used, row.confidence, row.last_used)
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), max(1, size)):
+        yield items[i:i + size]
+
+
+async def _delete_ids(ids: List[PydanticObjectId]):
+    collection = LearnedMapping.get_motor_collection()
+    for chunk in _chunks(ids, MAPPING_COMPACTION_BATCH):
+        await collection.delete_many({"_id": {"$in": chunk}})
+
+
+async def _update_keepers(rows: List[_MappingRow], merged: Dict[PydanticObjectId, List[_MappingRow]]):
+    """Backfill missing question keys and fold merged rows' usage into their keeper."""
+    from pymongo import UpdateOne
+
+    updates = []
+    for row in rows:
+        update: Dict[str, Dict] = {}
+        if not row.question_key:
+            update["$set"] = {"question_key": canonicalize_question(row.question_text)}
+        losers = merged.get(row.id)
+        if losers:
+            # $inc / $max rather than $set, so uses recorded since the rows were read are kept
+            update["$inc"] = {"times_used": sum(loser.times_used for loser in losers)}
+            update["$max"] = {"last_used_at": row.last_used}
+        if update:
+            updates.append(UpdateOne({"_id": row.id}, update))
+    collection = LearnedMapping.get_motor_collection()
+    for chunk in _chunks(updates, MAPPING_COMPACTION_BATCH):
+        await collection.bulk_write(chunk, ordered=False)
+    return len(updates)
+
+
+async def compact_user_mappings(user_id: str) -> Dict[str, int]:
+    """Compact one user's mappings; returns how many rows were merged, expired and capped."""
+    rows = await LearnedMapping.find(LearnedMapping.user_id == user_id).project(_MappingRow).to_list()
+    stats = {"merged": 0, "expired": 0, "capped": 0}
+    to_delete: List[PydanticObjectId] = []
+
+    # 1. Merge near-duplicates on the canonical question
+    groups: Dict[str, List[_MappingRow]] = {}
+    for row in rows:
+        groups.setdefault(row.question_key or canonicalize_question(row.question_text), []).append(row)
+    keepers: List[_MappingRow] = []
+    merged: Dict[PydanticObjectId, List[_MappingRow]] = {}
+    for group in groups.values():
+        keeper = max(group, key=_rank)
+        losers = [row for row in group if row is not keeper]
+        if losers:
+            # The keeper carries the group's usage, so ranking and the cap see it
+            merged[keeper.id] = losers
+            keeper.times_used = sum(row.times_used for row in group)
+            keeper.last_used_at = max(row.last_used for row in group)
+            to_delete.extend(row.id for row in losers)
+            stats["merged"] += len(losers)
+        keepers.append(keeper)
+
+    # 2. Expire low-confidence AI answers no fill has used for a while
+    cutoff = datetime.utcnow() - timedelta(days=MAPPING_AI_TTL_DAYS)
+    survivors: List[_MappingRow] = []
+    for row in keepers:
+        if row.matched_field == "ai_generated" and row.confidence < MAPPING_AI_MIN_CONFIDENCE and row.last_used < cutoff:
+            to_delete.append(row.id)
+            stats["expired"] += 1
+        else:
+            survivors.append(row)
+
+    # 3. Per-user cap: keep the most used / most recent rows
+    if len(survivors) > MAPPING_MAX_PER_USER:
+        survivors.sort(key=_rank, reverse=True)
+        for row in survivors[MAPPING_MAX_PER_USER:]:
+            to_delete.append(row.id)
+            stats["capped"] += 1
+        survivors = survivors[:MAPPING_MAX_PER_USER]
+
+    if to_delete:
+        await _delete_ids(to_delete)
+    updated = await _update_keepers(survivors, merged)
+    if to_delete or updated:
+        bump_version(user_id)
+
+    stats["removed"] = len(to_delete)
+    return stats
+
+
+_last_user_id: Optional[str] = None
+
+
+async def run_compaction_pass(max_users: int = MAPPING_COMPACTION_USERS_PER_PASS) -> Dict[str, int]:
+    """Compact the next `max_users` users (round-robin across passes) and return the totals."""
+    global _last_user_id
+    user_filter = {"user_id": {"$gt": _last_user_id}} if _last_user_id else {}
+    # Only this pass's user ids come back, through a cursor, not the whole distinct list
+    pipeline = [
+        {"$match": user_filter},
+        {"$group": {"_id": "$user_id"}},
+        {"$sort": {"_id": 1}},
+        {"$limit": max_users},
+    ]
+    totals = {"users": 0, "merged": 0, "expired": 0, "capped": 0, "removed": 0}
+    last_user_id = None
+    async for group in LearnedMapping.get_motor_collection().aggregate(pipeline):
+        last_user_id = group["_id"]
+        stats = await compact_user_mappings(last_user_id)
+        totals["users"] += 1
+        for key, value in stats.items():
+            totals[key] += value
+    # Wrap around once the end of the user list is reached
+    _last_user_id = last_user_id if totals["users"] == max_users else None
+    return totals
+
+
+async def compaction_loop():
+    """Background task: run a compaction pass every MAPPING_COMPACTION_INTERVAL_MINUTES."""
+    from app.database import init_db
+
+    while True:
+        await asyncio.sleep(MAPPING_COMPACTION_INTERVAL_MINUTES * 60)
+        try:
+            await init_db()
+            totals = await run_compaction_pass()
+            if totals["removed"]:
+                print(f"🧹 Mapping compaction: removed {totals['removed']} rows "
+                      f"({totals['merged']} merged, {totals['expired']} expired, {totals['capped']} capped) "
+                      f"across {totals['users']} users")
+        except Exception as e:
+            print(f"❌ Mapping compaction error: {e}")
@@ -0,0 +1,159 @@
+"""
+Prefilled-link support for Google Forms.
+
+A form's viewform page embeds its full structure (all pages) as the JSON
+assigned to `FB_PUBLIC_LOAD_DATA_`. This module reads the questions and
+their `entry.NNN` ids from it and encodes answers as the query string of a
+`viewform?usp=pp_url&entry.NNN=...` link, which opens the form pre-populated
+for the user to review and submit. No browser is involved.
+"""
+import datetime
+import json
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from app.config import FORM_URL_HOSTS, FORM_URL_ALLOW_HTTP
+
+# Google Forms item types (index 3 of an item in FB_PUBLIC_LOAD_DATA_)
+TEXT, PARAGRAPH, RADIO, DROPDOWN, CHECKBOX, SCALE = 0, 1, 2, 3, 4, 5
+HEADER, PAGE_BREAK, DATE = 6, 8, 9
+# Grids, times, ratings and file uploads are not prefilled
+FIELD_TYPES = {
+    TEXT: "text", PARAGRAPH: "paragraph", RADIO: "radio", DROPDOWN: "dropdown",
+    CHECKBOX: "checkbox", SCALE: "radio", DATE: "date",
+}
+
+OTHER_OPTION = "__other_option__"
+FETCH_TIMEOUT_SECONDS = 15.0
+
+_LOAD_DATA = re.compile(r"FB_PUBLIC_LOAD_DATA_\s*=\s*(.*?);\s*</script>", re.S)
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%m/%d/%Y")
+
+
+class PrefillError(Exception):
+    """The form's structure could not be read from its page."""
+
+
+class FormQuestion:
+    """One fillable question of a form."""
+    __slots__ = ("title", "field_type", "entry_id", "options", "has_other", "date_has_year", "required", "page")
+
+    def __init__(self, title: str, field_type: str, entry_id: int, options: List[str],
+                 has_other: bool = False, date_has_year: bool = True, required: bool = False, page: int = 0):
+        self.title = title
+        self.field_type = field_type  # "text", "paragraph", "radio", "dropdown", "checkbox", "date" or "unknown"
+        self.entry_id = entry_id
+        self.options = options
+        self.has_other = has_other
+        self.date_has_year = date_has_year
+        self.required = required
+        self.page = page  # Index of the form page (section) the question is on
+
+    @property
+    def key(self) -> str:
+        return f"entry.{self.entry_id}"
+
+
+def check_form_url(url: str):
+    """
+    Raise PrefillError unless `url` is a link the server may open: https (http only with
+    FORM_URL_ALLOW_HTTP), a FORM_URL_HOSTS host and, on docs.google.com, a /forms/ path.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or "").lower()
+        netloc = f"{host}:{parts.port}" if parts.port is not None else host
+    except ValueError:
+        raise PrefillError("Invalid Google Form URL.")
+    if parts.scheme != "https" and not (parts.scheme == "http" and FORM_URL_ALLOW_HTTP):
+        raise PrefillError("Google Form links must start with https://.")
+    if netloc not in FORM_URL_HOSTS or (host == "docs.google.com" and not parts.path.startswith("/forms/")):
+        raise PrefillError("Only Google Forms links (docs.google.com/forms/... or forms.gle/...) can be filled.")
+
+
+async def fetch_form_html(form_url: str) -> Tuple[str, str]:
+    """Download the form page; returns (html, final URL after redirects). Every hop must pass check_form_url."""
+    import httpx
+
+    async def check_hop(request):
+        check_form_url(str(request.url))
+
+    async with httpx.AsyncClient(timeout=FETCH_TIMEOUT_SECONDS, follow_redirects=True,
+                                 event_hooks={"request": [check_hop]}) as client:
+        response = await client.get(form_url)
+        response.raise_for_status()
+        return response.text, str(response.url)
+
+
+def parse_form(html: str) -> Tuple[str, List[FormQuestion]]:
+    """
+    Parse the served form page into (form title, questions in form order).
+    Questions of unsupported types have field_type "unknown".
+    """
+    match = _LOAD_DATA.search(html)
+    if not match:
+        raise PrefillError("Could not read the form's questions (the form may require sign-in).")
+    try:
+        data = json.loads(match.group(1))
+        form = data[1]
+        items = form[1] or []
+    except (ValueError, IndexError, TypeError) as e:
+        raise PrefillError(f"Unrecognised form data: {e}")
+    title = (len(form) > 8 and form[8]) or (len(data) > 3 and data[3]) or "Untitled Form"
+
+    questions: List[FormQuestion] = []
+    page = 0
+    for item in items:
+        if len(item) > 3 and item[3] == PAGE_BREAK:
+            page += 1
+        if len(item) < 5 or item[3] in (HEADER, PAGE_BREAK) or not item[4]:
+            continue  # Headers, page breaks, images and videos carry no answer
+        field_type = FIELD_TYPES.get(item[3], "unknown")
+        entry = item[4][0]
+        raw_options = entry[1] or []
+        options = [opt[0] for opt in raw_options if opt and opt[0]]
+        has_other = any(opt and len(opt) > 4 and opt[4] for opt in raw_options)
+        date_flags = entry[7] if field_type == "date" and len(entry) > 7 and entry[7] else [0, 1]
+        questions.append(FormQuestion(
+            title=(item[1] or "").strip(),
+            field_type=field_type,
+            entry_id=entry[0],
+            options=options,
+            has_other=has_other,
+            date_has_year=bool(date_flags[1]) if len(date_flags) > 1 else True,
+            required=bool(len(entry) > 2 and entry[2]),
+            page=page,
+        ))
+    return title, questions
+
+
+def parse_date(answer: str) -> Optional[datetime.date]:
+    """Date in the answer text (ISO or common day-first formats), else None."""
+    text = str(answer).strip()[:10]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def encode_date(question: FormQuestion, value: datetime.date) -> str:
+    """Prefill encoding of a date: YYYY-MM-DD, or MM-DD for date questions without a year."""
+    return value.isoformat() if question.date_has_year else value.strftime("%m-%d")
+
+
+def viewform_url(form_url: str) -> str:
+    """The form's viewform URL without query or fragment."""
+    parts = urlsplit(form_url)
+    path = parts.path.rstrip("/")
+    head, _, last = path.rpartition("/")
+    if last in ("viewform", "formResponse", "edit"):
+        path = head
+    return urlunsplit((parts.scheme, parts.netloc, f"{path}/viewform", "", ""))
+
+
+def build_prefilled_url(form_url: str, params: List[Tuple[str, str]]) -> str:
+    """`viewform?usp=pp_url&entry.X=...`; repeated keys encode multi-select answers."""
+    return f"{viewform_url(form_url)}?{urlencode([('usp', 'pp_url')] + params)}"
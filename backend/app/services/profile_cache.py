@@ -0,0 +1,132 @@
+"""
+Versioned per-user snapshot cache for fill jobs.
+
+A snapshot holds what `_run_form_fill` needs from MongoDB: the flattened
+profile dict, the extra-field matcher phrases (versioned by the profile's
+updated_at), current precomputed answers and the prebuilt learned-mapping index. Routes that change either
+(profile create/update, mapping writes/deletes) call `bump_version(user_id)`,
+which makes the cached snapshot stale. Versions are per process, so entries
+also expire after PROFILE_CACHE_TTL_SECONDS to bound staleness when several
+API workers serve the same user.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.config import PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_MAX_BYTES, PROFILE_CACHE_TTL_SECONDS
+from app.utils.metrics import record_cache
+
+
+class ProfileSnapshot:
+    """Read-only view of a user's fill inputs; shared between jobs, never mutate."""
+    __slots__ = ("version", "profile", "learned", "extra_phrases", "profile_version", "precomputed", "size",
+                 "loaded_at")
+
+    def __init__(self, version: int, profile: Dict[str, str], learned: Dict[str, str],
+                 extra_phrases: Optional[Dict[str, List[str]]] = None, profile_version: str = "",
+                 precomputed: Optional[Dict[str, str]] = None):
+        self.version = version
+        self.profile = profile
+        self.learned = learned
+        self.extra_phrases = extra_phrases or {}
+        self.profile_version = profile_version
+        self.precomputed = precomputed or {}  # Intent -> answer, only if generated from this profile version
+        self.size = (_approx_size(profile) + _approx_size(learned) + _approx_size(self.extra_phrases)
+                     + _approx_size(self.precomputed))
+        self.loaded_at = time.monotonic()
+
+    def user_fields(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Job spec for the matcher's per-user field set, or None without extra fields."""
+        if not self.extra_phrases:
+            return None
+        return {"user_id": user_id, "version": self.profile_version, "phrases": self.extra_phrases}
+
+
+def _approx_size(data: Dict[str, Any]) -> int:
+    return sum(len(k) + len(str(v)) for k, v in data.items())
+
+
+class ProfileSnapshotCache:
+    """LRU cache of ProfileSnapshot keyed by user id, bounded by entry count and approximate bytes."""
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_MAX_ENTRIES, max_bytes: int = PROFILE_CACHE_MAX_BYTES,
+                 ttl: float = PROFILE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, ProfileSnapshot]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._bytes = 0
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str):
+        self._versions[user_id] = self.version(user_id) + 1
+        self._drop(user_id)
+
+    def get(self, user_id: str) -> Optional[ProfileSnapshot]:
+        snapshot = self._entries.get(user_id)
+        fresh = (
+            snapshot is not None
+            and snapshot.version == self.version(user_id)
+            and time.monotonic() - snapshot.loaded_at < self.ttl
+        )
+        record_cache("profile_snapshot", fresh)
+        if not fresh:
+            if snapshot is not None:
+                self._drop(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return snapshot
+
+    def put(self, user_id: str, snapshot: ProfileSnapshot):
+        """Store a snapshot built at `snapshot.version`; ignored if the user was bumped meanwhile."""
+        if snapshot.version != self.version(user_id) or snapshot.size > self.max_bytes:
+            return
+        self._drop(user_id)
+        self._entries[user_id] = snapshot
+        self._bytes += snapshot.size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def _drop(self, user_id: str):
+        snapshot = self._entries.pop(user_id, None)
+        if snapshot is not None:
+            self._bytes -= snapshot.size
+
+
+snapshot_cache = ProfileSnapshotCache()
+
+
+def bump_version(user_id: str):
+    """Invalidate the cached snapshot after a profile or learned-mapping change."""
+    snapshot_cache.bump(user_id)
+
+
+async def get_fill_snapshot(user_id: str) -> Optional[ProfileSnapshot]:
+    """Return the user's profile + learned-mapping snapshot, loading it from MongoDB on a miss."""
+    snapshot = snapshot_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    from app.models import UserProfile, LearnedMapping
+    from app.services.ai_agent import get_profile_as_dict, get_extra_field_phrases
+    from app.services.form_filler import build_learned_index
+
+    version = snapshot_cache.version(user_id)
+    profile = await UserProfile.find_one(UserProfile.user_id == user_id)
+    if not profile:
+        return None
+    mappings = await LearnedMapping.find(LearnedMapping.user_id == user_id).to_list()
+    snapshot = ProfileSnapshot(
+        version,
+        get_profile_as_dict(profile),
+        build_learned_index((m.question_text, m.answer_value) for m in mappings),
+        get_extra_field_phrases(profile),
+        profile.updated_at.isoformat(),
+        profile.precomputed_answers if profile.precomputed_for == profile.updated_at else None,
+    )
+    snapshot_cache.put(user_id, snapshot)
+    return snapshot
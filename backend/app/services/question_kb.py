@@ -0,0 +1,252 @@
+"""
+Global canonical-question knowledge base.
+
+Learned mappings are per user, but most forms ask the same questions. This
+module keeps a cross-user table of canonical question -> profile field
+(CanonicalQuestion). It is fed from high-confidence profile matches and never
+from AI answers, and it never stores answer values. Each user has at most one
+vote per question (QuestionVote), so no single user can decide a mapping. An in-memory index sits
+over the table:
+
+* exact lookup by canonical question key (works in Lite mode too),
+* exact top-k cosine search over question embeddings with NumPy, once an
+  embedding model is available.
+
+The index holds at most KB_MAX_ENTRIES questions (most voted first). New
+questions from this process are added as mappings are saved; every process
+also pulls rows changed elsewhere every KB_REFRESH_SECONDS.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.config import (
+    KB_MAX_ENTRIES, KB_MIN_VOTES, KB_MIN_CONFIDENCE, KB_SIMILARITY_THRESHOLD, KB_TOP_K, KB_REFRESH_SECONDS,
+)
+from app.services.keyword_matcher import canonicalize_question
+from app.utils.metrics import record_cache
+
+
+def winning_field(votes: Dict[str, int]) -> Optional[str]:
+    """The field with at least KB_MIN_VOTES votes and a strict majority, else None."""
+    if not votes:
+        return None
+    field, count = max(votes.items(), key=lambda item: item[1])
+    if count >= KB_MIN_VOTES and count * 2 > sum(votes.values()):
+        return field
+    return None
+
+
+class QuestionKnowledgeBase:
+    """Bounded in-memory index over CanonicalQuestion rows."""
+
+    def __init__(self, max_entries: int = KB_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        # question_key -> (field, question_text); insertion order = eviction order
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        # Embedding rows, aligned with _row_keys; rows are swap-removed on eviction
+        self._vectors = None
+        self._row_keys: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._unencoded: List[str] = []
+        self._synced_until: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ─── Queries ────────────────────────────────────────────
+    def lookup(self, question: str) -> Optional[str]:
+        """Field for the exact canonical question, or None."""
+        entry = self._entries.get(canonicalize_question(question))
+        record_cache("question_kb", entry is not None)
+        return entry[0] if entry else None
+
+    def search(self, np, q_embedding) -> Tuple[Optional[str], float]:
+        """
+        Nearest known questions to an L2-normalised question embedding.
+        Returns (field, score) when the top hit clears KB_SIMILARITY_THRESHOLD
+        and agrees with the majority of the top-k hits above it, else (None, score).
+        """
+        size = len(self._row_keys)
+        if not size:
+            return None, 0.0
+        scores = np.dot(self._vectors[:size], q_embedding)
+        k = min(KB_TOP_K, size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        best_score = float(scores[top[0]])
+        if best_score < KB_SIMILARITY_THRESHOLD:
+            return None, best_score
+
+        votes: Dict[str, int] = {}
+        for row in top:
+            if scores[row] >= KB_SIMILARITY_THRESHOLD:
+                field = self._entries[self._row_keys[row]][0]
+                votes[field] = votes.get(field, 0) + 1
+        field = self._entries[self._row_keys[top[0]]][0]
+        if votes[field] * 2 <= sum(votes.values()):
+            return None, best_score
+        return field, best_score
+
+    @property
+    def has_vectors(self) -> bool:
+        return bool(self._row_keys)
+
+    # ─── Updates ────────────────────────────────────────────
+    def add(self, question_key: str, question_text: str, field: Optional[str]):
+        """Insert, update or (field None) remove one entry; evicts the oldest beyond max_entries."""
+        if field is None:
+            self._remove(question_key)
+            return
+        known = self._entries.get(question_key)
+        self._entries[question_key] = (field, known[1] if known else question_text)
+        if known is None:
+            self._unencoded.append(question_key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, question_key: str):
+        if self._entries.pop(question_key, None) is None:
+            return
+        row = self._row_of.pop(question_key, None)
+        if row is not None:
+            last = len(self._row_keys) - 1
+            if row != last:
+                moved = self._row_keys[last]
+                self._vectors[row] = self._vectors[last]
+                self._row_keys[row] = moved
+                self._row_of[moved] = row
+            self._row_keys.pop()
+
+    def _take_unencoded(self) -> List[str]:
+        keys = [k for k in dict.fromkeys(self._unencoded) if k in self._entries and k not in self._row_of]
+        self._unencoded = []
+        return keys
+
+    def _install_vectors(self, keys: List[str], vectors, np):
+        """Append embedding rows for `keys`, skipping entries evicted while they were encoded."""
+        keep = [i for i, k in enumerate(keys) if k in self._entries and k not in self._row_of]
+        if not keep:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)[keep]
+        keys = [keys[i] for i in keep]
+        size = len(self._row_keys)
+        needed = size + len(keys)
+        if self._vectors is None or needed > self._vectors.shape[0]:
+            current = 0 if self._vectors is None else self._vectors.shape[0]
+            capacity = max(needed, min(max(2 * current, 256), self.max_entries))
+            grown = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            if size:
+                grown[:size] = self._vectors[:size]
+            self._vectors = grown
+        self._vectors[size:needed] = vectors
+        for i, key in enumerate(keys):
+            self._row_keys.append(key)
+            self._row_of[key] = size + i
+
+    async def refresh(self, model=None, np=None, force: bool = False):
+        """
+        Pull rows changed since the last refresh (everything, most voted first, on
+        the first call), then embed new entries in a thread when `model` is given.
+        Errors leave the current index in place.
+        """
+        if not force and time.monotonic() - self._last_refresh < KB_REFRESH_SECONDS:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and time.monotonic() - self._last_refresh < KB_REFRESH_SECONDS:
+                return
+            self._last_refresh = time.monotonic()
+            try:
+                await self._pull()
+                keys = self._take_unencoded()
+                if keys and model is not None:
+                    texts = [self._entries[k][1] for k in keys]
+                    loop = asyncio.get_running_loop()
+                    vectors = await loop.run_in_executor(None, model.encode, texts)
+                    self._install_vectors(keys, vectors, np)
+            except Exception as e:
+                print(f"⚠ Question KB refresh failed: {e}")
+
+    async def _pull(self):
+        from app.database import init_db
+        from app.models import CanonicalQuestion
+
+        await init_db()
+        collection = CanonicalQuestion.get_motor_collection()
+        projection = {"question_key": 1, "question_text": 1, "field_votes": 1, "updated_at": 1}
+        if self._synced_until is None:
+            # Least voted first, so the most voted rows survive eviction
+            cursor = collection.find({"total_votes": {"$gte": KB_MIN_VOTES}}, projection)
+            cursor = cursor.sort("total_votes", -1).limit(self.max_entries)
+            rows = list(reversed(await cursor.to_list(length=self.max_entries)))
+        else:
+            cursor = collection.find({"updated_at": {"$gt": self._synced_until}}, projection)
+            rows = await cursor.to_list(length=None)
+        for row in rows:
+            self.add(row["question_key"], row["question_text"], winning_field(row.get("field_votes", {})))
+            if self._synced_until is None or row["updated_at"] > self._synced_until:
+                self._synced_until = row["updated_at"]
+        if self._synced_until is None:
+            self._synced_until = datetime.utcnow()
+
+    async def record(self, user_id: str, question: str, field: str):
+        """
+        Count a user's confirmed question -> field match and update the local
+        index. A user votes once per question: repeats are ignored, and a
+        different field moves their vote.
+        """
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+        from app.models import CanonicalQuestion, QuestionVote
+
+        question_key = canonicalize_question(question)
+        if not question_key:
+            return
+        try:
+            previous = await QuestionVote.get_motor_collection().find_one_and_update(
+                {"question_key": question_key, "user_id": user_id},
+                {"$set": {"field": field, "updated_at": datetime.utcnow()}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+                projection={"field": 1},
+            )
+        except DuplicateKeyError:
+            return  # A concurrent save of the same user recorded the vote
+        if previous is None:
+            votes = {f"field_votes.{field}": 1, "total_votes": 1}
+        elif previous["field"] != field:
+            votes = {f"field_votes.{field}": 1, f"field_votes.{previous['field']}": -1}
+        else:
+            return
+        row = await CanonicalQuestion.get_motor_collection().find_one_and_update(
+            {"question_key": question_key},
+            {
+                "$inc": votes,
+                "$set": {"updated_at": datetime.utcnow()},
+                "$setOnInsert": {"question_text": question},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"question_text": 1, "field_votes": 1},
+        )
+        self.add(question_key, row["question_text"], winning_field(row.get("field_votes", {})))
+
+
+knowledge_base = QuestionKnowledgeBase()
+
+
+async def record_mappings(user_id: str, mappings: List[Dict]):
+    """Feed a user's saved learned mappings into the knowledge base (confident profile matches only)."""
+    for m_data in mappings:
+        if m_data["field"] == "ai_generated" or m_data.get("shared") or m_data.get("custom"):
+            continue
+        if m_data["confidence"] < KB_MIN_CONFIDENCE:
+            continue
+        await knowledge_base.record(user_id, m_data["question"], m_data["field"])
@@ -2,32 +2,37 @@
 Smart Question Matcher — Maps form questions to user profile fields.
 Supports fallback to simple matching if heavy ML libraries are missing (Lite mode).
 """
+import asyncio
 import re
-from typing import Optional, Tuple, Dict, List
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Dict, List
 
-# Try imports for heavy ML features
-try:
-    from sklearn.metrics.pairwise import cosine_similarity
-    import numpy as np
-    HAS_ML = True
-except ImportError:
-    HAS_ML = False
+from app.config import EMBED_BATCHING, USER_FIELDS_CACHE_SIZE
+from app.services.embedding_backends import load_backend
+from app.services.embedding_service import encode_batched
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.question_kb import knowledge_base
+from app.utils.metrics import span, record_cache, MATCHER_LATENCY
 
-# Lazy-loaded model
+# Lazy-loaded embedding backend (see embedding_backends / EMBEDDING_BACKEND)
 _model = None
+_model_loaded = False
+_np = None
 _field_embeddings = None
 _field_descriptions = None
 
 
 def _get_model():
-    """Lazy load the sentence transformer model."""
-    global _model
-    if _model is None:
+    """Lazy load the configured embedding backend (None if unavailable, i.e. Lite mode)."""
+    global _model, _model_loaded, _np
+    if not _model_loaded:
         try:
-            from sentence_transformers import SentenceTransformer
-            _model = SentenceTransformer("all-MiniLM-L6-v2")
+            import numpy
+            _np = numpy
+            _model = load_backend()
         except ImportError:
             _model = None
+        _model_loaded = True
     return _model
 
 
@@ -96,6 +101,7 @@ def _get_field_embeddings():
     if model is None:
         return None, None
         
+    record_cache("field_embeddings", _field_embeddings is not None)
     if _field_embeddings is None:
         _field_descriptions = {}
         all_texts = []
@@ -103,17 +109,76 @@ def _get_field_embeddings():
             for desc in descriptions:
                 _field_descriptions[len(all_texts)] = field_name
                 all_texts.append(desc)
-        _field_embeddings = model.encode(all_texts, normalize_embeddings=True)
+        _field_embeddings = model.encode(all_texts)
     return _field_embeddings, _field_descriptions
 
 
-def _simple_match(question: str) -> Optional[str]:
-    """Fallback simple string matching logic."""
-    q = question.lower()
-    for field, keywords in FIELD_DESCRIPTIONS.items():
-        if any(kw in q for kw in keywords):
-            return field
-    return None
+# Compiled once: scores every field's phrases in a single pass over the question
+_keyword_matcher = KeywordMatcher(FIELD_DESCRIPTIONS)
+
+
+def _simple_match(question: str) -> Tuple[Optional[str], float]:
+    """Fallback keyword matching: most specific whole-phrase hit with a coverage-based confidence."""
+    return _keyword_matcher.best(question)
+
+
+class UserFields:
+    """
+    One user's extra profile fields for matching: phrases (key + aliases) per
+    field, a keyword matcher over built-in + extra phrases for Lite mode, and
+    the extra phrases' embeddings (rows of `matrix`, field per row in `row_fields`).
+    """
+    __slots__ = ("version", "phrases", "keyword_matcher", "vectors", "matrix", "row_fields")
+
+    def __init__(self, version: str, phrases: Dict[str, List[str]]):
+        self.version = version
+        self.phrases = phrases
+        self.keyword_matcher = KeywordMatcher({**FIELD_DESCRIPTIONS, **phrases})
+        self.vectors: Dict[str, Any] = {}  # Normalised phrase -> embedding, reused across versions
+        self.matrix = None
+        self.row_fields: List[str] = []
+
+
+# Per-user field sets by user id (LRU), versioned by the profile's updated_at
+_user_fields: "OrderedDict[str, UserFields]" = OrderedDict()
+
+
+async def get_user_fields(spec: Optional[Dict[str, Any]]) -> Optional[UserFields]:
+    """
+    Return the cached field set for a job's user-fields spec
+    ({"user_id", "version", "phrases"}), building it on a version change.
+    Only phrases not embedded for the previous version are encoded.
+    """
+    if not spec or not spec.get("phrases"):
+        return None
+    user_id = spec["user_id"]
+    cached = _user_fields.get(user_id)
+    record_cache("user_fields", cached is not None and cached.version == spec["version"])
+    if cached is not None and cached.version == spec["version"]:
+        _user_fields.move_to_end(user_id)
+        return cached
+
+    fields = UserFields(spec["version"], spec["phrases"])
+    model = _get_model()
+    if model is not None:
+        rows = [(field, _clean_question(p)) for field, phrases in fields.phrases.items() for p in phrases]
+        rows = [(field, phrase) for field, phrase in rows if phrase]
+        previous = cached.vectors if cached is not None else {}
+        missing = list(dict.fromkeys(p for _, p in rows if p not in previous))
+        if missing:
+            loop = asyncio.get_running_loop()
+            encoded = await loop.run_in_executor(None, model.encode, missing)
+            previous = {**previous, **dict(zip(missing, encoded))}
+        if rows:
+            fields.vectors = {p: previous[p] for _, p in rows}
+            fields.matrix = _np.stack([fields.vectors[p] for _, p in rows])
+            fields.row_fields = [field for field, _ in rows]
+
+    _user_fields[user_id] = fields
+    _user_fields.move_to_end(user_id)
+    while len(_user_fields) > USER_FIELDS_CACHE_SIZE:
+        _user_fields.popitem(last=False)
+    return fields
 
 
 def match_question_to_field(question: str, threshold: float = 0.45) -> Tuple[Optional[str], float]:
@@ -121,28 +186,40 @@ def match_question_to_field(question: str, threshold: float = 0.45) -> Tuple[Opt
     model = _get_model()
     
     # Fallback to simple matching if ML libraries are missing
-    if not HAS_ML or model is None:
-        matched = _simple_match(question)
-        return matched, 1.0 if matched else 0.0
+    if model is None:
+        with span("match", MATCHER_LATENCY, mode="simple"):
+            return _simple_match(question)
+
+    with span("match", MATCHER_LATENCY, mode="embedding"):
+        return _match_with_embeddings(question, model, threshold)
+
 
+def _match_with_embeddings(question: str, model, threshold: float) -> Tuple[Optional[str], float]:
+    """Embedding similarity match against the cached field descriptions."""
     embeddings, field_map = _get_field_embeddings()
     if embeddings is None:
-        matched = _simple_match(question)
-        return matched, 0.9 if matched else 0.0
+        return _simple_match(question)
 
     # Clean question
-    clean_q = re.sub(r'[*\n\r]+', ' ', question).strip().lower()
+    clean_q = _clean_question(question)
     if not clean_q:
         return None, 0.0
 
     # Encode question
-    q_embedding = model.encode([clean_q], normalize_embeddings=True)
+    q_embedding = model.encode([clean_q])
+
+    # Compute similarities (both sides are L2-normalised, so dot product == cosine)
+    similarities = _np.dot(embeddings, q_embedding[0])
+    return _best_field(similarities, field_map, threshold)
+
+
+def _clean_question(question: str) -> str:
+    return re.sub(r'[*\n\r]+', ' ', question).strip().lower()
 
-    # Compute similarities
-    similarities = cosine_similarity(q_embedding, embeddings)[0]
 
-    # Find best match
-    best_idx = int(np.argmax(similarities))
+def _best_field(similarities, field_map: Dict[int, str], threshold: float) -> Tuple[Optional[str], float]:
+    """Pick the best-scoring description and apply the threshold."""
+    best_idx = int(_np.argmax(similarities))
     best_score = float(similarities[best_idx])
     best_field = field_map[best_idx]
 
@@ -151,11 +228,91 @@ def match_question_to_field(question: str, threshold: float = 0.45) -> Tuple[Opt
     return None, best_score
 
 
+async def amatch_question_to_field(question: str, threshold: float = 0.45) -> Tuple[Optional[str], float]:
+    """
+    Async variant of match_question_to_field for the fill engine.
+    The question encode goes through the shared micro-batcher so concurrent
+    fills are embedded together off the event loop.
+    """
+    model = _get_model()
+    if not EMBED_BATCHING or model is None:
+        return match_question_to_field(question, threshold)
+
+    embeddings, field_map = _get_field_embeddings()
+    if embeddings is None:
+        return _simple_match(question)
+
+    clean_q = _clean_question(question)
+    if not clean_q:
+        return None, 0.0
+
+    with span("match", MATCHER_LATENCY, mode="embedding_batched"):
+        q_embedding = await encode_batched(model, clean_q)
+        similarities = _np.dot(embeddings, q_embedding)
+    return _best_field(similarities, field_map, threshold)
+
+
+async def amatch_with_knowledge_base(question: str, threshold: float = 0.45,
+                                     user_fields: Optional[UserFields] = None) -> Tuple[Optional[str], float, bool]:
+    """
+    Match a question against the global question KB before the field descriptions
+    (plus the user's extra fields, if any). Returns (field, confidence, shared),
+    where shared is True for KB hits. The question is encoded once for the KB
+    vector search, the built-in fields and the extra fields.
+    """
+    field_name = knowledge_base.lookup(question)
+    if field_name:
+        return field_name, 1.0, True
+
+    model = _get_model()
+    if model is None and user_fields is not None:
+        with span("match", MATCHER_LATENCY, mode="simple"):
+            field_name, confidence = user_fields.keyword_matcher.best(question)
+        return field_name, confidence, False
+    if model is None or (not knowledge_base.has_vectors and (user_fields is None or user_fields.matrix is None)):
+        field_name, confidence = await amatch_question_to_field(question, threshold)
+        return field_name, confidence, False
+
+    embeddings, field_map = _get_field_embeddings()
+    clean_q = _clean_question(question)
+    if not clean_q:
+        return None, 0.0, False
+
+    with span("match", MATCHER_LATENCY, mode="knowledge_base"):
+        if EMBED_BATCHING:
+            q_embedding = await encode_batched(model, clean_q)
+        else:
+            q_embedding = model.encode([clean_q])[0]
+        field_name, score = knowledge_base.search(_np, q_embedding)
+        if field_name:
+            return field_name, score, True
+        similarities = _np.dot(embeddings, q_embedding)
+        field_name, confidence = _best_field(similarities, field_map, threshold)
+        if user_fields is not None and user_fields.matrix is not None:
+            extra_similarities = _np.dot(user_fields.matrix, q_embedding)
+            best_idx = int(_np.argmax(extra_similarities))
+            extra_score = float(extra_similarities[best_idx])
+            if extra_score >= threshold and extra_score > confidence:
+                field_name, confidence = user_fields.row_fields[best_idx], extra_score
+    return field_name, confidence, False
+
+
+async def refresh_knowledge_base():
+    """Sync the question KB with MongoDB (throttled) and embed its new questions."""
+    model = _get_model()
+    await knowledge_base.refresh(model, _np)
+
+
+async def amatch_question_batch(questions: List[str], threshold: float = 0.45) -> List[Tuple[Optional[str], float]]:
+    """Async variant of match_question_batch; each question joins the shared micro-batch."""
+    return list(await asyncio.gather(*(amatch_question_to_field(q, threshold) for q in questions)))
+
+
 def match_question_batch(questions: List[str], threshold: float = 0.45) -> List[Tuple[Optional[str], float]]:
     """Match multiple questions (Lite optimized)."""
     model = _get_model()
     
-    if not HAS_ML or model is None:
+    if model is None:
         return [match_question_to_field(q, threshold) for q in questions]
 
     embeddings, field_map = _get_field_embeddings()
@@ -163,24 +320,15 @@ def match_question_batch(questions: List[str], threshold: float = 0.45) -> List[
         return [match_question_to_field(q, threshold) for q in questions]
 
     # Clean questions
-    clean_questions = [re.sub(r'[*\n\r]+', ' ', q).strip().lower() for q in questions]
+    clean_questions = [_clean_question(q) for q in questions]
     if not clean_questions:
         return []
 
-    # Encode all questions
-    q_embeddings = model.encode(clean_questions, normalize_embeddings=True)
+    with span("match", MATCHER_LATENCY, mode="embedding_batch"):
+        # Encode all questions
+        q_embeddings = model.encode(clean_questions)
 
-    # Compute similarities
-    sims = cosine_similarity(q_embeddings, embeddings)
-
-    results = []
-    for i in range(len(questions)):
-        best_idx = int(np.argmax(sims[i]))
-        best_score = float(sims[i][best_idx])
-        best_field = field_map[best_idx]
-        if best_score >= threshold:
-            results.append((best_field, best_score))
-        else:
-            results.append((None, best_score))
+        # Compute similarities
+        sims = _np.dot(q_embeddings, embeddings.T)
 
-    return results
+    return [_best_field(sims[i], field_map, threshold) for i in range(len(questions))]
@@ -0,0 +1,110 @@
+"""
+Streaming exports of a user's documents as NDJSON or CSV, optionally gzipped.
+
+Documents are read from a Motor cursor EXPORT_BATCH_SIZE at a time and each
+batch is encoded into one chunk of the response, so memory use depends on the
+batch size, not on how many rows are exported. Gzipped exports are compressed
+incrementally and downloaded as `<name>.gz`.
+"""
+import csv
+import io
+import zlib
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.config import EXPORT_BATCH_SIZE
+from app.utils.responses import dumps
+
+Row = Dict[str, Any]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+# Spreadsheet apps run cells starting with these as formulas
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def date_range(field: str, since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    """Mongo filter for since <= field < until (naive UTC, as stored); {} when unbounded."""
+    bounds = {}
+    if since is not None:
+        bounds["$gte"] = _naive_utc(since)
+    if until is not None:
+        bounds["$lt"] = _naive_utc(until)
+    if "$gte" in bounds and "$lt" in bounds and bounds["$gte"] >= bounds["$lt"]:
+        raise HTTPException(status_code=400, detail="`since` must be earlier than `until`.")
+    return {field: bounds} if bounds else {}
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def _batches(cursor) -> AsyncIterator[List[Row]]:
+    batch: List[Row] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def ndjson_chunks(cursor, to_row: Callable[[Row], Row]) -> AsyncIterator[bytes]:
+    """One JSON object per line."""
+    async for batch in _batches(cursor):
+        yield b"".join(dumps(to_row(doc)) + b"\n" for doc in batch)
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode("utf-8")
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def csv_chunks(cursor, to_row: Callable[[Row], Row], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    """A header line, then one line per document with `columns` of to_row(doc)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for batch in _batches(cursor):
+        for doc in batch:
+            row = to_row(doc)
+            writer.writerow([_csv_cell(row.get(column)) for column in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # No rows: the header alone
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(cursor, fmt: str, name: str, to_row: Callable[[Row], Row],
+                    columns: Sequence[str], compress: bool = False) -> StreamingResponse:
+    """StreamingResponse downloading the cursor's documents as `<name>-<date>.<fmt>[.gz]`."""
+    chunks = ndjson_chunks(cursor, to_row) if fmt == "ndjson" else csv_chunks(cursor, to_row, columns)
+    filename = f"{name}-{datetime.utcnow():%Y%m%d}.{fmt}"
+    media_type = MEDIA_TYPES[fmt]
+    if compress:
+        chunks = gzip_chunks(chunks)  # Sent as is: GZipMiddleware skips application/gzip bodies
+        filename += ".gz"
+        media_type = "application/gzip"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,218 @@
+"""
+Lightweight timing spans and Prometheus-style metrics for the fill pipeline.
+
+Spans always add their elapsed time to the per-job breakdown bound with
+`bind_job_timings` (stored on the FormHistory document). Histograms, counters
+and gauges are only updated when METRICS_ENABLED is set, so a disabled
+deployment pays two `perf_counter` calls per stage and nothing else.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from app.config import METRICS_ENABLED
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # bucket counts..., +Inf count, sum
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+# ─── Pipeline metrics ───────────────────────────────────────
+FILL_DURATION = Histogram("autofill_fill_duration_seconds", "End-to-end duration of a form fill job.")
+STAGE_DURATION = Histogram("autofill_stage_duration_seconds", "Duration of individual fill pipeline stages.", ("stage",))
+LLM_LATENCY = Histogram("autofill_llm_latency_seconds", "Latency of AI answer generation per provider.", ("provider",))
+MATCHER_LATENCY = Histogram("autofill_matcher_latency_seconds", "Latency of question-to-field matching.", ("mode",))
+QUEUE_WAIT = Histogram("autofill_queue_wait_seconds", "Time a fill job waited before it started running.")
+ACTIVE_BROWSERS = Gauge("autofill_active_browsers", "Number of Chromium instances currently open.")
+CACHE_REQUESTS = Counter("autofill_cache_requests_total", "Cache lookups by cache name and result.", ("cache", "result"))
+
+
+# ─── Spans ──────────────────────────────────────────────────
+_job_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("autofill_job_timings", default=None)
+
+
+def bind_job_timings(timings: Dict[str, float]):
+    """Route spans in the current context into `timings`. Returns a token for `unbind_job_timings`."""
+    return _job_timings.set(timings)
+
+
+def unbind_job_timings(token):
+    _job_timings.reset(token)
+
+
+class _Span:
+    __slots__ = ("stage", "histogram", "labels", "timings", "start")
+
+    def __init__(self, stage: str, histogram: Optional[Histogram], labels: Dict[str, str], timings: Optional[Dict[str, float]]):
+        self.stage = stage
+        self.histogram = histogram
+        self.labels = labels
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.timings is not None:
+            self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed
+        if METRICS_ENABLED:
+            STAGE_DURATION.observe(elapsed, stage=self.stage)
+            if self.histogram is not None:
+                self.histogram.observe(elapsed, **self.labels)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str, histogram: Optional[Histogram] = None, **labels):
+    """
+    Time a block of work as `stage`.
+    Adds to the bound per-job breakdown and, when metrics are enabled, to the
+    stage histogram and the optional dedicated `histogram`.
+    """
+    timings = _job_timings.get()
+    if timings is None and not METRICS_ENABLED:
+        return _NOOP_SPAN
+    return _Span(stage, histogram, labels, timings)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup for the hit-rate counters."""
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
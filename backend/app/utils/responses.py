@@ -0,0 +1,75 @@
+"""
+JSON responses for the API.
+
+`FastJSONResponse` renders with orjson when it is installed (several times
+faster on large payloads such as fill logs) and with the stdlib encoder
+otherwise; both also encode datetimes and ObjectIds. Handlers that
+build their payload from raw Mongo documents return it directly, which
+also skips response-model validation.
+
+`GZipMiddleware` is Starlette's, except that bodies which are already
+compressed (gzip exports, job artefacts) are sent as they are.
+"""
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi.middleware.gzip import GZipMiddleware as _GZipMiddleware
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # ObjectId and other scalars
+
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        """Compact UTF-8 JSON, also encoding datetimes and ObjectIds."""
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Compact UTF-8 JSON, also encoding datetimes and ObjectIds."""
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+PRECOMPRESSED_MEDIA_TYPES = {"application/gzip", "application/x-gzip", "application/zip"}
+
+
+class GZipMiddleware(_GZipMiddleware):
+    """Gzip responses, except precompressed ones, which skip the compressor."""
+
+    def __init__(self, app, **kwargs):
+        super().__init__(self._route, **kwargs)
+        self._app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope = {**scope, "gzip.client_send": send}
+        await super().__call__(scope, receive, send)
+
+    async def _route(self, scope, receive, send):
+        """Run the app; a precompressed response goes straight to the client instead of through `send`."""
+        client_send = scope.get("gzip.client_send")
+        bypass = False
+
+        async def route_send(message):
+            nonlocal bypass
+            if message["type"] == "http.response.start":
+                media_type = Headers(raw=message["headers"]).get("content-type", "").partition(";")[0]
+                bypass = client_send is not None and media_type.strip().lower() in PRECOMPRESSED_MEDIA_TYPES
+            await (client_send if bypass else send)(message)
+
+        await self._app(scope, receive, route_send)
@@ -1,10 +1,17 @@
 """
 Security utilities for password hashing.
 """
-from passlib.context import CryptContext
+# Created on first use so passlib/bcrypt stay out of the cold-start import path
+_pwd_context = None
 
-# Increase rounds for better security, handle potential bcrypt/passlib quirks
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        # Increase rounds for better security, handle potential bcrypt/passlib quirks
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def hash_password(password: str) -> str:
@@ -12,10 +19,10 @@ def hash_password(password: str) -> str:
     # Bcrypt has a hard limit of 72 bytes. We truncate to ensure no crash.
     # 99.9% of users use shorter passwords anyway.
     safe_password = password[:72]
-    return pwd_context.hash(safe_password)
+    return _get_pwd_context().hash(safe_password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     safe_password = plain_password[:72]
-    return pwd_context.verify(safe_password, hashed_password)
+    return _get_pwd_context().verify(safe_password, hashed_password)
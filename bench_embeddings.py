@@ -0,0 +1,177 @@
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Accuracy parity and cost of the question-matcher embedding backends (EMBEDDING_BACKEND):
+#   sentence_transformers: the reference MiniLM on PyTorch
+#   onnx:                  the int8 MiniLM on ONNX Runtime (see app/services/embedding_backends.py)
+# Each backend runs in its own process through match_question_to_field() on a labelled question set;
+# the report compares their answers, embeddings, per-question latency, load time and peak RSS.
+# Exits 1 when a backend cannot load or the field agreement is below BENCH_MIN_AGREEMENT.
+BACKENDS = ["sentence_transformers", "onnx"]
+MIN_AGREEMENT = float(os.getenv("BENCH_MIN_AGREEMENT", "0.95"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+backend_dir = Path(__file__).resolve().parent / "backend"
+
+# (question, expected profile field or None)
+QUESTIONS = [
+    ("What is your full name?", "full_name"),
+    ("Name of the participant", "full_name"),
+    ("Enter your name as on your ID card", "full_name"),
+    ("Student name *", "full_name"),
+    ("What is your registration number?", "register_number"),
+    ("Roll No.", "register_number"),
+    ("Enrollment number", "register_number"),
+    ("University ID", "register_number"),
+    ("Which department are you from?", "department"),
+    ("Branch of study", "department"),
+    ("Your major", "department"),
+    ("Current year of study", "year"),
+    ("Which semester are you in?", "year"),
+    ("Year of graduation", "year"),
+    ("Email address", "email"),
+    ("Your e-mail ID", "email"),
+    ("College mail id", "email"),
+    ("Mobile number", "phone"),
+    ("WhatsApp contact", "phone"),
+    ("Phone no. (with country code)", "phone"),
+    ("Gender", "gender"),
+    ("Are you male or female?", "gender"),
+    ("College / University name", "college_name"),
+    ("Name of your institution", "college_name"),
+    ("Which school do you study at?", "college_name"),
+    ("Residential address", "address"),
+    ("City you live in", "address"),
+    ("What programming languages do you know?", "skills"),
+    ("Technical skills", "skills"),
+    ("Tools and technologies you are comfortable with", "skills"),
+    ("Your hobbies", "interests"),
+    ("Areas of interest", "interests"),
+    ("Tell us about yourself", "bio"),
+    ("A short self introduction", "bio"),
+    ("Describe yourself in a few lines", "bio"),
+    # Longer than 128 WordPiece tokens: both backends must truncate at MiniLM's max_seq_length
+    ("Introduce yourself to the selection panel. " + "Cover your background, what motivates you, the projects "
+     "you are proud of, the people you learned from and what you hope to gain from this programme. " * 6, "bio"),
+    ("T-shirt size", None),
+    ("Dietary preference", None),
+    ("How did you hear about this event?", None),
+    ("Upload your payment screenshot", None),
+    ("Any questions for the organisers?", None),
+]
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def worker(name: str):
+    """Run one backend in this process and print its measurements as JSON."""
+    os.environ["EMBEDDING_BACKEND"] = name
+    sys.path.insert(0, str(backend_dir))
+    from app.services import question_matcher
+
+    baseline = rss_mb()
+    start = time.perf_counter()
+    model = question_matcher._get_model()
+    if model is None:
+        print(json.dumps({"backend": name, "error": "backend unavailable (see the message above)"}))
+        return
+    question_matcher._get_field_embeddings()
+    load_s = time.perf_counter() - start
+
+    answers, latencies = [], []
+    for question, _ in QUESTIONS:
+        question_matcher.match_question_to_field(question)  # Warm-up
+        runs = []
+        for _ in range(REPEAT):
+            t = time.perf_counter()
+            field, score = question_matcher.match_question_to_field(question)
+            runs.append(time.perf_counter() - t)
+        answers.append([field, round(float(score), 4)])
+        latencies.append(min(runs))
+    vectors = model.encode([question_matcher._clean_question(q) for q, _ in QUESTIONS])
+
+    print(json.dumps({
+        "backend": name,
+        "load_s": load_s,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": rss_mb(),
+        "latencies": latencies,
+        "answers": answers,
+        "vectors": [[float(x) for x in v] for v in vectors],
+    }))
+
+
+def run_worker(name: str) -> dict:
+    proc = subprocess.run([sys.executable, __file__, "--worker", name], capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"backend": name, "error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+    for line in lines[:-1]:
+        print(f"   [{name}] {line}")
+    return json.loads(lines[-1])
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    print(f"🧪 Embedding backends on {len(QUESTIONS)} labelled questions ({REPEAT} timed runs each)")
+    results = {name: run_worker(name) for name in BACKENDS}
+    failed = [r for r in results.values() if "error" in r]
+    for r in failed:
+        print(f"❌ {r['backend']}: {r['error']}")
+    if failed:
+        sys.exit(1)
+
+    ref, cand = (results[name] for name in BACKENDS)
+    print(f"\n   {'question':<48} {'expected':<16} {'sentence_transformers':<28} onnx")
+    agree = 0
+    correct = {name: 0 for name in BACKENDS}
+    for i, (question, expected) in enumerate(QUESTIONS):
+        (ref_field, ref_score), (cand_field, cand_score) = ref["answers"][i], cand["answers"][i]
+        agree += ref_field == cand_field
+        correct[BACKENDS[0]] += ref_field == expected
+        correct[BACKENDS[1]] += cand_field == expected
+        mark = "" if ref_field == cand_field else "  ← differs"
+        print(f"   {question[:48]:<48} {str(expected):<16} {f'{ref_field} ({ref_score})':<28} "
+              f"{cand_field} ({cand_score}){mark}")
+
+    cosines = [sum(a * b for a, b in zip(u, v)) for u, v in zip(ref["vectors"], cand["vectors"])]
+    agreement = agree / len(QUESTIONS)
+    print(f"\n   field agreement             {agreement:8.1%}  ({agree}/{len(QUESTIONS)})")
+    print(f"   embedding cosine (mean/min) {statistics.mean(cosines):8.4f} / {min(cosines):.4f}")
+    print(f"\n   {'':<28} {'sentence_transformers':>22} {'onnx':>10}")
+    rows = [
+        ("correct vs labels", lambda r, n: f"{correct[n]}/{len(QUESTIONS)}"),
+        ("match latency p50 (ms)", lambda r, n: f"{percentile(r['latencies'], 50) * 1000:.2f}"),
+        ("match latency p95 (ms)", lambda r, n: f"{percentile(r['latencies'], 95) * 1000:.2f}"),
+        ("load + field encode (s)", lambda r, n: f"{r['load_s']:.2f}"),
+        ("RSS before load (MiB)", lambda r, n: f"{r['baseline_rss_mb']:.0f}"),
+        ("peak RSS (MiB)", lambda r, n: f"{r['peak_rss_mb']:.0f}"),
+    ]
+    for label, fmt in rows:
+        print(f"   {label:<28} {fmt(ref, BACKENDS[0]):>22} {fmt(cand, BACKENDS[1]):>10}")
+
+    if agreement < MIN_AGREEMENT:
+        print(f"❌ onnx agrees with sentence_transformers on {agreement:.1%} of questions "
+              f"(minimum {MIN_AGREEMENT:.0%}).")
+        sys.exit(1)
+    print(f"✅ onnx agrees with sentence_transformers on {agreement:.1%} of questions "
+          f"(minimum {MIN_AGREEMENT:.0%}).")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        worker(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+# Compares the Lite (no-ML) keyword matching before and after the compiled matcher:
+#   substring: the original per-field `any(kw in q for kw in keywords)` scan (first field in table order wins)
+#   compiled:  KeywordMatcher, one regex pass, most specific whole-phrase hit wins
+# and prints both answers for a labelled question set, plus the template intent picked by the local generator.
+# Exits 1 unless the compiled matcher is faster than the substring scan.
+REPEAT = int(os.getenv("BENCH_REPEAT", "2000"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from app.services.ai_agent import TEMPLATE_INTENTS, detect_intent  # noqa: E402
+from app.services.question_matcher import FIELD_DESCRIPTIONS, _simple_match  # noqa: E402
+
+# (question, expected profile field or None)
+QUESTIONS = [
+    ("What is your name?", "full_name"),
+    ("Full Name *", "full_name"),
+    ("Name of your college", "college_name"),
+    ("Email Address *", "email"),
+    ("Your WhatsApp number", "phone"),
+    ("Contact number", "phone"),
+    ("Which year are you in?", "year"),
+    ("Department / Branch", "department"),
+    ("Reg no", "register_number"),
+    ("Roll no", "register_number"),
+    ("Gender", "gender"),
+    ("Technical skills", "skills"),
+    ("Areas of interest", "interests"),
+    # The head noun decides, not the longer modifier phrase ("institution" is a college_name phrase)
+    ("Institution email", "email"),
+    ("College email ID", "email"),
+    ("Department email", "email"),
+    ("College address", "address"),
+    ("University roll number", "register_number"),
+    ("Which city do you live in? (e.g. Essex)", "address"),
+    ("Favourite colour", None),
+    ("Any suggestions for the organisers?", None),
+]
+INTENT_QUESTIONS = [
+    "Why do you want to join this club?",
+    "Tell us about yourself",
+    "Your notable achievements",
+    "What do you expect from this workshop?",
+    "Which tools and technologies do you know?",
+    "Describe a project you worked on",
+    "Anything else?",
+]
+
+
+def substring_match(question):
+    q = question.lower()
+    for field, keywords in FIELD_DESCRIPTIONS.items():
+        if any(kw in q for kw in keywords):
+            return field
+    return None
+
+
+def substring_intent(question):
+    q = question.lower().strip()
+    for intent, keywords in TEMPLATE_INTENTS.items():
+        if any(kw in q for kw in keywords):
+            return intent
+    return None
+
+
+def bench(fn, questions):
+    for q in questions:
+        fn(q)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for q in questions:
+            fn(q)
+    elapsed = time.perf_counter() - start
+    return REPEAT * len(questions) / elapsed
+
+
+texts = [q for q, _ in QUESTIONS]
+print(f"🔎 Lite field matching on {len(QUESTIONS)} labelled questions")
+print(f"   {'question':<42} {'expected':<16} {'substring':<16} compiled")
+right = {"substring": 0, "compiled": 0}
+for question, expected in QUESTIONS:
+    old = substring_match(question)
+    new, confidence = _simple_match(question)
+    right["substring"] += old == expected
+    right["compiled"] += new == expected
+    mark = "" if old == new else "  ← changed"
+    print(f"   {question:<42} {str(expected):<16} {str(old):<16} {new} ({confidence}){mark}")
+print(f"   correct: substring {right['substring']}/{len(QUESTIONS)}, compiled {right['compiled']}/{len(QUESTIONS)}")
+
+print(f"\n🧩 Local template intents")
+for question in INTENT_QUESTIONS:
+    old, new = substring_intent(question), detect_intent(question)
+    print(f"   {question:<42} {str(old):<12} {new}{'' if old == new else '  ← changed'}")
+
+print(f"\n⏱️  Throughput, {REPEAT} runs over the question set")
+old_rate = bench(substring_match, texts)
+new_rate = bench(_simple_match, texts)
+print(f"   substring scan   {old_rate:10,.0f} questions/s")
+print(f"   compiled matcher {new_rate:10,.0f} questions/s")
+speedup = new_rate / old_rate
+if speedup <= 1:
+    print(f"❌ compiled matcher runs at {speedup:.2f}x the substring scan (no faster)")
+    sys.exit(1)
+print(f"✅ compiled matcher runs at {speedup:.2f}x the substring scan")
@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Compares the cost of serialising one /api/forms/history page:
+#   model: validate FormFillStatusResponse rows, dump them and json.dumps (FastAPI's default path)
+#   raw:   projected Mongo dicts straight through FastJSONResponse (orjson when installed)
+ROWS = int(os.getenv("BENCH_ROWS", "100"))
+LOG_ENTRIES = int(os.getenv("BENCH_LOG_ENTRIES", "25"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "50"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from app.schemas import FormFillStatusResponse, FormHistoryResponse  # noqa: E402
+from app.utils.responses import FastJSONResponse, orjson  # noqa: E402
+
+
+def make_docs():
+    started = datetime(2024, 1, 1)
+    docs = []
+    for i in range(ROWS):
+        docs.append({
+            "_id": f"65a0c0ffee{i:014d}",
+            "form_url": f"https://docs.google.com/forms/d/e/{i}/viewform",
+            "form_title": f"Registration form {i}",
+            "status": "completed",
+            "questions_detected": LOG_ENTRIES,
+            "questions_filled": LOG_ENTRIES,
+            "ai_answers_used": 3,
+            "auto_submitted": False,
+            "error_message": "",
+            "fill_log": [{
+                "question": f"Question number {j} of the form?",
+                "field_type": "paragraph" if j % 5 == 0 else "text",
+                "answer": ("A fairly long generated answer. " * 8) if j % 5 == 0 else "Asha K",
+                "source": "ai_generated (grok)" if j % 5 == 0 else "profile (full_name, 100%)",
+                "status": "filled",
+                "timestamp": (started + timedelta(seconds=j)).isoformat(),
+            } for j in range(LOG_ENTRIES)],
+            "timings": {"goto": 1.2, "fill": 3.4, "total": 6.1},
+            "created_at": started + timedelta(minutes=i),
+            "completed_at": started + timedelta(minutes=i, seconds=30),
+        })
+    return docs
+
+
+def model_path(docs):
+    page = FormHistoryResponse.model_validate({"items": docs, "total": len(docs)})
+    return json.dumps(page.model_dump(mode="json", by_alias=True), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+DEFAULTS = {name: field.get_default(call_default_factory=True)
+            for name, field in FormFillStatusResponse.model_fields.items() if not field.is_required()}
+
+
+def raw_path(docs):
+    # Same per-row work as form_routes._status_row: defaults merged under the projected document
+    items = [{**DEFAULTS, **doc} for doc in docs]
+    return FastJSONResponse({"items": items, "total": len(items)}).body
+
+
+def bench(fn, docs):
+    fn(docs)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        body = fn(docs)
+    return (time.perf_counter() - start) / REPEAT * 1000, body
+
+
+docs = make_docs()
+print(f"⏱️  Serialising a {ROWS}-row history page ({LOG_ENTRIES} log entries per row), {REPEAT} runs each")
+model_ms, model_body = bench(model_path, docs)
+raw_ms, raw_body = bench(raw_path, docs)
+print(f"   model + json.dumps      {model_ms:8.2f} ms   {len(model_body) / 1024:8.1f} KiB")
+print(f"   raw + {'orjson' if orjson else 'json (no orjson)':<17} {raw_ms:8.2f} ms   {len(raw_body) / 1024:8.1f} KiB")
+print(f"   gzip (level 9, as GZipMiddleware) {len(gzip.compress(raw_body, 9)) / 1024:.1f} KiB")
+print(f"✅ raw path is {model_ms / raw_ms:.1f}x faster")
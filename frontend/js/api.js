@@ -32,8 +32,8 @@ class ApiClient {
         return !!this.token;
     }
 
-    async request(method, path, body = null) {
-        const headers = { 'Content-Type': 'application/json' };
+    async request(method, path, body = null, extraHeaders = {}) {
+        const headers = { 'Content-Type': 'application/json', ...extraHeaders };
         if (this.token) {
             headers['Authorization'] = `Bearer ${this.token}`;
         }
@@ -90,8 +90,44 @@ class ApiClient {
     }
 
     // Forms
-    fillForm(formUrl, autoSubmit) {
-        return this.request('POST', '/api/forms/fill', { form_url: formUrl, auto_submit: autoSubmit });
+    fillForm(formUrl, autoSubmit, mode = 'browser', idempotencyKey = null) {
+        const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {};
+        return this.request('POST', '/api/forms/fill', { form_url: formUrl, auto_submit: autoSubmit, mode }, headers);
+    }
+
+    cancelFill(historyId) {
+        return this.request('DELETE', `/api/forms/fill/${historyId}`);
+    }
+
+    retryFill(historyId) {
+        return this.request('POST', `/api/forms/fill/${historyId}/retry`);
+    }
+
+    // Downloads need the bearer token, so they are fetched and saved as a blob
+    async download(path, filename = null) {
+        const res = await fetch(`${API_BASE}${path}`, {
+            headers: { 'Authorization': `Bearer ${this.token}` },
+        });
+        if (!res.ok) {
+            const data = await res.json().catch(() => ({}));
+            throw new Error(data.detail || `Download failed with status ${res.status}`);
+        }
+        const disposition = res.headers.get('Content-Disposition') || '';
+        const url = URL.createObjectURL(await res.blob());
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = filename || (disposition.match(/filename="([^"]+)"/) || [])[1] || 'download';
+        link.click();
+        URL.revokeObjectURL(url);
+    }
+
+    downloadArtifact(historyId, artifact) {
+        return this.download(`/api/forms/fill/${historyId}/artifacts/${artifact.id}`, artifact.filename);
+    }
+
+    // kind: 'history' | 'mappings'; format: 'ndjson' | 'csv'
+    downloadExport(kind, format = 'csv') {
+        return this.download(`/api/forms/${kind}/export?format=${format}`);
     }
 
     getFormStatus(historyId) {
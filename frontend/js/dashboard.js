@@ -4,6 +4,9 @@
 let currentHistoryId = null;
 let pollInterval = null;
 
+const ACTIVE_STATUSES = ['pending', 'queued', 'filling'];
+const RESUMABLE_STATUSES = ['failed', 'cancelled', 'timed_out'];
+
 document.addEventListener('DOMContentLoaded', async () => {
     if (!requireAuth()) return;
 
@@ -15,12 +18,17 @@ document.addEventListener('DOMContentLoaded', async () => {
     toggle?.addEventListener('click', () => {
         toggle.classList.toggle('active');
     });
+    const prefillToggle = document.getElementById('prefill-toggle');
+    prefillToggle?.addEventListener('click', () => {
+        prefillToggle.classList.toggle('active');
+    });
 
     // Fill form
     document.getElementById('fill-form')?.addEventListener('submit', async (e) => {
         e.preventDefault();
         const url = document.getElementById('form-url').value.trim();
         const autoSubmit = document.getElementById('auto-submit-toggle').classList.contains('active');
+        const mode = document.getElementById('prefill-toggle').classList.contains('active') ? 'prefill' : 'browser';
         const btn = document.getElementById('fill-btn');
 
         if (!url) {
@@ -32,7 +40,9 @@ document.addEventListener('DOMContentLoaded', async () => {
         btn.disabled = true;
 
         try {
-            const result = await api.fillForm(url, autoSubmit);
+            // One key per click: a resent request returns the same job
+            const idempotencyKey = window.crypto?.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+            const result = await api.fillForm(url, autoSubmit, mode, idempotencyKey);
             currentHistoryId = result.id;
             showToast('Form filling started!', 'info');
             showStatusPanel(result);
@@ -44,6 +54,41 @@ document.addEventListener('DOMContentLoaded', async () => {
             btn.disabled = false;
         }
     });
+
+    // Cancel a queued or running fill
+    document.getElementById('cancel-btn')?.addEventListener('click', async () => {
+        if (!currentHistoryId) return;
+        try {
+            const result = await api.cancelFill(currentHistoryId);
+            updateStatusUI(result);
+        } catch (err) {
+            showToast(err.message, 'error');
+        }
+    });
+
+    // Copy the prefilled form link
+    document.getElementById('copy-prefill-btn')?.addEventListener('click', async () => {
+        try {
+            await navigator.clipboard.writeText(document.getElementById('prefill-link').href);
+            showToast('Link copied', 'success');
+        } catch (err) {
+            showToast('Could not copy the link', 'error');
+        }
+    });
+
+    // Resume a failed fill from its last completed page
+    document.getElementById('resume-btn')?.addEventListener('click', async () => {
+        if (!currentHistoryId) return;
+        try {
+            const result = await api.retryFill(currentHistoryId);
+            currentHistoryId = result.id;
+            showToast('Resuming form fill...', 'info');
+            showStatusPanel(result);
+            startPolling(result.id);
+        } catch (err) {
+            showToast(err.message, 'error');
+        }
+    });
 });
 
 async function loadStats() {
@@ -73,10 +118,16 @@ function updateStatusUI(data) {
     // Badge
     const badge = document.getElementById('status-badge');
     badge.className = `status-badge ${data.status}`;
-    badge.innerHTML = `<span class="pulse"></span> ${data.status.toUpperCase()}`;
+    badge.innerHTML = `<span class="pulse"></span> ${data.status.replace('_', ' ').toUpperCase()}`;
+    document.getElementById('cancel-btn').style.display = ACTIVE_STATUSES.includes(data.status) ? '' : 'none';
 
     // Title
-    document.getElementById('status-title').textContent = data.form_title || 'Processing...';
+    let title = data.form_title || 'Processing...';
+    if (data.status === 'queued' && data.queue_position) {
+        const eta = data.estimated_start_at ? ` · starts ~${new Date(data.estimated_start_at + 'Z').toLocaleTimeString()}` : '';
+        title = `Waiting in queue (#${data.queue_position})${eta}`;
+    }
+    document.getElementById('status-title').textContent = title;
 
     // Progress
     const total = data.questions_detected || 1;
@@ -108,6 +159,14 @@ function updateStatusUI(data) {
         });
     }
 
+    // Prefilled link
+    if (data.prefilled_url) {
+        document.getElementById('prefill-link').href = data.prefilled_url;
+        document.getElementById('prefill-row').style.display = 'flex';
+    } else {
+        document.getElementById('prefill-row').style.display = 'none';
+    }
+
     // Error
     if (data.error_message) {
         document.getElementById('error-message').textContent = data.error_message;
@@ -115,6 +174,11 @@ function updateStatusUI(data) {
     } else {
         document.getElementById('error-row').style.display = 'none';
     }
+
+    // Resume (failed fills continue after the last checkpointed page)
+    const resumeBtn = document.getElementById('resume-btn');
+    resumeBtn.style.display = RESUMABLE_STATUSES.includes(data.status) ? '' : 'none';
+    resumeBtn.textContent = data.pages_completed ? `↻ Resume from page ${data.pages_completed + 1}` : '↻ Retry';
 }
 
 function startPolling(historyId) {
@@ -123,11 +187,17 @@ function startPolling(historyId) {
         try {
             const data = await api.getFormStatus(historyId);
             updateStatusUI(data);
-            if (data.status === 'completed' || data.status === 'failed') {
+            if (!ACTIVE_STATUSES.includes(data.status)) {
                 clearInterval(pollInterval);
                 pollInterval = null;
-                if (data.status === 'completed') {
+                if (data.status === 'completed' && data.prefilled_url) {
+                    showToast('Prefilled link ready — review and submit the form yourself 🔗', 'success');
+                } else if (data.status === 'completed') {
                     showToast('Form filled successfully! ✨', 'success');
+                } else if (data.status === 'cancelled') {
+                    showToast('Form filling cancelled', 'info');
+                } else if (data.status === 'timed_out') {
+                    showToast('Form filling timed out', 'warning');
                 } else {
                     showToast('Form filling failed: ' + (data.error_message || 'Unknown error'), 'error');
                 }
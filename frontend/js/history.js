@@ -34,18 +34,27 @@ async function loadHistory() {
                 failed: 'var(--error)',
                 filling: 'var(--info)',
                 pending: 'var(--warning)',
+                queued: 'var(--warning)',
+                cancelled: 'var(--text-secondary)',
+                timed_out: 'var(--error)',
             };
             const statusBg = {
                 completed: 'var(--success-bg)',
                 failed: 'var(--error-bg)',
                 filling: 'var(--info-bg)',
                 pending: 'var(--warning-bg)',
+                queued: 'var(--warning-bg)',
+                cancelled: 'var(--bg-glass-hover)',
+                timed_out: 'var(--error-bg)',
             };
             const icons = {
                 completed: '✅',
                 failed: '❌',
                 filling: '⏳',
                 pending: '🕐',
+                queued: '🕐',
+                cancelled: '⏹',
+                timed_out: '⌛',
             };
 
             const div = document.createElement('div');
@@ -119,6 +128,14 @@ function showDetail(item) {
         `;
     }
 
+    const artifacts = (item.artifacts || []).filter(a => new Date(a.expires_at + 'Z') > new Date());
+    const artifactLabels = { cpu_profile: '📈 CPU profile', playwright_trace: '🎬 Playwright trace' };
+    const artifactsHtml = artifacts.length ? `
+        <div style="display:flex;gap:0.5rem;flex-wrap:wrap;margin-bottom:1rem;">
+            ${artifacts.map((a, i) => `<button class="btn btn-secondary" data-artifact="${i}">
+                ${artifactLabels[a.kind] || escapeHtml(a.kind)} (${Math.ceil(a.size / 1024)} KB)</button>`).join('')}
+        </div>` : '';
+
     content.innerHTML = `
         <h2 style="margin-bottom:0.5rem;">${escapeHtml(item.form_title || 'Untitled Form')}</h2>
         <p style="color:var(--text-muted);font-size:0.85rem;margin-bottom:1rem;">
@@ -139,15 +156,33 @@ function showDetail(item) {
             </div>
         </div>
         ${item.error_message ? `<div style="padding:12px;background:var(--error-bg);border-radius:8px;color:var(--error);margin-bottom:1rem;">⚠ ${escapeHtml(item.error_message)}</div>` : ''}
+        ${artifactsHtml}
         ${logHtml}
         <div style="text-align:right;margin-top:1.5rem;">
             <button class="btn btn-secondary" onclick="closeModal()">Close</button>
         </div>
     `;
+    content.querySelectorAll('[data-artifact]').forEach(btn => {
+        btn.addEventListener('click', async () => {
+            try {
+                await api.downloadArtifact(item._id, artifacts[Number(btn.dataset.artifact)]);
+            } catch (err) {
+                showToast(err.message, 'error');
+            }
+        });
+    });
 
     modal.classList.add('visible');
 }
 
+async function exportData(kind) {
+    try {
+        await api.downloadExport(kind, 'csv');
+    } catch (err) {
+        showToast(err.message, 'error');
+    }
+}
+
 function closeModal() {
     document.getElementById('detail-modal').classList.remove('visible');
 }
@@ -1,6 +1,7 @@
 /**
  * Profile Page Logic — Load, edit, and save profile data.
  */
+let extraFields = {};  // Not edited on this page; sent back unchanged so saving keeps them
 document.addEventListener('DOMContentLoaded', async () => {
     if (!requireAuth()) return;
     await loadNavbar();
@@ -43,6 +44,7 @@ async function loadProfile() {
             setField('skills', profile.skills);
             setField('interests', profile.interests);
             setField('bio', profile.bio);
+            extraFields = profile.extra_fields || {};
         }
     } catch (e) {
         // Profile may not exist yet, that's okay
@@ -63,7 +65,7 @@ function getFormData() {
         skills: getField('skills'),
         interests: getField('interests'),
         bio: getField('bio'),
-        extra_fields: {},
+        extra_fields: extraFields,
     };
 }
 
@@ -0,0 +1,19 @@
+"""
+API load-test harness.
+
+    python -m loadtest --users 50 --duration 60 --llm-latency-ms 800
+
+starts, on this machine:
+
+* the LLM / form stand-ins (`stand_ins.py`): an OpenAI-compatible
+  `/v1/chat/completions` with configurable latency and a Google Form page
+  whose URL the API accepts,
+* the API (`serve.py`) against a MongoDB (`--mongo mongodb://...`) or an
+  in-memory mongomock-motor database (`--mongo mongomock`, the default), with
+  its event-loop lag sampled,
+
+then runs `--users` virtual users through signup → profile → fill → poll →
+history (`flows.py`) and reports requests per second, p50/p95/p99 latency per
+endpoint and the API's event-loop lag. `--base-url` drives an API that is
+already running instead (no lag figures then).
+"""
@@ -0,0 +1,146 @@
+"""
+python -m loadtest [options]: start the stand-ins and the API, run the virtual users, print the report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from loadtest.flows import Stats, VirtualUser
+
+ROOT = Path(__file__).resolve().parent.parent
+READY_TIMEOUT_SECONDS = 60
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load-test the AutoFill API.")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load after ramp-up starts")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Seconds over which users start")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Status polling interval (dashboard: 2 s)")
+    parser.add_argument("--fill-mode", choices=("prefill", "browser"), default="prefill")
+    parser.add_argument("--form-url", help="Form to fill (default: the stand-in form; browser mode needs a real one)")
+    parser.add_argument("--mongo", default="mongomock", help="'mongomock' (in memory) or a MongoDB URL")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--stand-in-port", type=int, default=8100)
+    parser.add_argument("--base-url", help="Drive an API that is already running instead of starting one")
+    parser.add_argument("--app-log", help="File for the API's output (default: discarded)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args()
+
+
+def start(cmd, env, log_path=None):
+    log = open(log_path, "a") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=str(ROOT), env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_ready(client, url: str, proc=None):
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            sys.exit(f"❌ {url} exited with code {proc.returncode} (see --app-log)")
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    sys.exit(f"❌ {url} did not come up within {READY_TIMEOUT_SECONDS}s")
+
+
+def print_report(report: dict, args):
+    print(f"\n📊 {args.users} users, {report['elapsed_seconds']:.0f}s, {report['total_rps']:.1f} req/s overall")
+    print(f"   {'endpoint':<30} {'reqs':>7} {'err':>5} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, row in report["endpoints"].items():
+        errors = sum(row["errors"].values())
+        print(f"   {endpoint:<30} {row['requests']:>7} {errors:>5} {row['rps']:>7.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+    fills = report["fills"]
+    print(f"   fills: {fills['by_status'] or 'none finished'}, "
+          f"p50 {fills['p50_seconds']:.1f}s / p95 {fills['p95_seconds']:.1f}s from start to final status")
+    lag = report.get("loop_lag")
+    if lag:
+        print(f"   event-loop lag: p50 {lag['p50_ms']} ms, p95 {lag['p95_ms']} ms, p99 {lag['p99_ms']} ms, "
+              f"max {lag['max_ms']} ms ({lag['samples']} samples)")
+    failed = {e: row["errors"] for e, row in report["endpoints"].items() if row["errors"]}
+    if failed:
+        print(f"⚠ Errors by endpoint: {failed}")
+
+
+async def run(args):
+    import httpx
+
+    procs = []
+    env = dict(os.environ)
+    stand_in_url = f"http://127.0.0.1:{args.stand_in_port}"
+    form_url = args.form_url or f"{stand_in_url}/docs.google.com/forms/d/e/loadtest/viewform"
+    base_url = args.base_url
+    try:
+        async with httpx.AsyncClient(timeout=60) as probe:
+            if not args.form_url or not base_url:
+                env.update({
+                    "LOADTEST_LLM_LATENCY_MS": str(args.llm_latency_ms),
+                    "LOADTEST_LLM_JITTER_MS": str(args.llm_jitter_ms),
+                    "LOADTEST_LLM_ERROR_RATE": str(args.llm_error_rate),
+                })
+                procs.append(start([sys.executable, "-m", "uvicorn", "loadtest.stand_ins:app",
+                                    "--port", str(args.stand_in_port), "--log-level", "warning"], env))
+                await wait_ready(probe, f"{stand_in_url}/docs.google.com/forms/d/e/ready/viewform", procs[-1])
+            if not base_url:
+                base_url = f"http://127.0.0.1:{args.api_port}"
+                env.update({
+                    "AI_MODE": "grok",
+                    "GROK_API_KEY": "loadtest",
+                    "GROK_BASE_URL": f"{stand_in_url}/v1",
+                    "MAPPING_COMPACTION_INTERVAL_MINUTES": "0",
+                })
+                if not args.form_url:  # Let the API open the stand-in form
+                    env.update({
+                        "FORM_URL_HOSTS": f"docs.google.com,forms.gle,127.0.0.1:{args.stand_in_port}",
+                        "FORM_URL_ALLOW_HTTP": "true",
+                    })
+                procs.append(start([sys.executable, "-m", "loadtest.serve", "--port", str(args.api_port),
+                                    "--mongo", args.mongo], env, args.app_log))
+                await wait_ready(probe, f"{base_url}/api/ping", procs[-1])
+                await probe.get(f"{base_url}/_loadtest/loop-lag", params={"reset": "true"})
+
+            print(f"🔥 {args.users} users against {base_url} for {args.duration:.0f}s "
+                  f"({args.fill_mode} fills of {form_url})")
+            stats = Stats()
+            limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+            async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+                started = time.perf_counter()
+                deadline = started + args.duration
+                users = [VirtualUser(client, stats, form_url, args.fill_mode, args.poll_interval)
+                         for _ in range(args.users)]
+                await asyncio.gather(*(
+                    user.run(deadline, args.ramp_up * i / max(1, args.users)) for i, user in enumerate(users)
+                ))
+                report = stats.report(time.perf_counter() - started)
+
+            if not args.base_url:
+                report["loop_lag"] = (await probe.get(f"{base_url}/_loadtest/loop-lag")).json()
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    print_report(report, args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"📝 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
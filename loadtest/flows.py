@@ -0,0 +1,144 @@
+"""
+Virtual users and the latency statistics they record.
+
+Each user signs up once, then until the deadline repeats: login → save
+profile → start a fill → poll its status every `poll_interval` until it
+finishes → read the history page, like the dashboard does.
+"""
+import asyncio
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "timed_out")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Stats:
+    """Latencies and failures per endpoint ("GET /api/forms/status/{id}" style names)."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.fills: Dict[str, int] = defaultdict(int)
+        self.fill_seconds: List[float] = []
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        self.latencies[endpoint].append(seconds)
+        if error:
+            self.errors[endpoint][error] += 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": dict(self.errors.get(endpoint, {})),
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+        fill_seconds = sorted(self.fill_seconds)
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "total_rps": round(sum(len(v) for v in self.latencies.values()) / elapsed, 2),
+            "endpoints": endpoints,
+            "fills": {
+                "by_status": dict(self.fills),
+                "p50_seconds": round(percentile(fill_seconds, 50), 2),
+                "p95_seconds": round(percentile(fill_seconds, 95), 2),
+            },
+        }
+
+
+class VirtualUser:
+    """One dashboard user driving the API over a shared httpx.AsyncClient."""
+
+    def __init__(self, client, stats: Stats, form_url: str, fill_mode: str, poll_interval: float):
+        self.client = client
+        self.stats = stats
+        self.form_url = form_url
+        self.fill_mode = fill_mode
+        self.poll_interval = poll_interval
+        self.username = f"lt_{uuid.uuid4().hex[:12]}"
+        self.password = "loadtest-password"
+        self.headers: Dict[str, str] = {}
+
+    async def call(self, method: str, path: str, endpoint: str, **kwargs) -> Optional[dict]:
+        """One request; the JSON body on 2xx, None (recorded as an error) otherwise."""
+        kwargs.setdefault("headers", self.headers)
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except Exception as e:
+            self.stats.record(endpoint, time.perf_counter() - start, type(e).__name__)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start,
+                          None if response.is_success else str(response.status_code))
+        return response.json() if response.is_success else None
+
+    async def signup(self) -> bool:
+        data = await self.call("POST", "/api/auth/signup", "POST /api/auth/signup", json={
+            "username": self.username,
+            "email": f"{self.username}@example.com",
+            "password": self.password,
+        })
+        if data:
+            self.headers = {"Authorization": f"Bearer {data['access_token']}"}
+        return data is not None
+
+    async def iteration(self, deadline: float):
+        data = await self.call("POST", "/api/auth/login", "POST /api/auth/login",
+                               json={"username": self.username, "password": self.password})
+        if data:
+            self.headers = {"Authorization": f"Bearer {data['access_token']}"}
+        await self.call("PUT", "/api/profile/", "PUT /api/profile/", json={
+            "full_name": f"Load Test {self.username[-4:]}",
+            "email": f"{self.username}@example.com",
+            "phone": f"98{random.randint(10000000, 99999999)}",
+            "register_number": f"RA{random.randint(1000000, 9999999)}",
+            "department": "Computer Science",
+            "year": random.choice(["1", "2", "3", "4"]),
+            "gender": random.choice(["Male", "Female"]),
+            "college_name": "Load Test Institute of Technology",
+            "skills": "Python, FastAPI, MongoDB",
+            "interests": "Hackathons, open source",
+            "bio": "Student who likes building web services.",
+        })
+
+        started = time.perf_counter()
+        job = await self.call("POST", "/api/forms/fill", "POST /api/forms/fill",
+                              json={"form_url": self.form_url, "auto_submit": False, "mode": self.fill_mode},
+                              headers={**self.headers, "Idempotency-Key": uuid.uuid4().hex})
+        if job:
+            history_id = job.get("_id") or job.get("id")
+            status = job.get("status")
+            while status not in TERMINAL_STATUSES and time.perf_counter() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                job = await self.call("GET", f"/api/forms/status/{history_id}", "GET /api/forms/status/{id}") or job
+                status = job.get("status")
+            if status in TERMINAL_STATUSES:
+                self.stats.fills[status] += 1
+                self.stats.fill_seconds.append(time.perf_counter() - started)
+
+        await self.call("GET", "/api/forms/history", "GET /api/forms/history", params={"skip": 0, "limit": 20})
+
+    async def run(self, deadline: float, start_delay: float):
+        await asyncio.sleep(start_delay)
+        if not await self.signup():
+            return
+        while time.perf_counter() < deadline:
+            await self.iteration(deadline)
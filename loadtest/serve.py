@@ -0,0 +1,122 @@
+"""
+Run the API for a load test.
+
+    python -m loadtest.serve --port 8000 [--mongo mongomock | --mongo mongodb://...]
+
+With `--mongo mongomock` Motor is replaced by mongomock-motor (in-memory,
+per process; `pip install mongomock-motor "beanie<2"`, as Beanie 2 no longer
+drives Motor) before the app connects. The event loop is sampled every
+LOADTEST_LAG_INTERVAL_MS; GET /_loadtest/loop-lag returns the lag
+percentiles since the last `?reset=true`.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT))
+
+from loadtest.flows import percentile  # noqa: E402
+
+LAG_INTERVAL = float(os.getenv("LOADTEST_LAG_INTERVAL_MS", "50")) / 1000
+MOCK_DATABASE = "autofill_pro"
+
+
+def use_mongomock():
+    """Point app.database's Motor client at an in-memory mongomock-motor database."""
+    import beanie
+    if int(beanie.__version__.split(".")[0]) >= 2:
+        sys.exit(f"❌ --mongo mongomock needs Beanie 1.x (installed: {beanie.__version__}); "
+                 f"pip install \"beanie<2\" or pass --mongo mongodb://...")
+    import motor.motor_asyncio
+    import mongomock.collection
+    from mongomock_motor import AsyncMongoMockClient
+
+    # mongomock's create_indexes() drops index options such as partialFilterExpression
+    def create_indexes(self, indexes, session=None, **kwargs):
+        names = []
+        for index in indexes:
+            spec = dict(index.document)
+            keys = list(spec.pop("key").items())
+            names.append(self.create_index(keys, session=session, **spec))
+        return names
+
+    mongomock.collection.Collection.create_indexes = create_indexes
+
+    class StandInClient(AsyncMongoMockClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+
+        def get_default_database(self, *args, **kwargs):
+            return self[MOCK_DATABASE]  # mongomock-motor does not wrap the default database
+
+    motor.motor_asyncio.AsyncIOMotorClient = StandInClient
+
+
+class LoopLag:
+    """Samples how late the event loop wakes from a short sleep."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.samples.append(max(0.0, loop.time() - start - LAG_INTERVAL))
+
+    def report(self, reset: bool) -> dict:
+        samples = sorted(self.samples)
+        if reset:
+            self.samples = []
+        return {
+            "samples": len(samples),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            "max_ms": round((samples[-1] if samples else 0.0) * 1000, 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API for a load test.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mongo", default="mongomock", help="'mongomock' or a MongoDB URL")
+    args = parser.parse_args()
+
+    if args.mongo == "mongomock":
+        use_mongomock()
+    else:
+        os.environ["MONGODB_URI"] = args.mongo
+
+    import uvicorn
+    from app.main import app, STARTUP_ERROR
+    if STARTUP_ERROR:
+        sys.exit(STARTUP_ERROR)
+
+    lag = LoopLag()
+
+    @app.on_event("startup")
+    async def start_lag_probe():
+        asyncio.ensure_future(lag.run())
+
+    async def loop_lag(reset: bool = False):
+        return lag.report(reset)
+
+    # Registered ahead of the catch-all page routes
+    app.router.add_api_route("/_loadtest/loop-lag", loop_lag, methods=["GET"])
+    app.router.routes.insert(0, app.router.routes.pop())
+
+    print(f"🚀 API on http://{args.host}:{args.port} (database: {args.mongo}), started {time.strftime('%X')}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Local stand-ins for the services a fill talks to.
+
+* POST /v1/chat/completions: OpenAI-compatible; answers after
+  LOADTEST_LLM_LATENCY_MS (± LOADTEST_LLM_JITTER_MS) and fails with HTTP 500
+  for a LOADTEST_LLM_ERROR_RATE fraction of calls.
+* GET /docs.google.com/forms/d/e/{form_id}/viewform: a form page carrying
+  FB_PUBLIC_LOAD_DATA_ like the real one, for prefilled-link fills. The
+  path contains "docs.google.com/forms" so the API accepts the URL.
+
+    python -m uvicorn loadtest.stand_ins:app --port 8100
+"""
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse
+
+LATENCY_MS = float(os.getenv("LOADTEST_LLM_LATENCY_MS", "800"))
+JITTER_MS = float(os.getenv("LOADTEST_LLM_JITTER_MS", "200"))
+ERROR_RATE = float(os.getenv("LOADTEST_LLM_ERROR_RATE", "0"))
+
+# (title, Google Forms item type, options); see app.services.prefill for the type codes
+FORM_ITEMS = [
+    ("Full Name", 0, []),
+    ("Email Address", 0, []),
+    ("Phone Number", 0, []),
+    ("Register Number", 0, []),
+    ("Department", 3, ["Computer Science", "Electronics", "Mechanical", "Civil"]),
+    ("Year of Study", 2, ["1", "2", "3", "4"]),
+    ("Gender", 2, ["Male", "Female", "Prefer not to say"]),
+    ("Which events are you interested in?", 4, ["Hackathon", "Workshops", "Paper presentation", "Quiz"]),
+    ("Why do you want to join this event?", 1, []),
+    ("Describe a project you are proud of.", 1, []),
+]
+
+app = FastAPI(title="AutoFill load-test stand-ins")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    delay = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000
+    await asyncio.sleep(delay)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        raise HTTPException(status_code=500, detail="Injected stand-in failure")
+    prompt = body.get("messages", [{}])[-1].get("content", "")
+    answer = "I enjoy building practical software with a team and want to learn from experienced mentors."
+    return {
+        "id": f"chatcmpl-loadtest-{time.monotonic_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "loadtest"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": answer}}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(answer) // 4,
+                  "total_tokens": (len(prompt) + len(answer)) // 4},
+    }
+
+
+def _load_data(form_id: str) -> list:
+    items = []
+    for i, (title, item_type, options) in enumerate(FORM_ITEMS):
+        entry = [1000000 + i, [[option] for option in options] or None, 1]
+        items.append([i, title, None, item_type, [entry]])
+    return [None, [None, items, None, None, None, None, None, None, f"Load test form {form_id}"], None, "Load test form"]
+
+
+@app.get("/docs.google.com/forms/d/e/{form_id}/viewform")
+async def viewform(form_id: str):
+    data = json.dumps(_load_data(form_id))
+    return HTMLResponse(
+        f"<html><head><title>Load test form</title></head><body>"
+        f"<script>var FB_PUBLIC_LOAD_DATA_ = {data};</script></body></html>"
+    )
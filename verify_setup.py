@@ -17,7 +17,7 @@ print(f"Python: {sys.version}")
 packages = [
     "fastapi", "uvicorn", "sqlalchemy", "jose", "passlib", 
     "multipart", "pydantic", "playwright", "sentence_transformers", 
-    "sklearn", "numpy", "aiofiles", "httpx"
+    "numpy", "aiofiles", "httpx"
 ]
 
 missing = []
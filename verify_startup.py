@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Cold-start budget for `import app.main` (what Vercel pays before the first request)
+BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+# Heavy dependencies that must only load on first use.
+# Motor/PyMongo are not listed: the route signatures are typed with the Beanie
+# documents in app.models, and `import beanie` imports Motor, so the DB stack
+# (~250 ms) is paid at import and counted against the budget instead.
+DEFERRED = [
+    "playwright", "sklearn", "numpy", "torch", "sentence_transformers",
+    "onnxruntime", "httpx", "passlib",
+]
+
+backend_dir = Path(__file__).resolve().parent / "backend"
+
+print("⏱️  Measuring cold import of app.main...")
+proc = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", "import app.main"],
+    cwd=str(backend_dir),
+    capture_output=True,
+    text=True,
+)
+if proc.returncode != 0:
+    print(f"❌ import app.main failed:\n{proc.stderr[-2000:]}")
+    sys.exit(1)
+
+# Lines look like: "import time:  self [us] | cumulative | imported package"
+loaded = {}
+for line in proc.stderr.splitlines():
+    if not line.startswith("import time:") or "[us]" in line:
+        continue
+    _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+    loaded[name] = int(cumulative_us)
+
+total_ms = loaded.get("app.main", 0) / 1000
+failed = False
+
+eager = [pkg for pkg in DEFERRED if pkg in loaded]
+if eager:
+    failed = True
+    print(f"❌ Imported eagerly at startup: {', '.join(eager)}")
+else:
+    print("✅ No heavy dependency is imported at startup.")
+
+if total_ms > BUDGET_MS:
+    failed = True
+    print(f"❌ Cold import took {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms).")
+    slowest = sorted(loaded.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    for name, us in slowest:
+        print(f"   {us / 1000:8.1f} ms  {name}")
+else:
+    print(f"✅ Cold import took {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms).")
+
+sys.exit(1 if failed else 0)